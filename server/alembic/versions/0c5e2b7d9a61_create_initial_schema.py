@@ -0,0 +1,72 @@
+"""Create initial schema
+
+Creates users and journal_entries as they were before any later
+migration, so `alembic upgrade head` can build a database from scratch
+(DB_CREATE_ALL=false). Databases whose tables were created by create_all
+on boot already have them and are left untouched.
+
+On SQLite, users is AUTOINCREMENT so ids of deleted users are never
+handed out again (tokens identify users by id).
+
+Revision ID: 0c5e2b7d9a61
+Revises: 4f7b3372eb0e
+Create Date: 2026-10-19 08:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e2b7d9a61'
+down_revision = '4f7b3372eb0e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("first_name", sa.String(), nullable=True),
+            sa.Column("last_name", sa.String(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sqlite_autoincrement=True
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not inspector.has_table("journal_entries"):
+        op.create_table(
+            "journal_entries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("mood", sa.String(50), nullable=True),
+            sa.Column("mood_score", sa.Float(), nullable=True),
+            sa.Column("top_emotions", sa.JSON(), nullable=True),
+            sa.Column("summary", sa.Text(), nullable=True),
+            sa.Column("analysis_completed", sa.Boolean(), nullable=True),
+        )
+        op.create_index("ix_journal_entries_id", "journal_entries", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_journal_entries_id", table_name="journal_entries")
+    op.drop_table("journal_entries")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
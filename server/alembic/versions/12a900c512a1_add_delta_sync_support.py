@@ -0,0 +1,48 @@
+"""Add delta sync support
+
+Adds the (user_id, updated_at) index used by GET /api/journals/changes
+and the journal_entry_tombstones table that records deletions.
+
+Revision ID: 12a900c512a1
+Revises: 89939cdc0438
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '12a900c512a1'
+down_revision = '89939cdc0438'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables may already exist when the app created them with create_all.
+    inspector = sa.inspect(op.get_bind())
+
+    indexes = {index["name"] for index in inspector.get_indexes("journal_entries")}
+    if "ix_journal_entries_user_id_updated_at" not in indexes:
+        op.create_index("ix_journal_entries_user_id_updated_at", "journal_entries", ["user_id", "updated_at"])
+
+    if not inspector.has_table("journal_entry_tombstones"):
+        op.create_table(
+            "journal_entry_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("entry_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index(
+            "ix_journal_entry_tombstones_user_id_deleted_at",
+            "journal_entry_tombstones",
+            ["user_id", "deleted_at"]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_journal_entry_tombstones_user_id_deleted_at", table_name="journal_entry_tombstones")
+    op.drop_table("journal_entry_tombstones")
+    op.drop_index("ix_journal_entries_user_id_updated_at", table_name="journal_entries")
@@ -0,0 +1,32 @@
+"""Add journal entry embeddings
+
+Adds journal_entries.embedding, the hashed term-frequency vector used by
+GET /api/journals/{id}/similar. Existing entries are vectorized on first
+search, or up front with `python -m app.similarity`.
+
+Revision ID: 5d0e6b7c2f31
+Revises: 12a900c512a1
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0e6b7c2f31'
+down_revision = '12a900c512a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The column may already exist when the app created the table with create_all.
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("journal_entries")}
+    if "embedding" not in columns:
+        op.add_column("journal_entries", sa.Column("embedding", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("journal_entries", "embedding")
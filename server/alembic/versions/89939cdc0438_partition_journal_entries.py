@@ -0,0 +1,99 @@
+"""Partition journal_entries
+
+Converts journal_entries into a Postgres declaratively partitioned table
+when JOURNAL_PARTITIONING is "hash" (by user_id) or "range" (monthly by
+created_at). A no-op for "none" and for non-Postgres databases.
+
+The primary key becomes (id, partition key); ids still come from the
+original sequence so they stay unique in practice.
+
+Revision ID: 89939cdc0438
+Revises: 0c5e2b7d9a61
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import get_settings
+from app.partitioning import create_range_partition, month_start, partition_strategy
+
+
+# revision identifiers, used by Alembic.
+revision = '89939cdc0438'
+down_revision = '0c5e2b7d9a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    settings = get_settings()
+    mode = settings.journal_partitioning
+    bind = op.get_bind()
+    if mode not in ("hash", "range") or bind.dialect.name != "postgresql":
+        return
+    if partition_strategy(bind):
+        return
+
+    op.execute("ALTER TABLE journal_entries RENAME TO journal_entries_unpartitioned")
+    op.execute("ALTER INDEX journal_entries_pkey RENAME TO journal_entries_unpartitioned_pkey")
+    op.execute(
+        "CREATE TABLE journal_entries "
+        "(LIKE journal_entries_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+        + ("PARTITION BY HASH (user_id)" if mode == "hash" else "PARTITION BY RANGE (created_at)")
+    )
+
+    if mode == "hash":
+        op.execute("ALTER TABLE journal_entries ADD PRIMARY KEY (id, user_id)")
+        for remainder in range(settings.journal_hash_partitions):
+            op.execute(
+                f"CREATE TABLE journal_entries_p{remainder} PARTITION OF journal_entries "
+                f"FOR VALUES WITH (MODULUS {settings.journal_hash_partitions}, REMAINDER {remainder})"
+            )
+    else:
+        op.execute("UPDATE journal_entries_unpartitioned SET created_at = now() WHERE created_at IS NULL")
+        op.execute("ALTER TABLE journal_entries ALTER COLUMN created_at SET NOT NULL")
+        op.execute("ALTER TABLE journal_entries ADD PRIMARY KEY (id, created_at)")
+        oldest = bind.execute(sa.text("SELECT min(created_at) FROM journal_entries_unpartitioned")).scalar()
+        start = month_start(oldest.date() if oldest else date.today())
+        last = month_start(date.today(), settings.journal_partition_months_ahead)
+        while start <= last:
+            create_range_partition(bind, start)
+            start = month_start(start, 1)
+        op.execute("CREATE TABLE journal_entries_default PARTITION OF journal_entries DEFAULT")
+
+    op.execute(
+        "ALTER TABLE journal_entries ADD CONSTRAINT journal_entries_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+    op.execute("INSERT INTO journal_entries SELECT * FROM journal_entries_unpartitioned")
+    op.execute("ALTER SEQUENCE journal_entries_id_seq OWNED BY journal_entries.id")
+    op.execute("DROP TABLE journal_entries_unpartitioned")
+
+    op.create_index("ix_journal_entries_id", "journal_entries", ["id"])
+    op.create_index("ix_journal_entries_user_id_created_at", "journal_entries", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not partition_strategy(bind):
+        return
+
+    op.execute("ALTER TABLE journal_entries RENAME TO journal_entries_partitioned")
+    op.execute("ALTER INDEX journal_entries_pkey RENAME TO journal_entries_partitioned_pkey")
+    op.execute("ALTER INDEX ix_journal_entries_id RENAME TO ix_journal_entries_id_partitioned")
+    op.execute(
+        "CREATE TABLE journal_entries "
+        "(LIKE journal_entries_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+    )
+    op.execute("ALTER TABLE journal_entries ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE journal_entries ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("INSERT INTO journal_entries SELECT * FROM journal_entries_partitioned")
+    op.execute("ALTER SEQUENCE journal_entries_id_seq OWNED BY journal_entries.id")
+    op.execute("DROP TABLE journal_entries_partitioned")
+    op.execute(
+        "ALTER TABLE journal_entries ADD CONSTRAINT journal_entries_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+    op.create_index("ix_journal_entries_id", "journal_entries", ["id"])
@@ -0,0 +1,73 @@
+"""Add journal entry emotions
+
+Adds journal_entry_emotions, one row per (entry, emotion), indexed on
+(user_id, emotion) for ?emotion= filtering and per-user counts, and fills
+it from existing top_emotions.
+
+Revision ID: a3c18e9d4b57
+Revises: 5d0e6b7c2f31
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+from app.emotions import normalize_emotions
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c18e9d4b57'
+down_revision = '5d0e6b7c2f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("journal_entry_emotions"):
+        op.create_table(
+            "journal_entry_emotions",
+            sa.Column("entry_id", sa.Integer(), primary_key=True),
+            sa.Column("emotion", sa.String(50), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        )
+        op.create_index(
+            "ix_journal_entry_emotions_user_id_emotion",
+            "journal_entry_emotions",
+            ["user_id", "emotion", "entry_id"]
+        )
+
+    emotions_table = sa.table(
+        "journal_entry_emotions",
+        sa.column("entry_id", sa.Integer),
+        sa.column("emotion", sa.String),
+        sa.column("user_id", sa.Integer),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT e.id, e.user_id, e.top_emotions FROM journal_entries e "
+            "WHERE e.id > :last_id AND NOT EXISTS "
+            "(SELECT 1 FROM journal_entry_emotions m WHERE m.entry_id = e.id) "
+            "ORDER BY e.id LIMIT 1000"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            break
+        values = []
+        for entry_id, user_id, top_emotions in rows:
+            if isinstance(top_emotions, str):
+                top_emotions = json.loads(top_emotions)
+            values.extend(
+                {"entry_id": entry_id, "emotion": emotion, "user_id": user_id}
+                for emotion in normalize_emotions(top_emotions)
+            )
+        if values:
+            op.bulk_insert(emotions_table, values)
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_index("ix_journal_entry_emotions_user_id_emotion", table_name="journal_entry_emotions")
+    op.drop_table("journal_entry_emotions")
@@ -0,0 +1,94 @@
+"""Cascade user deletes
+
+Adds users.deletion_requested_at for app.account_deletion, and on
+Postgres recreates every foreign key to users as ON DELETE CASCADE.
+Constraints are re-added NOT VALID, which only locks each table briefly,
+and the migration transaction is committed before they are validated:
+VALIDATE CONSTRAINT scans the table but lets reads and writes continue.
+Postgres rejects NOT VALID on partitioned tables (journal_entries with
+JOURNAL_PARTITIONING=range), so those are added validated in one step,
+which scans every partition under the migration's lock.
+
+SQLite can't alter constraints; existing SQLite databases rely on
+app.account_deletion deleting rows explicitly, which it always does.
+
+Revision ID: a6c3e9f1d274
+Revises: f3a8d1c5e297
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e9f1d274'
+down_revision = 'f3a8d1c5e297'
+branch_labels = None
+depends_on = None
+
+USER_TABLES = (
+    "journal_entries",
+    "journal_entries_archive",
+    "journal_entry_tombstones",
+    "journal_entry_emotions",
+    "journal_digests",
+    "analysis_jobs",
+)
+
+
+def user_foreign_keys(bind, table: str):
+    return [
+        foreign_key
+        for foreign_key in sa.inspect(bind).get_foreign_keys(table)
+        if foreign_key["referred_table"] == "users" and foreign_key["name"]
+    ]
+
+
+def is_partitioned(bind, table: str) -> bool:
+    return bind.execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    ).scalar() is True
+
+
+def set_on_delete(cascade: bool):
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    replaced = []
+    for table in USER_TABLES:
+        if not inspector.has_table(table):
+            continue
+        for foreign_key in user_foreign_keys(bind, table):
+            ondelete = (foreign_key.get("options") or {}).get("ondelete")
+            if (ondelete or "").upper() == ("CASCADE" if cascade else ""):
+                continue
+            name = foreign_key["name"]
+            partitioned = is_partitioned(bind, table)
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+            op.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY (user_id) REFERENCES users (id)"
+                + (" ON DELETE CASCADE" if cascade else "")
+                + ("" if partitioned else " NOT VALID")
+            )
+            if not partitioned:
+                replaced.append((table, name))
+
+    with op.get_context().autocommit_block():
+        for table, name in replaced:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("users")}
+    if "deletion_requested_at" not in columns:
+        op.add_column("users", sa.Column("deletion_requested_at", sa.DateTime(timezone=True), nullable=True))
+    if bind.dialect.name == "postgresql":
+        set_on_delete(cascade=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        set_on_delete(cascade=False)
+    op.drop_column("users", "deletion_requested_at")
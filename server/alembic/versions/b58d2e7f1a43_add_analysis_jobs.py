@@ -0,0 +1,43 @@
+"""Add analysis jobs
+
+Adds analysis_jobs, the queue of mood analyses processed by
+`python -m app.worker` when ANALYSIS_MODE=queue.
+
+Revision ID: b58d2e7f1a43
+Revises: e41b6f3a9c02
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b58d2e7f1a43'
+down_revision = 'e41b6f3a9c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The table may already exist when the app created it with create_all.
+    if sa.inspect(op.get_bind()).has_table("analysis_jobs"):
+        return
+    op.create_table(
+        "analysis_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entry_id", sa.Integer(), nullable=False, unique=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_by", sa.String(100), nullable=True),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_analysis_jobs_status_available_at", "analysis_jobs", ["status", "available_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_jobs")
@@ -0,0 +1,89 @@
+"""Compress journal entry bodies
+
+Converts journal_entries.content and summary to bytea holding a one-byte
+codec marker followed by UTF-8 text or zlib data (see
+app.models.CompressedText). Existing rows are tagged as uncompressed and
+get compressed the next time they are written. Storage is set to EXTERNAL
+so Postgres doesn't try to compress the values a second time.
+
+On SQLite the columns keep their declared type; old text values are read
+as is.
+
+Revision ID: c7f2a9e06d18
+Revises: a3c18e9d4b57
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import zlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2a9e06d18'
+down_revision = 'a3c18e9d4b57'
+branch_labels = None
+depends_on = None
+
+BODY_COLUMNS = ("content", "summary")
+ZLIB = b"\x01"
+
+
+def decode_body(value) -> str:
+    """
+    The body codec as of this revision, kept here so the migration doesn't
+    change with app.models: a one-byte marker, then UTF-8 text (0x00) or
+    zlib-compressed UTF-8 (0x01).
+    """
+    value = bytes(value)
+    if value[:1] == ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    return value[1:].decode("utf-8")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    columns = {column["name"]: column["type"] for column in sa.inspect(bind).get_columns("journal_entries")}
+    for name in BODY_COLUMNS:
+        if isinstance(columns[name], sa.LargeBinary):
+            continue
+        op.execute(
+            f"ALTER TABLE journal_entries ALTER COLUMN {name} TYPE bytea "
+            f"USING decode('00', 'hex') || convert_to({name}, 'UTF8')"
+        )
+        op.execute(f"ALTER TABLE journal_entries ALTER COLUMN {name} SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    for name in BODY_COLUMNS:
+        op.add_column("journal_entries", sa.Column(f"{name}_text", sa.Text(), nullable=True))
+
+    # Compressed values can only be decoded in Python.
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, user_id, content, summary FROM journal_entries WHERE id > :last_id ORDER BY id LIMIT 1000"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            break
+        for entry_id, user_id, content, summary in rows:
+            bind.execute(sa.text(
+                "UPDATE journal_entries SET content_text = :content, summary_text = :summary "
+                "WHERE id = :id AND user_id = :user_id"
+            ), {
+                "content": decode_body(content),
+                "summary": None if summary is None else decode_body(summary),
+                "id": entry_id,
+                "user_id": user_id
+            })
+        last_id = rows[-1][0]
+
+    for name in BODY_COLUMNS:
+        op.drop_column("journal_entries", name)
+        op.alter_column("journal_entries", f"{name}_text", new_column_name=name)
+    op.alter_column("journal_entries", "content", nullable=False)
@@ -0,0 +1,45 @@
+"""Add user lookup indexes
+
+Adds a unique index on lower(email), so emails are unique regardless of
+case and logins by email are index lookups, and on Postgres a
+varchar_pattern_ops index on username for the prefix query that finds
+the next free username suffix.
+
+Fails if existing emails differ only by case; merge or rename those
+accounts first.
+
+Revision ID: d92c4a6b8e15
+Revises: b58d2e7f1a43
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd92c4a6b8e15'
+down_revision = 'b58d2e7f1a43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = {index["name"] for index in sa.inspect(bind).get_indexes("users")}
+    # SQLite doesn't reflect expression indexes, so let the database check.
+    op.create_index("uq_users_email_lower", "users", [sa.text("lower(email)")], unique=True, if_not_exists=True)
+    if bind.dialect.name == "postgresql" and "ix_users_username_pattern" not in existing:
+        op.create_index(
+            "ix_users_username_pattern",
+            "users",
+            ["username"],
+            postgresql_ops={"username": "varchar_pattern_ops"}
+        )
+
+
+def downgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("users")}
+    if "ix_users_username_pattern" in existing:
+        op.drop_index("ix_users_username_pattern", table_name="users")
+    op.drop_index("uq_users_email_lower", table_name="users", if_exists=True)
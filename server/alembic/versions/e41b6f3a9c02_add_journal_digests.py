@@ -0,0 +1,44 @@
+"""Add journal digests
+
+Adds journal_digests, the weekly and monthly reviews generated by the
+nightly batch in app.digests.
+
+Revision ID: e41b6f3a9c02
+Revises: c7f2a9e06d18
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b6f3a9c02'
+down_revision = 'c7f2a9e06d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The table may already exist when the app created it with create_all.
+    if sa.inspect(op.get_bind()).has_table("journal_digests"):
+        return
+    op.create_table(
+        "journal_digests",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("period", sa.String(10), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("period_end", sa.Date(), nullable=False),
+        sa.Column("entry_count", sa.Integer(), nullable=False),
+        sa.Column("average_mood_score", sa.Float(), nullable=True),
+        sa.Column("top_emotions", sa.JSON(), nullable=True),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("generated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", "period", "period_start", name="uq_journal_digests_user_id_period_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("journal_digests")
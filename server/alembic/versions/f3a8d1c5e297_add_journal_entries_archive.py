@@ -0,0 +1,49 @@
+"""Add journal entries archive
+
+Adds journal_entries_archive, the cold table that `python -m app.archive`
+moves old entries into.
+
+Revision ID: f3a8d1c5e297
+Revises: d92c4a6b8e15
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d1c5e297'
+down_revision = 'd92c4a6b8e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The table may already exist when the app created it with create_all.
+    if sa.inspect(op.get_bind()).has_table("journal_entries_archive"):
+        return
+    op.create_table(
+        "journal_entries_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("mood", sa.String(50), nullable=True),
+        sa.Column("mood_score", sa.Float(), nullable=True),
+        sa.Column("top_emotions", sa.JSON(), nullable=True),
+        sa.Column("summary", sa.LargeBinary(), nullable=True),
+        sa.Column("analysis_completed", sa.Boolean(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_journal_entries_archive_user_id_created_at",
+        "journal_entries_archive",
+        ["user_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("journal_entries_archive")
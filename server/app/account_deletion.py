@@ -0,0 +1,118 @@
+"""
+Account deletion.
+
+DELETE /api/users/me deactivates the account and stamps
+users.deletion_requested_at, then deletes its data in the background:
+
+- Entries, hot and archived, go ACCOUNT_DELETION_BATCH_SIZE at a time by
+  id, together with their emotion rows and queued analyses, one short
+  transaction per batch. Nothing is loaded into the session, so memory
+  stays flat and row locks are held briefly however many entries there
+  are; progress is logged after every batch.
+- Tombstones and digests (a handful per user) and the user row go last,
+  in one transaction.
+
+Every table referencing users is also ON DELETE CASCADE, so a user row
+deleted any other way takes its data with it. Deletions interrupted by a
+restart are finished by `python -m app.account_deletion`.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.cache import journal_cache
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import (
+    AnalysisJob, ArchivedJournalEntry, JournalDigest, JournalEntry, JournalEntryEmotion,
+    JournalEntryTombstone, User
+)
+from app.similarity import similarity_index
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def request_deletion(db: Session, user: User):
+    """
+    Deactivate the account so it can no longer sign in or write, and mark
+    it for deletion.
+    """
+    user.is_active = False
+    user.deletion_requested_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def delete_entry_batch(db: Session, model, user_id: int, batch_size: int) -> int:
+    ids = db.execute(
+        select(model.id).where(model.user_id == user_id).order_by(model.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    if model is JournalEntry:
+        db.execute(delete(JournalEntryEmotion).where(
+            JournalEntryEmotion.user_id == user_id,
+            JournalEntryEmotion.entry_id.in_(ids)
+        ))
+        db.execute(delete(AnalysisJob).where(AnalysisJob.entry_id.in_(ids)))
+    db.execute(delete(model).where(model.user_id == user_id, model.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def delete_account(db: Session, user_id: int, batch_size: int = settings.account_deletion_batch_size) -> int:
+    """
+    Delete the user and everything keyed by it. Returns the number of
+    entries deleted.
+    """
+    deleted = 0
+    for model in (JournalEntry, ArchivedJournalEntry):
+        while True:
+            count = delete_entry_batch(db, model, user_id, batch_size)
+            if not count:
+                break
+            deleted += count
+            logger.info("Deleting user %s: %d entries deleted", user_id, deleted)
+
+    for model in (JournalEntryEmotion, AnalysisJob, JournalEntryTombstone, JournalDigest):
+        db.execute(delete(model).where(model.user_id == user_id))
+    db.execute(delete(User).where(User.id == user_id))
+    db.commit()
+
+    journal_cache.invalidate_user(user_id)
+    similarity_index.forget(user_id)
+    logger.info("Deleted user %s and %d entries", user_id, deleted)
+    return deleted
+
+
+def delete_account_in_background(user_id: int):
+    db = SessionLocal()
+    try:
+        delete_account(db, user_id)
+    except Exception as e:
+        logger.error("Failed to delete user %s, resume with `python -m app.account_deletion`: %s", user_id, e)
+    finally:
+        db.close()
+
+
+def pending_deletions(db: Session) -> List[int]:
+    return [
+        user_id for (user_id,) in db.query(User.id).filter(
+            User.deletion_requested_at.isnot(None)
+        ).order_by(User.deletion_requested_at)
+    ]
+
+
+if __name__ == "__main__":
+    from app.logging_config import configure_logging
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        user_ids = pending_deletions(db)
+        for user_id in user_ids:
+            delete_account(db, user_id)
+    finally:
+        db.close()
+    print(f"Deleted {len(user_ids)} accounts")
@@ -0,0 +1,152 @@
+"""
+Mood analysis queue in the analysis_jobs table.
+
+With ANALYSIS_MODE=queue, entry writes enqueue a job in the same
+transaction instead of calling the LLM, and `python -m app.worker`
+processes drain the queue:
+
+- claim_jobs locks a batch with SELECT ... FOR UPDATE SKIP LOCKED, so
+  workers never pick the same rows or wait on each other, and leases it
+  for ANALYSIS_JOB_LEASE_SECONDS.
+- Workers extend their leases with heartbeats. A job whose lease ran out
+  (its worker crashed or hung) is claimed again by the next worker.
+- Completing, retrying or failing a job only takes effect while the
+  worker still holds the lease, so a job re-enqueued by a newer edit is
+  never lost.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models import AnalysisJob
+
+settings = get_settings()
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+MAX_RETRY_DELAY = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    id: int
+    entry_id: int
+    user_id: int
+    attempts: int
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_analysis(db: Session, entry_id: int, user_id: int):
+    """
+    Create or reset the entry's job as part of the caller's transaction.
+    """
+    values = {
+        "entry_id": entry_id,
+        "user_id": user_id,
+        "status": PENDING,
+        "attempts": 0,
+        "available_at": utcnow(),
+        "locked_by": None,
+        "locked_until": None,
+        "last_error": None,
+    }
+    insert = dialect_insert(db)
+    statement = insert(AnalysisJob).values(**values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[AnalysisJob.entry_id],
+        set_={key: getattr(statement.excluded, key) for key in values if key != "entry_id"}
+    ))
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(AnalysisJob.status == PENDING, AnalysisJob.available_at <= now),
+        and_(AnalysisJob.status == RUNNING, AnalysisJob.locked_until < now)
+    )
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int) -> List[ClaimedJob]:
+    """
+    Lease up to `limit` due jobs (including ones whose lease expired) to
+    this worker.
+    """
+    now = utcnow()
+    ids = db.execute(
+        select(AnalysisJob.id)
+        .where(_claimable(now))
+        .order_by(AnalysisJob.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.commit()
+        return []
+    # The claimable condition is repeated for databases without row locks
+    # (SQLite), where another worker may have claimed a row in between.
+    db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id.in_(ids), _claimable(now))
+        .values(
+            status=RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.analysis_job_lease_seconds),
+            attempts=AnalysisJob.attempts + 1
+        )
+    )
+    rows = db.execute(
+        select(AnalysisJob.id, AnalysisJob.entry_id, AnalysisJob.user_id, AnalysisJob.attempts)
+        .where(AnalysisJob.id.in_(ids), AnalysisJob.locked_by == worker_id, AnalysisJob.status == RUNNING)
+    ).all()
+    db.commit()
+    return [ClaimedJob(*row) for row in rows]
+
+
+def _held_by(job_id: int, worker_id: str):
+    return and_(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id, AnalysisJob.status == RUNNING)
+
+
+def heartbeat(db: Session, worker_id: str, job_ids: List[int]) -> int:
+    """
+    Extend the leases this worker still holds; returns how many it does.
+    """
+    result = db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id.in_(job_ids), AnalysisJob.locked_by == worker_id, AnalysisJob.status == RUNNING)
+        .values(locked_until=utcnow() + timedelta(seconds=settings.analysis_job_lease_seconds))
+    )
+    db.commit()
+    return result.rowcount
+
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> bool:
+    """
+    Delete the finished job as part of the caller's transaction. False when
+    the lease was lost, e.g. because an edit re-enqueued the entry.
+    """
+    return db.execute(delete(AnalysisJob).where(_held_by(job_id, worker_id))).rowcount > 0
+
+
+def retry_job(db: Session, job: ClaimedJob, worker_id: str, error: str):
+    """
+    Make the job available again after an exponential backoff, or mark it
+    failed after ANALYSIS_JOB_MAX_ATTEMPTS.
+    """
+    if job.attempts >= settings.analysis_job_max_attempts:
+        values = {"status": FAILED}
+    else:
+        delay = min(timedelta(seconds=5 * 2 ** job.attempts), MAX_RETRY_DELAY)
+        values = {"status": PENDING, "available_at": utcnow() + delay}
+    db.execute(
+        update(AnalysisJob)
+        .where(_held_by(job.id, worker_id))
+        .values(locked_by=None, locked_until=None, last_error=error[:1000], **values)
+    )
+    db.commit()
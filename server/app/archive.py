@@ -0,0 +1,149 @@
+"""
+Hot/cold split of journal entries.
+
+Entries not updated for ARCHIVE_AFTER_DAYS are moved from journal_entries
+to journal_entries_archive, so the hot table and its indexes only hold
+what the list, sync and similarity queries actually read. Rows are copied
+server-side with INSERT ... SELECT (bodies stay compressed as stored) and
+deleted in the same transaction, ARCHIVE_BATCH_SIZE at a time. Their
+emotion rows and similarity vectors are dropped; the archive keeps
+top_emotions.
+
+Archived entries are read only when asked for: GET /api/journals/{id},
+/emotions and /export take include_archived=true. Entries in periods that
+digests still consider are never archived.
+
+Run with `python -m app.archive`, e.g. nightly from cron.
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session, undefer_group
+from app.cache import journal_cache
+from app.config import get_settings
+from app.digests import PERIODS, recent_periods
+from app.models import AnalysisJob, ArchivedJournalEntry, JournalEntry, JournalEntryEmotion
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = (
+    "id", "user_id", "title", "content", "created_at", "updated_at",
+    "mood", "mood_score", "top_emotions", "summary", "analysis_completed"
+)
+
+
+def archive_cutoff(now: datetime, after_days: int = settings.archive_after_days) -> datetime:
+    """
+    Entries last updated before this are archived: after_days ago, or the
+    start of the oldest period digests still look at, whichever is earlier.
+    """
+    today = now.date()
+    oldest_digest = min(recent_periods(period, today)[-1] for period in PERIODS)
+    return min(now - timedelta(days=after_days), datetime.combine(oldest_digest, time.min, tzinfo=timezone.utc))
+
+
+def archive_batch(db: Session, cutoff: datetime, after_id: int, before_id: int, batch_size: int) -> Tuple[Optional[int], int]:
+    """
+    Move up to batch_size entries with after_id < id < before_id, in one
+    transaction.
+    Returns the last id examined (None when there are no more) and the
+    number of entries moved.
+    """
+    rows = db.execute(
+        select(JournalEntry.id, JournalEntry.user_id)
+        .where(JournalEntry.id > after_id, JournalEntry.id < before_id, JournalEntry.updated_at < cutoff)
+        .order_by(JournalEntry.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.commit()
+        return None, 0
+
+    ids = [row.id for row in rows]
+    # Repeated in every statement: without row locks (SQLite) an entry may
+    # have been edited since it was selected, and then stays hot.
+    stale = and_(JournalEntry.id.in_(ids), JournalEntry.updated_at < cutoff)
+    columns = [getattr(JournalEntry, name) for name in ARCHIVED_COLUMNS]
+    db.execute(
+        insert(ArchivedJournalEntry).from_select(
+            [getattr(ArchivedJournalEntry, name) for name in ARCHIVED_COLUMNS],
+            select(*columns).where(stale)
+        )
+    )
+    moved = set(db.execute(delete(JournalEntry).where(stale).returning(JournalEntry.id)).scalars())
+    db.execute(delete(JournalEntryEmotion).where(JournalEntryEmotion.entry_id.in_(moved)))
+    db.execute(delete(AnalysisJob).where(AnalysisJob.entry_id.in_(moved)))
+    db.commit()
+
+    for user_id in {row.user_id for row in rows if row.id in moved}:
+        journal_cache.invalidate_user(user_id)
+    return ids[-1], len(moved)
+
+
+def archive_entries(db: Session, cutoff: Optional[datetime] = None, batch_size: int = settings.archive_batch_size) -> int:
+    """
+    Archive every entry last updated before cutoff (archive_cutoff() by
+    default). Returns the number of entries moved.
+    """
+    cutoff = cutoff or archive_cutoff(datetime.now(timezone.utc))
+    # SQLite hands out max(id) + 1 for new rows, so archiving the newest
+    # entry would let its id be reused by the next one.
+    newest = db.query(func.max(JournalEntry.id)).scalar() or 0
+    moved = 0
+    last_id = 0
+    while last_id is not None:
+        last_id, count = archive_batch(db, cutoff, last_id, newest, batch_size)
+        moved += count
+    logger.info("Archived %d entries last updated before %s", moved, cutoff.isoformat())
+    return moved
+
+
+def get_archived_entry(db: Session, user_id: int, entry_id: int) -> Optional[ArchivedJournalEntry]:
+    return db.query(ArchivedJournalEntry).options(undefer_group("body")).filter(
+        ArchivedJournalEntry.id == entry_id,
+        ArchivedJournalEntry.user_id == user_id
+    ).first()
+
+
+def archived_emotion_counts(db: Session, user_id: int) -> Dict[str, int]:
+    """
+    Emotion counts over the user's archived entries. Archived entries have
+    no emotion rows, so this reads top_emotions; it is only used when
+    archived data is asked for.
+    """
+    counts = Counter()
+    for (emotions,) in db.query(ArchivedJournalEntry.top_emotions).filter(ArchivedJournalEntry.user_id == user_id):
+        counts.update(emotions or [])
+    return counts
+
+
+def merge_emotion_counts(counts: List[dict], archived: Dict[str, int]) -> List[dict]:
+    merged = Counter({row["emotion"]: row["count"] for row in counts})
+    merged.update(archived)
+    return [
+        {"emotion": emotion, "count": count}
+        for emotion, count in sorted(merged.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Move old journal entries to journal_entries_archive.")
+    parser.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    args = parser.parse_args()
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        cutoff = archive_cutoff(datetime.now(timezone.utc), args.older_than_days)
+        print(f"Archived {archive_entries(db, cutoff, args.batch_size)} entries")
+    finally:
+        db.close()
@@ -1,31 +1,55 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_db, get_read_session
 from app.models import User
+from app.profiling import profile_phase
 from app.schemas import TokenData
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 security = HTTPBearer()
 
 
+@lru_cache()
+def get_password_context():
+    """
+    Build the passlib context on first use; loading the bcrypt backend is
+    one of the slower parts of a cold worker boot.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def warm_up():
+    """
+    Load the crypto backends ahead of the first login or signup.
+    """
+    create_access_token({"sub": "0"})
+    get_password_context().hash("warm-up")
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with profile_phase("password_hash"):
+        return get_password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with profile_phase("password_hash"):
+        return get_password_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """
+    Sign a token; "sub" is the user id as a string. Ids are never reused,
+    unlike usernames, which are freed when an account is deleted.
+    """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -38,16 +62,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def verify_token(token: str) -> TokenData:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        username: str = payload.get("sub")
-        if username is None:
+        subject = payload.get("sub")
+        if subject is None or not str(subject).isdigit():
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        token_data = TokenData(username=username)
+        token_data = TokenData(user_id=int(subject))
         return token_data
     except JWTError:
         raise HTTPException(
@@ -57,14 +83,12 @@ def verify_token(token: str) -> TokenData:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    token = credentials.credentials
-    token_data = verify_token(token)
-    
-    user = db.query(User).filter(User.username == token_data.username).first()
+def get_token_data(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
+    return verify_token(credentials.credentials)
+
+
+def _load_user(db: Session, user_id: int) -> User:
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,7 +98,55 @@ def get_current_user(
     return user
 
 
+def get_current_user(
+    token_data: TokenData = Depends(get_token_data),
+    db: Session = Depends(get_db)
+) -> User:
+    return _load_user(db, token_data.user_id)
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+def get_read_db(token_data: TokenData = Depends(get_token_data)):
+    """
+    Session for read-only routes: a replica when configured, or the primary
+    while the user is inside their read-your-writes window.
+    """
+    db = get_read_session(token_data.subject)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_current_active_reader(
+    token_data: TokenData = Depends(get_token_data),
+    db: Session = Depends(get_read_db)
+) -> User:
+    """
+    Same as get_current_active_user, but resolved through the read session.
+    """
+    user = _load_user(db, token_data.user_id)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+def get_current_active_user_id(token_data: TokenData = Depends(get_token_data)) -> int:
+    """
+    Resolve the current user without holding a session for the whole
+    request, for long-lived streaming responses and routes that query on
+    a session of their own.
+    """
+    db = get_read_session(token_data.subject)
+    try:
+        user = _load_user(db, token_data.user_id)
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return user.id
+    finally:
+        db.close()
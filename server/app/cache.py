@@ -0,0 +1,287 @@
+"""
+Per-user result cache for journal reads.
+
+Cache keys embed a per-user generation number. Any write for a user bumps
+that number, which makes every cached list page and entry for the user
+unreachable in O(1); the orphaned keys age out through LRU eviction or TTL.
+"""
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Minimal key/value interface the journal cache needs.
+    """
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: int):
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Set the key only if it is absent; True if this call set it.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def get_generation(self, key: str) -> int:
+        raise NotImplementedError
+
+    def bump_generation(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU store bounded by entry count, with per-key TTL.
+
+    Only for a single worker: other workers never see its invalidations.
+    Generations are kept in their own LRU, also bounded by max_entries.
+    Every generation comes from one process-wide counter, so a user whose
+    generation was evicted gets a number higher than any key cached
+    before, and stale keys can't be revived.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] >= time.monotonic():
+                return False
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _store_generation(self, key: str, generation: int) -> int:
+        self._generations[key] = generation
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.max_entries:
+            self._generations.popitem(last=False)
+        return generation
+
+    def get_generation(self, key: str) -> int:
+        with self._lock:
+            generation = self._generations.get(key)
+            if generation is None:
+                return self._store_generation(key, next(self._counter))
+            self._generations.move_to_end(key)
+            return generation
+
+    def bump_generation(self, key: str) -> int:
+        with self._lock:
+            return self._store_generation(key, next(self._counter))
+
+
+class KeyValueCacheBackend(CacheBackend):
+    """
+    Backend over an external KV store with a Redis-compatible client
+    (get, set with ex/nx, incr, delete). Shared by all workers, so invalidation
+    from one worker is seen by every other.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        return bool(self.client.set(key, value, ex=ttl, nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def get_generation(self, key: str) -> int:
+        value = self.client.get(key)
+        if value is None:
+            # Seed from the clock rather than 0: if the store evicted the
+            # counter, restarting at a small number could revive old keys.
+            self.client.set(key, int(time.time() * 1000), nx=True)
+            value = self.client.get(key)
+        return int(value)
+
+    def bump_generation(self, key: str) -> int:
+        self.get_generation(key)
+        return int(self.client.incr(key))
+
+
+class LocalKeyValueStore:
+    """
+    In-memory stand-in for the Redis client used by KeyValueCacheBackend,
+    for tests and single-process setups.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and key in self._data:
+                expires_at = self._data[key][0]
+                if expires_at is None or expires_at >= time.monotonic():
+                    return False
+            expires_at = time.monotonic() + ex if ex else None
+            self._data[key] = (expires_at, str(value))
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            expires_at, value = self._data.get(key, (None, "0"))
+            value = str(int(value) + 1)
+            self._data[key] = (expires_at, value)
+            return int(value)
+
+
+class JournalCache:
+    """
+    Caches serialized journal list and detail responses per user.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def key(self, user_id: int, kind: str, params: Dict[str, Any]) -> Optional[str]:
+        """
+        Cache key for a read, under the user's current generation. Take it
+        before querying and store the result under the same key: a write
+        committed while the query runs bumps the generation, so the result
+        it may have missed is never served.
+        """
+        if not self.enabled:
+            return None
+        try:
+            generation = self.backend.get_generation(f"journals:gen:{user_id}")
+        except Exception as e:
+            logger.error("Cache read failed: %s", e)
+            return None
+        normalized = json.dumps(
+            {name: value for name, value in params.items() if value is not None},
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return f"journals:{user_id}:{generation}:{kind}:{normalized}"
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.error("Cache read failed: %s", e)
+            return None
+
+    def set(self, key: Optional[str], payload: str):
+        if key is None:
+            return
+        try:
+            self.backend.set(key, payload, self.ttl)
+        except Exception as e:
+            logger.error("Cache write failed: %s", e)
+
+    def invalidate_user(self, user_id: int):
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_generation(f"journals:gen:{user_id}")
+        except Exception as e:
+            logger.error("Cache invalidation failed for user %s: %s", user_id, e)
+
+
+def create_shared_backend(max_entries: int) -> CacheBackend:
+    """
+    Store for state every worker must agree on: Redis when
+    CACHE_BACKEND=redis, otherwise an LRU private to this worker.
+    """
+    if settings.cache_backend == "redis":
+        import redis
+        return KeyValueCacheBackend(redis.Redis.from_url(settings.cache_url, decode_responses=True))
+    return MemoryCacheBackend(max_entries)
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    if settings.cache_backend == "memory":
+        if settings.worker_count > 1:
+            logger.warning(
+                "CACHE_BACKEND=memory is per worker: with %d workers, writes on one leave the others "
+                "serving stale responses for up to CACHE_TTL_SECONDS; use CACHE_BACKEND=redis",
+                settings.worker_count
+            )
+        return MemoryCacheBackend(settings.cache_max_entries)
+    if settings.cache_backend == "redis":
+        import redis
+        return KeyValueCacheBackend(redis.Redis.from_url(settings.cache_url, decode_responses=True))
+    if settings.cache_backend == "local":
+        return KeyValueCacheBackend(LocalKeyValueStore())
+    return None
+
+
+journal_cache = JournalCache(create_cache_backend(), settings.cache_ttl_seconds)
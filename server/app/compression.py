@@ -0,0 +1,173 @@
+"""
+Response content negotiation: MessagePack encoding and compression.
+
+Clients sending `Accept: application/msgpack` get JSON responses
+re-encoded as MessagePack. Responses at or above compression_min_size
+are compressed with the best encoding both sides support
+(zstd, br, gzip). brotli, zstandard and msgpack are in requirements.txt;
+if one is missing anyway, its encoding is not offered and a warning is
+logged at startup.
+
+Streaming responses (more than one body chunk, or text/event-stream)
+pass through untouched.
+"""
+import gzip
+import json
+import logging
+from typing import Callable, Dict, List, Optional
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=settings.gzip_level)
+
+
+def _load_compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {"gzip": _gzip}
+    try:
+        import brotli
+        compressors["br"] = lambda data: brotli.compress(data, quality=settings.brotli_quality)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=settings.zstd_level)
+        compressors["zstd"] = compressor.compress
+    except ImportError:
+        pass
+    return compressors
+
+
+def _load_msgpack() -> Optional[Callable[[object], bytes]]:
+    try:
+        import msgpack
+        return msgpack.packb
+    except ImportError:
+        return None
+
+
+def parse_accept(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept or Accept-Encoding header into {token: q}.
+    """
+    accepted = {}
+    for part in header.split(","):
+        token, *params = [piece.strip() for piece in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[token.lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Pick the server-preferred encoding among those the client accepts,
+    breaking ties by the client's q-values.
+    """
+    accepted = parse_accept(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def wants_msgpack(accept: str) -> bool:
+    accepted = parse_accept(accept)
+    msgpack_q = max(accepted.get("application/msgpack", 0.0), accepted.get("application/x-msgpack", 0.0))
+    return msgpack_q > 0 and msgpack_q >= accepted.get("application/json", 0.0)
+
+
+class ContentNegotiationMiddleware:
+    def __init__(self, app, minimum_size: int, encodings: List[str]):
+        self.app = app
+        self.minimum_size = minimum_size
+        compressors = _load_compressors()
+        self.compressors = {name: compressors[name] for name in encodings if name in compressors}
+        self.packb = _load_msgpack()
+        missing = [name for name in encodings if name not in compressors]
+        if missing:
+            logger.warning("Compression encodings %s unavailable; install brotli and zstandard", ", ".join(missing))
+        if self.packb is None:
+            logger.warning("msgpack is not installed; application/msgpack will not be offered")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = choose_encoding(headers.get("accept-encoding", ""), list(self.compressors))
+        use_msgpack = self.packb is not None and wants_msgpack(headers.get("accept", ""))
+
+        if encoding is None and not use_msgpack:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def negotiated_send(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            await self._send_negotiated(send, start_message, message.get("body", b""), encoding, use_msgpack)
+
+        await self.app(scope, receive, negotiated_send)
+
+    async def _send_negotiated(self, send, start_message, body: bytes, encoding: Optional[str], use_msgpack: bool):
+        response_headers = [(key, value) for key, value in start_message["headers"]]
+        lookup = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in response_headers}
+        content_type = lookup.get("content-type", "")
+
+        vary = []
+        if use_msgpack and content_type.startswith("application/json") and body:
+            body = self.packb(json.loads(body))
+            content_type = "application/msgpack"
+            vary.append("Accept")
+
+        if encoding and "content-encoding" not in lookup and not content_type.startswith("text/event-stream"):
+            vary.append("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = self.compressors[encoding](body)
+            else:
+                encoding = None
+        else:
+            encoding = None
+
+        dropped = {b"content-length", b"content-type"} | ({b"vary"} if vary else set())
+        new_headers = [(key, value) for key, value in response_headers if key.lower() not in dropped]
+        if content_type:
+            new_headers.append((b"content-type", content_type.encode("latin-1")))
+        new_headers.append((b"content-length", str(len(body)).encode()))
+        if encoding:
+            new_headers.append((b"content-encoding", encoding.encode()))
+        if vary:
+            existing = lookup.get("vary")
+            new_headers.append((b"vary", ", ".join(([existing] if existing else []) + vary).encode()))
+
+        await send({**start_message, "headers": new_headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,31 +1,224 @@
+import os
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Tuple
 
 
 class Settings(BaseSettings):
     secret_key: str = "fastapi-insecure-change-me-in-production"
     debug: bool = True
-    
+
     db_name: str = "journaling_app"
     db_user: str = "postgres"
     db_password: str = "password"
     db_host: str = "localhost"
     db_port: str = "5432"
-    
+    # Full SQLAlchemy URL; overrides the DB_* settings above. A sqlite:///
+    # path runs the app on an embedded database (single node only).
+    database_url_override: str = Field("", validation_alias="DATABASE_URL")
+
+    # SQLite connection pragmas, applied when DATABASE_URL is sqlite.
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size_mb: int = 256
+
+    # Connection budget shared by every worker process. Each worker gets an
+    # equal slice of (max - reserved) so the fleet can never exhaust Postgres.
+    db_max_connections: int = 100
+    db_reserved_connections: int = 10
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+
+    # Comma-separated read replica URLs. Reads are pinned to the primary for
+    # read_your_writes_seconds after a user's own write.
+    db_replica_urls: str = ""
+    read_your_writes_seconds: float = 5.0
+
+    # Applied by the "partition journal_entries" migration: "none", "hash"
+    # (on user_id) or "range" (monthly on created_at).
+    journal_partitioning: str = "none"
+    journal_hash_partitions: int = 16
+    journal_partition_months_ahead: int = 3
+
     jwt_secret_key: str = "jwt-secret-key-change-me"
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
-    
+
     openai_api_key: str = "your-openai-api-key-here"
-    
+
+    # "inline" analyzes entries inside the create/update request; "queue"
+    # writes an analysis_jobs row for `python -m app.worker` instead.
+    analysis_mode: str = "inline"
+    analysis_worker_concurrency: int = 8
+    analysis_worker_batch_size: int = 16
+    analysis_worker_poll_seconds: float = 2.0
+    analysis_job_lease_seconds: int = 120
+    analysis_job_max_attempts: int = 5
+
+    # Mood analysis model routing. Entries of at least strong_min_chars go
+    # to the strong model unless it was rate limited or slower than the
+    # latency budget within the cooldown; then the fast model is used.
+    mood_model_fast: str = "gpt-3.5-turbo"
+    mood_model_strong: str = "gpt-4o-mini"
+    mood_model_strong_min_chars: int = 2000
+    mood_model_max_tokens: int = 300
+    mood_model_fast_timeout_seconds: float = 15.0
+    mood_model_strong_timeout_seconds: float = 30.0
+    mood_model_latency_budget_seconds: float = 10.0
+    mood_model_cooldown_seconds: float = 60.0
+
+    # Journal read cache: "none", "memory" (per worker), "redis" (shared
+    # across workers) or "local" (in-process stand-in for the KV backend).
+    cache_backend: str = "none"
+    cache_url: str = "redis://localhost:6379/0"
+    cache_max_entries: int = 10000
+    cache_ttl_seconds: int = 300
+
+    # Idempotency-Key replay for writes. Responses are kept per user for the
+    # TTL; with CACHE_BACKEND=redis they are shared by all workers. A key
+    # being processed blocks retries for at most the pending TTL, in case
+    # the worker running it dies.
+    idempotency_ttl_seconds: int = 86400
+    idempotency_max_keys: int = 10000
+    idempotency_pending_seconds: int = 120
+
+    batch_max_ids: int = 100
+
+    # Delta sync (GET /api/journals/changes). Tokens are rewound by the
+    # overlap so writes committed late are never skipped.
+    sync_page_size: int = 200
+    sync_overlap_seconds: int = 120
+    sync_tombstone_retention_days: int = 30
+
+    # Server-sent events (GET /api/journals/events)
+    sse_heartbeat_seconds: float = 15.0
+    sse_retry_ms: int = 3000
+    sse_queue_size: int = 100
+    sse_history_size: int = 50
+    sse_history_max_users: int = 10000
+
+    # Response compression and MessagePack negotiation. Encodings are in
+    # server preference order; br and zstd need brotli / zstandard.
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_encodings: str = "zstd,br,gzip"
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+
+    # Entry content and summary at least this many bytes are stored zlib-compressed.
+    body_compression: bool = True
+    body_compression_min_size: int = 512
+    body_compression_level: int = 6
+
+    # Related-entry search. Each loaded user costs dimensions x 4 bytes
+    # per entry; changing dimensions requires `python -m app.similarity`.
+    similarity_dimensions: int = 512
+    similarity_max_users: int = 1000
+
+    # Weekly/monthly digests, generated once a night inside the off-peak
+    # window (UTC hours, end exclusive) by one worker at a time.
+    digest_schedule_enabled: bool = True
+    digest_off_peak_start_hour: int = 2
+    digest_off_peak_end_hour: int = 5
+    digest_concurrency: int = 4
+    digest_lookback_periods: int = 2
+
+    # Account deletion removes entries this many at a time, one short
+    # transaction per batch.
+    account_deletion_batch_size: int = 500
+
+    # Identical concurrent requests share one computation (app.singleflight)
+    # if they arrive within this many seconds of the first; 0 disables.
+    # Reads are keyed by user and query, analyses by entry content.
+    singleflight_read_window_seconds: float = 2.0
+    singleflight_analysis_window_seconds: float = 60.0
+
+    # Entries older than archive_after_days are moved to
+    # journal_entries_archive by `python -m app.archive`, in batches.
+    archive_after_days: int = 365
+    archive_batch_size: int = 1000
+    export_batch_size: int = 500
+
+    # Logging: "json" or "text". LOG_SAMPLE_RATES is a comma-separated
+    # logger=rate list applied to INFO and below, e.g. "uvicorn.access=0.1".
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    log_sample_rates: str = ""
+
+    # Enables admin-only features such as request profiling
+    # (X-Admin-Token header). Only the newest profile_max_files dumps are kept.
+    admin_token: str = ""
+    profile_dir: str = "profiles"
+    profile_max_files: int = 50
+
+    # Admin bulk user provisioning (POST /api/admin/users/bulk and
+    # `python -m app.provisioning`). Passwords are hashed in parallel.
+    provision_batch_size: int = 500
+    provision_max_users: int = 10000
+    provision_hash_workers: int = 4
+
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 0
+    preload_app: bool = True
+    graceful_shutdown_timeout: int = 30
+
+    # Disable when the schema is managed with `alembic upgrade head`.
+    db_create_all: bool = True
+    warm_up_lazy_imports: bool = True
+
     class Config:
         env_file = ".env"
-    
+
     @property
     def database_url(self) -> str:
+        if self.database_url_override:
+            return self.database_url_override
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.db_replica_urls.split(",") if url.strip()]
+
+    @property
+    def compression_encoding_list(self) -> List[str]:
+        return [name.strip() for name in self.compression_encodings.split(",") if name.strip()]
+
+    @property
+    def worker_count(self) -> int:
+        """
+        Number of server processes; defaults to one per CPU when WORKERS is 0
+        (one on SQLite, which serializes writers anyway). Capped so that
+        every worker can hold at least one connection.
+        """
+        if self.workers > 0:
+            requested = self.workers
+        else:
+            requested = 1 if self.database_url.startswith("sqlite") else (os.cpu_count() or 1)
+        return min(requested, self.db_connection_budget)
+
+    @property
+    def db_connection_budget(self) -> int:
+        return max(self.db_max_connections - self.db_reserved_connections, 1)
+
+    @property
+    def db_pool_limits(self) -> Tuple[int, int]:
+        """
+        Per-worker (pool_size, max_overflow) so that workers x pool stays
+        within the database connection budget.
+        """
+        budget = self.db_connection_budget
+        per_worker = max(budget // self.worker_count, 1)
+        pool_size = min(self.db_pool_size, per_worker)
+        max_overflow = min(self.db_max_overflow, per_worker - pool_size)
+        return pool_size, max_overflow
+
 
 @lru_cache()
 def get_settings():
-    return Settings() 
\ No newline at end of file
+    return Settings()
@@ -1,19 +1,154 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import math
+import threading
+from typing import List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql import functions
+from app.cache import CacheBackend, create_shared_backend
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-engine = create_engine(settings.database_url)
+pool_size, max_overflow = settings.db_pool_limits
+
+
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    """
+    CURRENT_TIMESTAMP has no fractional seconds, so rows stamped by the
+    database would sort before rows stamped by Python in the same second
+    (SQLite compares timestamps as text). Match SQLAlchemy's format.
+    """
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+def configure_sqlite(engine: Engine, wal: bool = True):
+    """
+    Apply per-connection pragmas. WAL lets readers proceed while one
+    connection writes; busy_timeout makes a second writer wait for the
+    lock instead of failing with "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb) * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def create_database_engine(url: str) -> Engine:
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        # One shared connection, or every pooled connection would see its
+        # own empty database.
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        configure_sqlite(engine, wal=False)
+        return engine
+
+    # Connections move between the event loop and threadpool threads, but
+    # the pool hands each one to a single thread at a time.
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout
+    )
+    configure_sqlite(engine)
+    return engine
+
+
+engine = create_database_engine(settings.database_url)
+replica_engines = [create_database_engine(url) for url in settings.replica_urls]
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+class ReadRouter:
+    """
+    Chooses the engine for read-only sessions.
+
+    Replicas are used round-robin, except for users who wrote recently:
+    their reads stay on the primary for a short window so they always see
+    their own changes despite replication lag. The window is kept in the
+    shared store (Redis with CACHE_BACKEND=redis), so a write on one worker
+    pins reads on every worker; without it the pin is per worker.
+    """
+
+    def __init__(self, replicas: List[Engine], pin_seconds: float, store: CacheBackend):
+        self.replicas = replicas
+        self.pin_seconds = pin_seconds
+        self.store = store
+        self._cycle = itertools.cycle(replicas)
+        self._lock = threading.Lock()
+
+    def record_write(self, subject: str):
+        if not self.replicas:
+            return
+        try:
+            self.store.set(f"read-your-writes:{subject}", "1", max(math.ceil(self.pin_seconds), 1))
+        except Exception as e:
+            logger.error("Failed to pin reads of %s to the primary: %s", subject, e)
+
+    def engine_for(self, subject: str) -> Engine:
+        if not self.replicas:
+            return engine
+        try:
+            pinned = self.store.get(f"read-your-writes:{subject}") is not None
+        except Exception as e:
+            # The primary is always current; only the replicas lose load.
+            logger.error("Failed to check the read pin of %s: %s", subject, e)
+            pinned = True
+        if pinned:
+            return engine
+        with self._lock:
+            return next(self._cycle)
+
+
+read_router = ReadRouter(replica_engines, settings.read_your_writes_seconds, create_shared_backend(10000))
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+def get_read_session(subject: str):
+    return SessionLocal(bind=read_router.engine_for(subject))
+
+
+def dialect_insert(db):
+    """
+    INSERT construct for the session's database, with on_conflict_do_nothing
+    and on_conflict_do_update (PostgreSQL and SQLite).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
@@ -0,0 +1,335 @@
+"""
+Weekly and monthly digests ("your week in review").
+
+A nightly batch builds a digest for each user's current and recent
+periods from entry summaries, mood scores and top emotions, and stores
+it in journal_digests for GET /api/journals/digests. A period is only
+regenerated when the fingerprint of its entries (ids and updated_at)
+changed since the last run.
+
+The batch runs inside the off-peak window with at most
+DIGEST_CONCURRENCY users in progress; users not reached before the window
+closes are picked up the next night. With several workers, a Postgres
+advisory lock makes sure only one of them runs it. Inside the API it runs
+on a thread with its own event loop, so its synchronous queries never
+hold up requests.
+
+Run a batch immediately with `python -m app.digests`.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.logging_config import configure_logging
+from app.models import JournalDigest, JournalEntry
+from app.partitioning import month_start
+from app.services import mood_analysis_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PERIODS = ("week", "month")
+
+# Keeps workers from running the nightly batch concurrently.
+DIGEST_LOCK_ID = 72_300_002
+
+
+def period_start(period: str, day: date) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return month_start(day)
+
+
+def period_end(period: str, start: date) -> date:
+    """
+    Exclusive end of the period.
+    """
+    if period == "week":
+        return start + timedelta(days=7)
+    return month_start(start, 1)
+
+
+def recent_periods(period: str, today: date) -> List[date]:
+    """
+    Start dates of the current period and the DIGEST_LOOKBACK_PERIODS - 1
+    before it, newest first.
+    """
+    starts = [period_start(period, today)]
+    for _ in range(settings.digest_lookback_periods - 1):
+        starts.append(period_start(period, starts[-1] - timedelta(days=1)))
+    return starts
+
+
+@dataclass
+class PeriodStats:
+    entry_count: int = 0
+    average_mood_score: Optional[float] = None
+    top_emotions: List[str] = field(default_factory=list)
+    summaries: List[str] = field(default_factory=list)
+    fingerprint: str = ""
+
+
+def collect_period(rows) -> PeriodStats:
+    """
+    Rows are (id, updated_at, created_at, mood_score, top_emotions,
+    summary), oldest first.
+    """
+    scores = [row.mood_score for row in rows if row.mood_score is not None]
+    emotions = Counter(emotion for row in rows for emotion in row.top_emotions or [])
+    digest = hashlib.sha256()
+    for row in sorted(rows, key=lambda row: row.id):
+        digest.update(f"{row.id}:{row.updated_at.isoformat() if row.updated_at else ''};".encode())
+    return PeriodStats(
+        entry_count=len(rows),
+        average_mood_score=round(sum(scores) / len(scores), 1) if scores else None,
+        top_emotions=[emotion for emotion, _ in emotions.most_common(5)],
+        summaries=[row.summary for row in rows if row.summary],
+        fingerprint=digest.hexdigest()
+    )
+
+
+def fallback_summary(period: str, stats: PeriodStats) -> str:
+    parts = [f"You wrote {stats.entry_count} {'entry' if stats.entry_count == 1 else 'entries'} this {period}."]
+    if stats.average_mood_score is not None:
+        parts.append(f"Your average mood score was {stats.average_mood_score}/10.")
+    if stats.top_emotions:
+        parts.append(f"Your most frequent emotions were {', '.join(stats.top_emotions[:3])}.")
+    return " ".join(parts)
+
+
+def due_digests(db: Session, user_id: int, today: date) -> List[Tuple[str, date, PeriodStats]]:
+    """
+    Periods whose digest is missing or stale. Digests for periods that no
+    longer have any entries are deleted here.
+    """
+    oldest = min(recent_periods(period, today)[-1] for period in PERIODS)
+    rows = db.query(
+        JournalEntry.id, JournalEntry.updated_at, JournalEntry.created_at,
+        JournalEntry.mood_score, JournalEntry.top_emotions, JournalEntry.summary
+    ).filter(
+        JournalEntry.user_id == user_id,
+        JournalEntry.created_at >= datetime.combine(oldest, time.min, tzinfo=timezone.utc)
+    ).order_by(JournalEntry.created_at).all()
+    existing = {
+        (digest.period, digest.period_start): digest
+        for digest in db.query(JournalDigest).filter(
+            JournalDigest.user_id == user_id,
+            JournalDigest.period_start >= oldest
+        )
+    }
+
+    due = []
+    for period in PERIODS:
+        for start in recent_periods(period, today):
+            end = period_end(period, start)
+            period_rows = [row for row in rows if start <= row.created_at.date() < end]
+            digest = existing.get((period, start))
+            if not period_rows:
+                if digest is not None:
+                    db.delete(digest)
+                continue
+            stats = collect_period(period_rows)
+            if digest is None or digest.fingerprint != stats.fingerprint:
+                due.append((period, start, stats))
+    db.commit()
+    return due
+
+
+async def generate_user_digests(user_id: int, today: date) -> int:
+    db = SessionLocal()
+    try:
+        generated = 0
+        for period, start, stats in due_digests(db, user_id, today):
+            summary = await mood_analysis_service.summarize_period(
+                period, stats.summaries, stats.average_mood_score, stats.top_emotions
+            )
+            digest = db.query(JournalDigest).filter(
+                JournalDigest.user_id == user_id,
+                JournalDigest.period == period,
+                JournalDigest.period_start == start
+            ).first()
+            if digest is None:
+                digest = JournalDigest(user_id=user_id, period=period, period_start=start)
+                db.add(digest)
+            digest.period_end = period_end(period, start) - timedelta(days=1)
+            digest.entry_count = stats.entry_count
+            digest.average_mood_score = stats.average_mood_score
+            digest.top_emotions = stats.top_emotions
+            digest.summary = summary or fallback_summary(period, stats)
+            digest.fingerprint = stats.fingerprint
+            db.commit()
+            generated += 1
+        return generated
+    finally:
+        db.close()
+
+
+def active_user_ids(db: Session, today: date) -> List[int]:
+    """
+    Users with entries or digests in the periods being considered.
+    """
+    oldest = min(recent_periods(period, today)[-1] for period in PERIODS)
+    with_entries = db.query(JournalEntry.user_id).filter(
+        JournalEntry.created_at >= datetime.combine(oldest, time.min, tzinfo=timezone.utc)
+    ).distinct()
+    with_digests = db.query(JournalDigest.user_id).filter(JournalDigest.period_start >= oldest).distinct()
+    return sorted({user_id for (user_id,) in with_entries} | {user_id for (user_id,) in with_digests})
+
+
+def in_off_peak(now: datetime) -> bool:
+    start, end = settings.digest_off_peak_start_hour, settings.digest_off_peak_end_hour
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def seconds_until_off_peak(now: datetime) -> float:
+    start = now.replace(hour=settings.digest_off_peak_start_hour, minute=0, second=0, microsecond=0)
+    if start <= now:
+        start += timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+async def generate_digests(
+    today: Optional[date] = None,
+    respect_window: bool = False,
+    stop: Optional[threading.Event] = None
+) -> int:
+    """
+    Generate every due digest with DIGEST_CONCURRENCY users in flight.
+    With respect_window, stop taking new users once off-peak hours end;
+    likewise once stop is set.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    db = SessionLocal()
+    try:
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_id in active_user_ids(db, today):
+            queue.put_nowait(user_id)
+    finally:
+        db.close()
+
+    total = 0
+
+    async def worker():
+        nonlocal total
+        while not queue.empty():
+            if respect_window and not in_off_peak(datetime.now(timezone.utc)):
+                return
+            if stop is not None and stop.is_set():
+                return
+            user_id = queue.get_nowait()
+            try:
+                total += await generate_user_digests(user_id, today)
+            except Exception as e:
+                logger.error("Failed to generate digests for user %s: %s", user_id, e)
+
+    users = queue.qsize()
+    await asyncio.gather(*(worker() for _ in range(max(settings.digest_concurrency, 1))))
+    logger.info("Generated %d digests for %d users (%d users deferred)", total, users, queue.qsize())
+    return total
+
+
+@contextmanager
+def batch_lock() -> Iterator[bool]:
+    """
+    Session-level advisory lock on Postgres, held for the whole batch.
+    Other databases run a single process, so the lock always succeeds.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": DIGEST_LOCK_ID}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": DIGEST_LOCK_ID})
+                connection.commit()
+
+
+def run_batch(stop: Optional[threading.Event] = None) -> int:
+    """
+    One batch under the advisory lock, on a fresh event loop. Blocking:
+    the scheduler calls it in a thread.
+    """
+    with batch_lock() as acquired:
+        if not acquired:
+            return 0
+        return asyncio.run(generate_digests(respect_window=True, stop=stop))
+
+
+class DigestScheduler:
+    """
+    Background task that runs the batch once per night at the start of the
+    off-peak window, in a thread off the server's event loop.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._batch: Optional[asyncio.Future] = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float):
+        """
+        Cancel the schedule. A running batch finishes the users in progress
+        and takes no new ones; wait up to timeout for its thread so the
+        engine isn't disposed under it.
+        """
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._batch is not None and not self._batch.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._batch), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Digest batch still running after %.0f s of shutdown", timeout)
+            except Exception as e:
+                logger.error("Digest batch failed: %s", e)
+        self._batch = None
+
+    async def _run(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            if not in_off_peak(now):
+                await asyncio.sleep(seconds_until_off_peak(now))
+            # Shielded: cancelling the schedule must not lose track of the
+            # thread, which keeps running until the batch notices _stopping.
+            self._batch = asyncio.ensure_future(asyncio.to_thread(run_batch, self._stopping))
+            try:
+                await asyncio.shield(self._batch)
+            except Exception as e:
+                logger.error("Digest batch failed: %s", e)
+            # Once per night: wait for the next window.
+            await asyncio.sleep(seconds_until_off_peak(datetime.now(timezone.utc)))
+
+
+digest_scheduler = DigestScheduler()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    with batch_lock() as acquired:
+        if not acquired:
+            raise SystemExit("Another digest batch is running")
+        print(f"Generated {asyncio.run(generate_digests())} digests")
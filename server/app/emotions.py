@@ -0,0 +1,50 @@
+"""
+Normalized entry emotions.
+
+top_emotions stays on JournalEntry as the API representation; each
+emotion is also written to journal_entry_emotions so filtering and
+per-user counts are index lookups on (user_id, emotion).
+"""
+from typing import Iterable, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import JournalEntry, JournalEntryEmotion
+
+MAX_EMOTION_LENGTH = 50
+
+
+def normalize_emotion(emotion: str) -> str:
+    return emotion.strip().lower()[:MAX_EMOTION_LENGTH]
+
+
+def normalize_emotions(emotions: Iterable[str]) -> List[str]:
+    normalized = []
+    for emotion in emotions or []:
+        emotion = normalize_emotion(emotion) if isinstance(emotion, str) else ""
+        if emotion and emotion not in normalized:
+            normalized.append(emotion)
+    return normalized
+
+
+def set_entry_emotions(entry: JournalEntry, emotions: Iterable[str]):
+    """
+    Set top_emotions and sync the entry's emotion rows, keeping rows that
+    are unchanged (deleting and re-inserting the same primary key in one
+    flush would conflict).
+    """
+    wanted = normalize_emotions(emotions)
+    entry.top_emotions = wanted
+    for row in list(entry.emotions):
+        if row.emotion not in wanted:
+            entry.emotions.remove(row)
+    existing = {row.emotion for row in entry.emotions}
+    for emotion in wanted:
+        if emotion not in existing:
+            entry.emotions.append(JournalEntryEmotion(user_id=entry.user_id, emotion=emotion))
+
+
+def emotion_counts(db: Session, user_id: int) -> List[dict]:
+    rows = db.query(JournalEntryEmotion.emotion, func.count()).filter(
+        JournalEntryEmotion.user_id == user_id
+    ).group_by(JournalEntryEmotion.emotion).order_by(func.count().desc(), JournalEntryEmotion.emotion).all()
+    return [{"emotion": emotion, "count": count} for emotion, count in rows]
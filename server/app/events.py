@@ -0,0 +1,195 @@
+"""
+In-process pub/sub for per-user server-sent events.
+
+Each worker keeps its own subscribers and a short per-user history so a
+reconnecting client can resume with Last-Event-ID. Event ids carry a
+per-process prefix; a client resuming against a different worker (or
+after a restart) gets a "resync" event and should refetch instead.
+
+Events are only delivered by the worker that handled the write. With
+CACHE_BACKEND=redis every publish also bumps a per-user counter in Redis,
+and open streams compare it with what they delivered at each heartbeat:
+a write on another worker (or an analysis written back by app.worker)
+turns into a "resync" event. Without Redis, multi-worker deployments
+miss those events until the client reconnects.
+
+publish() must be called from the event loop thread.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional, Set
+from app.cache import CacheBackend, create_shared_backend
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    id: str
+    type: str
+    data: dict
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+HEARTBEAT = ": heartbeat\n\n"
+
+
+class EventBroker:
+    def __init__(self, history_size: int, queue_size: int, max_users: int, store: Optional[CacheBackend] = None):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.max_users = max_users
+        self.store = store
+        self._prefix = uuid.uuid4().hex[:8]
+        self._counter = itertools.count(1)
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._history: "OrderedDict[int, deque]" = OrderedDict()
+        self._trimmed_through: Dict[int, int] = {}
+        self._closed = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, user_id: int, event_type: str, data: dict):
+        event = Event(id=f"{self._prefix}-{next(self._counter)}", type=event_type, data=data)
+        self.count_external(user_id)
+
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = deque(maxlen=self.history_size)
+            if len(self._history) > self.max_users:
+                evicted_user, _ = self._history.popitem(last=False)
+                self._trimmed_through.pop(evicted_user, None)
+        else:
+            self._history.move_to_end(user_id)
+        if len(history) == history.maxlen:
+            self._trimmed_through[user_id] = self._sequence(history[0])
+        history.append(event)
+
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client: drop its backlog and ask it to refetch.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._resync_event())
+
+    def count_external(self, user_id: int):
+        """
+        Count an event in the shared store without delivering it here. On
+        its own (e.g. from the analysis worker process) this makes open
+        streams on every API worker resync at their next heartbeat.
+        """
+        if self.store is None:
+            return
+        try:
+            self.store.bump_generation(f"events:seq:{user_id}")
+        except Exception as e:
+            logger.error("Failed to count event for user %s: %s", user_id, e)
+
+    def _shared_sequence(self, user_id: int) -> Optional[int]:
+        """
+        Events published for the user by all workers, or None without a
+        shared store (or when it can't be reached).
+        """
+        if self.store is None:
+            return None
+        try:
+            return self.store.get_generation(f"events:seq:{user_id}")
+        except Exception as e:
+            logger.error("Failed to read event count for user %s: %s", user_id, e)
+            return None
+
+    def _resync_event(self) -> Event:
+        return Event(id=f"{self._prefix}-{next(self._counter)}", type="resync", data={})
+
+    @staticmethod
+    def _sequence(event: Event) -> int:
+        return int(event.id.partition("-")[2])
+
+    def _replay(self, user_id: int, last_event_id: str):
+        prefix, _, number = last_event_id.partition("-")
+        if prefix != self._prefix or not number.isdigit():
+            return [self._resync_event()]
+        last = int(number)
+        if self._trimmed_through.get(user_id, 0) > last:
+            # Part of what the client missed has already rotated out.
+            return [self._resync_event()]
+        return [event for event in self._history.get(user_id, ()) if self._sequence(event) > last]
+
+    async def stream(self, user_id: int, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Yield encoded SSE frames for a user until the broker closes or the
+        client disconnects (which cancels the generator).
+        """
+        # Read before subscribing: an event published in between is counted
+        # but maybe not delivered, which can only cause a spare resync.
+        sequence = await asyncio.to_thread(self._shared_sequence, user_id)
+        delivered = 0
+        next_check = time.monotonic() + settings.sse_heartbeat_seconds
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        # Taken before the first yield so nothing published from here on
+        # is delivered twice (once replayed, once through the queue).
+        missed = self._replay(user_id, last_event_id) if last_event_id else []
+        try:
+            yield f"retry: {settings.sse_retry_ms}\n\n"
+            for event in missed:
+                yield event.encode()
+            while not self._closed:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                else:
+                    if event is None:
+                        break
+                    if event.type != "resync":
+                        delivered += 1
+                    yield event.encode()
+                if sequence is not None and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + settings.sse_heartbeat_seconds
+                    current = await asyncio.to_thread(self._shared_sequence, user_id)
+                    if current is not None and current > sequence + delivered:
+                        # Another worker published events this stream never saw.
+                        sequence, delivered = current, 0
+                        yield self._resync_event().encode()
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def close(self):
+        """
+        End every open stream. Called as soon as shutdown starts (see
+        app.server.Server) so open streams don't hold the graceful drain.
+        """
+        self._closed = True
+        for queues in self._subscribers.values():
+            for queue in queues:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+event_broker = EventBroker(
+    history_size=settings.sse_history_size,
+    queue_size=settings.sse_queue_size,
+    max_users=settings.sse_history_max_users,
+    # Only Redis is shared; a per-worker store can't see other workers.
+    store=create_shared_backend(settings.cache_max_entries) if settings.cache_backend == "redis" else None
+)
@@ -0,0 +1,243 @@
+"""
+Idempotency-Key support for writes.
+
+A POST, PUT, PATCH or DELETE carrying an `Idempotency-Key` header runs
+once per user and key. Retries within IDEMPOTENCY_TTL_SECONDS get the
+stored response, marked with `Idempotent-Replayed: true`, instead of
+writing the entry again and re-running the mood analysis. A retry that
+arrives while the original is still running waits for it and gets the
+same response. Reusing a key for a different request is rejected with 422.
+
+Keys are scoped to the verified token subject, so users can't replay each
+other's responses. Requests without a valid bearer token pass through and
+fail authentication as usual.
+
+Responses are kept in a bounded per-worker LRU, or in the shared store
+when CACHE_BACKEND=redis. A request claims its key in the store with a
+"pending" marker (set only if absent, expiring after
+IDEMPOTENCY_PENDING_SECONDS in case its worker dies), so with Redis a
+retry that lands on another worker polls for the original's response
+instead of running the write again. Server errors are not stored and
+release the claim, so retrying them runs the request again.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from app.auth import verify_token
+from app.cache import CacheBackend, create_shared_backend
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+PENDING_POLL_SECONDS = 0.1
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int = 0
+    headers: List[Tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+    # A claim by a request that hasn't responded yet.
+    pending: bool = False
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "fingerprint": self.fingerprint,
+            "status": self.status,
+            "headers": [[key.decode("latin-1"), value.decode("latin-1")] for key, value in self.headers],
+            "body": base64.b64encode(self.body).decode(),
+            "pending": self.pending
+        })
+
+    @classmethod
+    def loads(cls, payload: str) -> "StoredResponse":
+        data = json.loads(payload)
+        return cls(
+            fingerprint=data["fingerprint"],
+            status=data["status"],
+            headers=[(key.encode("latin-1"), value.encode("latin-1")) for key, value in data["headers"]],
+            body=base64.b64decode(data["body"]),
+            pending=data.get("pending", False)
+        )
+
+
+def request_fingerprint(scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b"")):
+        digest.update(part + b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def token_subject(authorization: bytes) -> Optional[str]:
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    try:
+        return verify_token(token.strip()).subject
+    except HTTPException:
+        return None
+
+
+def create_idempotency_backend() -> CacheBackend:
+    return create_shared_backend(settings.idempotency_max_keys)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, backend: CacheBackend, ttl: int, pending_ttl: int):
+        self.app = app
+        self.backend = backend
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        # store key -> (fingerprint, future resolved with the response)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        subject = token_subject(headers.get(b"authorization", b"")) if key else None
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await self._reject(scope, receive, send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        fingerprint = request_fingerprint(scope, body)
+        store_key = f"idempotency:{subject}:{key}"
+
+        while True:
+            in_flight = self._in_flight.get(store_key)
+            if in_flight is not None:
+                if in_flight[0] != fingerprint:
+                    await self._reject(scope, receive, send, 422, "Idempotency-Key was already used for a different request")
+                    return
+                stored = await asyncio.shield(in_flight[1])
+                if stored is None:
+                    # The original failed before responding; run it here.
+                    continue
+            else:
+                stored = self._load(store_key)
+                if stored is None:
+                    if self._claim(store_key, fingerprint):
+                        break
+                    # Claimed by another worker in between.
+                    continue
+            if stored.fingerprint != fingerprint:
+                await self._reject(scope, receive, send, 422, "Idempotency-Key was already used for a different request")
+                return
+            if stored.pending:
+                # Running on another worker: wait for its response, or for
+                # the claim to be released or expire.
+                await asyncio.sleep(PENDING_POLL_SECONDS)
+                continue
+            await self._replay(send, stored)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[store_key] = (fingerprint, future)
+        response = StoredResponse(fingerprint)
+        complete = False
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capturing_send(message):
+            nonlocal complete
+            if message["type"] == "http.response.start":
+                response.status = message["status"]
+                response.headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capturing_send)
+        finally:
+            del self._in_flight[store_key]
+            if complete and response.status < 500:
+                self._save(store_key, response)
+            else:
+                self._release(store_key)
+            future.set_result(response if complete else None)
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        """
+        The whole request body, or None if the client disconnected.
+        """
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    def _load(self, store_key: str) -> Optional[StoredResponse]:
+        try:
+            payload = self.backend.get(store_key)
+            return StoredResponse.loads(payload) if payload else None
+        except Exception as e:
+            logger.error("Idempotency store read failed: %s", e)
+            return None
+
+    def _claim(self, store_key: str, fingerprint: str) -> bool:
+        """
+        Mark the key as running here. If the store is down the request
+        runs unclaimed, as it would without an Idempotency-Key.
+        """
+        try:
+            return self.backend.add(store_key, StoredResponse(fingerprint, pending=True).dumps(), self.pending_ttl)
+        except Exception as e:
+            logger.error("Idempotency store claim failed: %s", e)
+            return True
+
+    def _release(self, store_key: str):
+        try:
+            self.backend.delete(store_key)
+        except Exception as e:
+            logger.error("Idempotency store release failed: %s", e)
+
+    def _save(self, store_key: str, response: StoredResponse):
+        try:
+            self.backend.set(store_key, response.dumps(), self.ttl)
+        except Exception as e:
+            logger.error("Idempotency store write failed: %s", e)
+
+    @staticmethod
+    async def _replay(send, stored: StoredResponse):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": [*stored.headers, (b"idempotent-replayed", b"true")]
+        })
+        await send({"type": "http.response.body", "body": stored.body})
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code: int, detail: str):
+        await JSONResponse({"detail": detail}, status_code=status_code)(scope, receive, send)
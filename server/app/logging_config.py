@@ -0,0 +1,234 @@
+"""
+Queue-based structured logging.
+
+Loggers only put records on a bounded queue; a QueueListener thread
+formats and writes them, so slow stdout/stderr never blocks the event
+loop. Records keep their format string and arguments until the listener
+formats them, so messages that are sampled out or dropped are never
+formatted at all.
+
+- Output is one JSON object per line (LOG_FORMAT=json) or plain text.
+- Each record carries the id of the request that produced it
+  (RequestIdMiddleware; taken from X-Request-ID or generated).
+- LOG_SAMPLE_RATES keeps a fraction of INFO-and-below records per logger,
+  e.g. "app.services=0.1,uvicorn.access=0.05". Warnings and errors are
+  always kept.
+- When the queue is full, records are dropped and counted; the count is
+  reported by the next record that gets through and by logging_stats().
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra=.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            payload["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not getattr(record, "request_id", None):
+            record.request_id = "-"
+        return super().format(record)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for part in value.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of INFO-and-below records for the configured loggers
+    (and their children).
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = 0
+        self._cache: Dict[str, Optional[float]] = {}
+
+    def _rate(self, name: str) -> Optional[float]:
+        if name not in self._cache:
+            rate = None
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._cache[name] = rate
+        return self._cache[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks and never formats on the caller's
+    thread. Only the request id is captured here, since the listener
+    thread can't see the caller's context.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            with self._lock:
+                unreported, self._unreported = self._unreported, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": "Dropped %d log records because the log queue was full",
+                    "args": (unreported,),
+                }))
+            except queue.Full:
+                with self._lock:
+                    self._unreported += unreported
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_sampling: Optional[SamplingFilter] = None
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging():
+    """
+    Route every logger through the queue. Safe to call more than once.
+    """
+    global _handler, _sampling, _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _sampling = SamplingFilter(parse_sample_rates(settings.log_sample_rates))
+    _handler.addFilter(_sampling)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(settings.log_level.upper())
+
+    # uvicorn's loggers go through the root handler as well.
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "sampled_out": _sampling.sampled_out if _sampling else 0,
+    }
+
+
+class RequestIdMiddleware:
+    """
+    Bind a request id for the duration of each request and echo it in the
+    X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,121 @@
+"""
+Model selection for LLM calls.
+
+Entries shorter than MOOD_MODEL_STRONG_MIN_CHARS go to the fast model,
+longer ones to the strong model. The strong model is skipped for
+MOOD_MODEL_COOLDOWN_SECONDS after it is rate limited, or after its
+smoothed latency exceeds MOOD_MODEL_LATENCY_BUDGET_SECONDS. Once the
+cooldown is over, the next long entry probes it again.
+
+Statistics are kept per worker and exposed at GET /health/llm.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+# Weight of the newest sample in the smoothed latency.
+LATENCY_SMOOTHING = 0.3
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    max_tokens: int
+    timeout: float
+    reason: str
+
+
+@dataclass
+class ModelStats:
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    latency: Optional[float] = None
+    degraded_until: float = 0.0
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "degraded": now < self.degraded_until
+        }
+
+
+class ModelRouter:
+    def __init__(self, fast_model: str, strong_model: str, strong_min_chars: int,
+                 latency_budget: float, cooldown: float):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.strong_min_chars = strong_min_chars
+        self.latency_budget = latency_budget
+        self.cooldown = cooldown
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, text_length: int) -> ModelRoute:
+        if text_length < self.strong_min_chars or self.strong_model == self.fast_model:
+            return self.fast_route("short")
+        if self.degraded(self.strong_model):
+            return self.fast_route("downgraded")
+        return ModelRoute(
+            model=self.strong_model,
+            max_tokens=settings.mood_model_max_tokens,
+            timeout=settings.mood_model_strong_timeout_seconds,
+            reason="long"
+        )
+
+    def fast_route(self, reason: str) -> ModelRoute:
+        return ModelRoute(
+            model=self.fast_model,
+            max_tokens=settings.mood_model_max_tokens,
+            timeout=settings.mood_model_fast_timeout_seconds,
+            reason=reason
+        )
+
+    def degraded(self, model: str) -> bool:
+        stats = self._stats.get(model)
+        return stats is not None and time.monotonic() < stats.degraded_until
+
+    def record(self, model: str, latency: Optional[float], success: bool, rate_limited: bool = False):
+        """
+        Record the outcome of one call. latency is None when the call
+        never got a response.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.requests += 1
+            if success:
+                stats.successes += 1
+            else:
+                stats.failures += 1
+            if latency is not None:
+                if stats.latency is None:
+                    stats.latency = latency
+                else:
+                    stats.latency += LATENCY_SMOOTHING * (latency - stats.latency)
+            if rate_limited:
+                stats.rate_limited += 1
+            if rate_limited or (stats.latency is not None and stats.latency > self.latency_budget):
+                stats.degraded_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {model: stats.as_dict(now) for model, stats in self._stats.items()}
+
+
+model_router = ModelRouter(
+    fast_model=settings.mood_model_fast,
+    strong_model=settings.mood_model_strong,
+    strong_min_chars=settings.mood_model_strong_min_chars,
+    latency_budget=settings.mood_model_latency_budget_seconds,
+    cooldown=settings.mood_model_cooldown_seconds
+)
@@ -1,8 +1,50 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+import zlib
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Float, ForeignKey, JSON, Index, LargeBinary, Text, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+from app.config import get_settings
 from app.database import Base
 
+settings = get_settings()
+
+RAW = b"\x00"
+ZLIB = b"\x01"
+
+
+def encode_body(text: str) -> bytes:
+    data = text.encode("utf-8")
+    if settings.body_compression and len(data) >= settings.body_compression_min_size:
+        compressed = zlib.compress(data, settings.body_compression_level)
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+    return RAW + data
+
+
+def decode_body(value) -> str:
+    # Rows written before the column became binary (SQLite keeps them as text).
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[:1] == ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    return value[1:].decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored as bytes behind a one-byte codec marker, zlib-compressed
+    when at least BODY_COMPRESSION_MIN_SIZE bytes.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode_body(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode_body(value)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -14,26 +56,168 @@ class User(Base):
     first_name = Column(String, default="")
     last_name = Column(String, default="")
     is_active = Column(Boolean, default=True)
+    # Set when the account is being deleted by app.account_deletion.
+    deletion_requested_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    journal_entries = relationship("JournalEntry", back_populates="user", cascade="all, delete-orphan")
+    # passive_deletes: deleting a user leaves the entries to the database's
+    # ON DELETE CASCADE instead of loading them into the session.
+    journal_entries = relationship("JournalEntry", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Emails are unique regardless of case; logins look them up by lower(email).
+        Index("uq_users_email_lower", func.lower(email), unique=True),
+        # Prefix (LIKE 'john%') lookups for username allocation; SQLite
+        # can't use an index for them anyway.
+        Index("ix_users_username_pattern", username, postgresql_ops={"username": "varchar_pattern_ops"}).ddl_if(dialect="postgresql"),
+        # Tokens identify users by id, so ids must never be handed out
+        # twice; without AUTOINCREMENT SQLite reuses the highest deleted id.
+        {"sqlite_autoincrement": True},
+    )
 
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(200), nullable=False)
-    content = Column(Text, nullable=False)
+    # content and summary are deferred: queries that serialize entries
+    # load them with .options(undefer_group("body")), everything else
+    # (ownership checks, deletes, cascades) leaves them on disk.
+    content = deferred(Column(CompressedText, nullable=False), group="body")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     mood = Column(String(50), nullable=True)
     mood_score = Column(Float, nullable=True)
     top_emotions = Column(JSON, default=list)
-    summary = Column(Text, nullable=True)
+    summary = deferred(Column(CompressedText, nullable=True), group="body")
+    analysis_completed = Column(Boolean, default=False)
+
+    # Hashed term-frequency vector for related-entry search (app.similarity).
+    embedding = deferred(Column(LargeBinary, nullable=True))
+
+    user = relationship("User", back_populates="journal_entries")
+    emotions = relationship(
+        "JournalEntryEmotion",
+        primaryjoin="and_(JournalEntry.id == foreign(JournalEntryEmotion.entry_id), "
+                    "JournalEntry.user_id == foreign(JournalEntryEmotion.user_id))",
+        cascade="all, delete-orphan"
+    )
+
+    # user_id is part of the mapper identity so UPDATE/DELETE statements
+    # carry the partition key and prune to one partition when
+    # journal_entries is hash-partitioned.
+    __mapper_args__ = {"primary_key": [id, user_id]}
+    __table_args__ = (
+        Index("ix_journal_entries_user_id_updated_at", "user_id", "updated_at"),
+    )
+
+
+class ArchivedJournalEntry(Base):
+    """
+    Entry moved out of journal_entries by app.archive once it is older
+    than ARCHIVE_AFTER_DAYS. Same columns, minus the similarity vector;
+    bodies are copied as stored, already compressed.
+    """
+    __tablename__ = "journal_entries_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String(200), nullable=False)
+    content = deferred(Column(CompressedText, nullable=False), group="body")
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    mood = Column(String(50), nullable=True)
+    mood_score = Column(Float, nullable=True)
+    top_emotions = Column(JSON, default=list)
+    summary = deferred(Column(CompressedText, nullable=True), group="body")
     analysis_completed = Column(Boolean, default=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_journal_entries_archive_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class JournalEntryTombstone(Base):
+    """
+    Marker left behind by a deleted entry so delta sync can report it.
+    """
+    __tablename__ = "journal_entry_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_journal_entry_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
+
+class JournalEntryEmotion(Base):
+    """
+    One row per emotion in an entry's top_emotions, for indexed filtering
+    and counts. entry_id has no foreign key because journal_entries may be
+    partitioned; rows are removed with their entry through the ORM.
+    """
+    __tablename__ = "journal_entry_emotions"
+
+    entry_id = Column(Integer, primary_key=True)
+    emotion = Column(String(50), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_journal_entry_emotions_user_id_emotion", "user_id", "emotion", "entry_id"),
+    )
+
+
+class JournalDigest(Base):
+    """
+    Precomputed weekly or monthly review, regenerated by app.digests when
+    the fingerprint of the period's entries changes.
+    """
+    __tablename__ = "journal_digests"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    period = Column(String(10), nullable=False)
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    average_mood_score = Column(Float, nullable=True)
+    top_emotions = Column(JSON, default=list)
+    summary = Column(Text, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "period", "period_start", name="uq_journal_digests_user_id_period_start"),
+    )
+
+
+class AnalysisJob(Base):
+    """
+    Pending mood analysis for an entry, claimed by `python -m app.worker`
+    when ANALYSIS_MODE=queue. One row per entry; finished jobs are deleted.
+    entry_id has no foreign key because journal_entries may be partitioned.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="journal_entries") 
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_available_at", "status", "available_at"),
+    )
@@ -0,0 +1,136 @@
+"""
+Helpers for the partitioned journal_entries layout (Postgres only).
+
+The table is converted by the "partition journal_entries" Alembic
+migration when JOURNAL_PARTITIONING is "hash" (on user_id) or "range"
+(monthly on created_at). With range partitioning, upcoming months are
+created at startup so inserts never fall into the default partition.
+
+Usage:
+    python -m app.partitioning ensure
+    python -m app.partitioning explain --user-id 1
+"""
+import argparse
+import json
+import logging
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Serializes partition DDL between workers booting at the same time.
+PARTITION_LOCK_ID = 72_300_001
+
+
+def partition_strategy(connection: Connection) -> Optional[str]:
+    """
+    Return "hash", "range" or None if journal_entries isn't partitioned.
+    """
+    if connection.dialect.name != "postgresql":
+        return None
+    strategy = connection.execute(text(
+        "SELECT partstrat FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('journal_entries')"
+    )).scalar()
+    return {"h": "hash", "r": "range"}.get(strategy)
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def range_partition_name(start: date) -> str:
+    return f"journal_entries_y{start.year}m{start.month:02d}"
+
+
+def create_range_partition(connection: Connection, start: date):
+    end = month_start(start, 1)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {range_partition_name(start)} "
+        f"PARTITION OF journal_entries FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def ensure_range_partitions(connection: Connection, months_ahead: int) -> List[str]:
+    """
+    Create monthly partitions from the current month through months_ahead.
+    """
+    if partition_strategy(connection) != "range":
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    today = date.today()
+    created = []
+    for offset in range(months_ahead + 1):
+        start = month_start(today, offset)
+        create_range_partition(connection, start)
+        created.append(range_partition_name(start))
+    return created
+
+
+def scanned_partitions(connection: Connection, sql: str, params: dict) -> List[str]:
+    """
+    EXPLAIN a query and return the journal_entries partitions it touches.
+    """
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    relations = []
+
+    def walk(node: dict):
+        name = node.get("Relation Name")
+        if name and name.startswith("journal_entries"):
+            relations.append(name)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return relations
+
+
+def explain_user_queries(connection: Connection, user_id: int) -> dict:
+    """
+    Partitions scanned by the user-scoped queries the API runs.
+    """
+    queries = {
+        "list": (
+            "SELECT * FROM journal_entries WHERE user_id = :user_id "
+            "ORDER BY created_at DESC LIMIT 20"
+        ),
+        "detail": "SELECT * FROM journal_entries WHERE id = :entry_id AND user_id = :user_id",
+        "recent_month": (
+            "SELECT * FROM journal_entries WHERE user_id = :user_id "
+            "AND created_at >= date_trunc('month', now())"
+        )
+    }
+    params = {"user_id": user_id, "entry_id": 1}
+    return {name: scanned_partitions(connection, sql, params) for name, sql in queries.items()}
+
+
+def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="journal_entries partition maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("ensure", help="create upcoming range partitions")
+    explain = subcommands.add_parser("explain", help="show partitions scanned per query")
+    explain.add_argument("--user-id", type=int, required=True)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        print(f"Partitioning: {partition_strategy(connection) or 'none'}")
+        if args.command == "ensure":
+            for name in ensure_range_partitions(connection, settings.journal_partition_months_ahead):
+                print(f"  {name}")
+        else:
+            for name, partitions in explain_user_queries(connection, args.user_id).items():
+                print(f"  {name}: {len(partitions)} partition(s) {partitions}")
+
+
+if __name__ == "__main__":
+    main()
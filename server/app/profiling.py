@@ -0,0 +1,198 @@
+"""
+On-demand profiling of a single request.
+
+ProfilingMiddleware is only installed when ADMIN_TOKEN is set; otherwise
+nothing here runs. A request is profiled when it carries `X-Profile: 1`
+and `X-Admin-Token`. The response then gets a Server-Timing header
+splitting the time into SQL, LLM, password hashing and serialization,
+and a cProfile dump is written to PROFILE_DIR (open it with
+`python -m pstats`, snakeviz or flameprof for a flamegraph). Only the
+newest PROFILE_MAX_FILES dumps are kept.
+
+The call tree covers the event loop thread only; work in the threadpool
+shows up in the phase timings but not in the tree. Serialization time is
+read from the call tree, so it is missing when another request holds the
+profiler.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PHASES = ("sql", "llm", "password_hash")
+
+
+class RequestProfile:
+    def __init__(self):
+        self.timings: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.counts: Dict[str, int] = {phase: 0 for phase in PHASES}
+
+    def add(self, phase: str, seconds: float, calls: int = 1):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + calls
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def profile_phase(phase: str):
+    """
+    Attribute the enclosed time to a phase of the request being profiled.
+    Costs a context variable lookup when no request is being profiled.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(phase, time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.add("sql", time.perf_counter() - starts.pop())
+
+
+def _instrument():
+    """
+    Hook SQL timing. Only called when the middleware is installed.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _serialization_functions():
+    from fastapi import routing
+    from starlette.responses import JSONResponse
+
+    return [
+        (code.co_filename, code.co_firstlineno, code.co_name)
+        for code in (routing.serialize_response.__code__, JSONResponse.render.__code__)
+    ]
+
+
+def _serialization_time(profiler: cProfile.Profile) -> Tuple[float, int]:
+    """
+    Time spent in FastAPI's response model serialization and JSON
+    rendering so far, from the call tree. Leaves the profiler disabled.
+    """
+    stats = pstats.Stats(profiler).stats
+    seconds, calls = 0.0, 0
+    for key in _serialization_functions():
+        if key in stats:
+            primitive_calls, _, _, cumulative, _ = stats[key]
+            seconds += cumulative
+            calls += primitive_calls
+    return seconds, calls
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, admin_token: str, output_dir: str, max_files: int):
+        self.app = app
+        self.admin_token = admin_token
+        self.output_dir = output_dir
+        self.max_files = max_files
+        # cProfile allows one active profiler per process.
+        self._profiler_lock = threading.Lock()
+        _instrument()
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") not in (b"1", b"true"):
+            return False
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        return bool(self.admin_token) and hmac.compare_digest(token, self.admin_token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        profiler = cProfile.Profile() if self._profiler_lock.acquire(blocking=False) else None
+        artifact = self._artifact_path(scope) if profiler else None
+        start = time.perf_counter()
+
+        async def profiled_send(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                if profiler:
+                    profile.add("serialization", *_serialization_time(profiler))
+                    profiler.enable()
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", self._server_timing(profile, total).encode()))
+                if artifact:
+                    headers.append((b"x-profile-artifact", os.path.basename(artifact).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiler:
+                profiler.enable()
+            await self.app(scope, receive, profiled_send)
+        finally:
+            if profiler:
+                profiler.disable()
+                self._profiler_lock.release()
+                self._save(profiler, profile, artifact, time.perf_counter() - start)
+            _current_profile.reset(token)
+
+    @staticmethod
+    def _server_timing(profile: RequestProfile, total: float) -> str:
+        parts = [
+            f"{phase};dur={seconds * 1000:.1f};desc=\"{profile.counts[phase]} calls\""
+            for phase, seconds in profile.timings.items()
+        ]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+    def _artifact_path(self, scope) -> str:
+        route = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{scope['method']}-{route}.prof"
+        return os.path.join(self.output_dir, name)
+
+    def _save(self, profiler: cProfile.Profile, profile: RequestProfile, path: str, total: float):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(path)
+            self._prune()
+            phases = ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in profile.timings.items())
+            logger.info("Profiled request in %.1fms (%s), call tree saved to %s", total * 1000, phases, path)
+        except OSError as e:
+            logger.error("Failed to save profile to %s: %s", path, e)
+
+    def _prune(self):
+        """
+        Delete all but the newest max_files dumps; names start with the
+        time they were taken.
+        """
+        dumps = sorted(name for name in os.listdir(self.output_dir) if name.endswith(".prof"))
+        for name in dumps[:-self.max_files] if self.max_files > 0 else dumps:
+            os.remove(os.path.join(self.output_dir, name))
@@ -0,0 +1,189 @@
+"""
+Account creation: username allocation and bulk provisioning.
+
+Usernames are derived from the email's local part, with a numeric suffix
+when it is taken ("john", "john1", "john2", ...). The next free suffix is
+found with one aggregate query, and the row is written with
+INSERT ... ON CONFLICT DO NOTHING, so the unique constraints on username
+and lower(email) settle races between concurrent signups.
+
+provision_users creates accounts in batches for onboarding, one
+transaction per batch. It is served by POST /api/admin/users/bulk and
+`python -m app.provisioning users.csv` (columns: email, password,
+first_name, last_name).
+"""
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import Integer, and_, case, cast, func
+from sqlalchemy.orm import Session
+from app.auth import get_password_hash
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models import User
+from app.schemas import ProvisionedUser, ProvisionUser, SkippedUser
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Longer numeric suffixes are ignored so the cast can't overflow.
+MAX_SUFFIX_DIGITS = 9
+
+
+def username_base(email: str) -> str:
+    return email.split("@")[0]
+
+
+def username_usage(db: Session, base: str) -> Tuple[bool, int]:
+    """
+    Whether `base` itself is taken, and the highest numeric suffix in use
+    after it (0 if none), in one query.
+    """
+    suffix = func.substr(User.username, len(base) + 1)
+    numeric = and_(func.length(User.username) > len(base), func.ltrim(suffix, "0123456789") == "")
+    taken, highest = db.query(
+        func.max(case((User.username == base, 1), else_=0)),
+        func.max(case((numeric, cast(suffix, Integer)), else_=None))
+    ).filter(
+        User.username.startswith(base, autoescape=True),
+        func.length(User.username) <= len(base) + MAX_SUFFIX_DIGITS
+    ).one()
+    return bool(taken), highest or 0
+
+
+def next_free_username(db: Session, base: str) -> str:
+    taken, highest = username_usage(db, base)
+    return f"{base}{highest + 1}" if taken else base
+
+
+def insert_user(db: Session, **values) -> Optional[User]:
+    """
+    Insert a user, or return None when the username or email is already
+    taken. Doesn't commit.
+    """
+    insert = dialect_insert(db)
+    return db.scalars(insert(User).values(**values).on_conflict_do_nothing().returning(User)).first()
+
+
+def email_taken(db: Session, email: str) -> bool:
+    return db.query(User.id).filter(func.lower(User.email) == email.lower()).first() is not None
+
+
+def allocate_usernames(db: Session, bases: List[str]) -> List[str]:
+    """
+    Free usernames for a batch of new accounts, including ones sharing a
+    base with each other. One query for the batch, plus one per base
+    that is already taken or repeated.
+    """
+    taken = {username for (username,) in db.query(User.username).filter(User.username.in_(set(bases)))}
+    # base -> last suffix handed out, None until the first collision.
+    suffixes: Dict[str, Optional[int]] = {}
+    usernames = []
+    for base in bases:
+        if base not in taken and base not in suffixes:
+            suffixes[base] = None
+            usernames.append(base)
+            continue
+        if suffixes.get(base) is None:
+            suffixes[base] = username_usage(db, base)[1]
+        suffixes[base] += 1
+        usernames.append(f"{base}{suffixes[base]}")
+    return usernames
+
+
+@dataclass
+class ProvisionResult:
+    created: List[ProvisionedUser] = field(default_factory=list)
+    skipped: List[SkippedUser] = field(default_factory=list)
+
+
+def provision_users(db: Session, users: List[ProvisionUser], batch_size: int = settings.provision_batch_size) -> ProvisionResult:
+    """
+    Create accounts in batches of batch_size, one transaction per batch.
+    Emails that already exist (or repeat within the request) are skipped.
+    """
+    result = ProvisionResult()
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max(settings.provision_hash_workers, 1)) as pool:
+        for start in range(0, len(users), batch_size):
+            batch = []
+            for user in users[start:start + batch_size]:
+                key = user.email.lower()
+                if key in seen:
+                    result.skipped.append(SkippedUser(email=user.email, reason="duplicate in request"))
+                else:
+                    seen.add(key)
+                    batch.append(user)
+
+            existing = {
+                email for (email,) in db.query(func.lower(User.email)).filter(
+                    func.lower(User.email).in_([user.email.lower() for user in batch])
+                )
+            }
+            for user in batch:
+                if user.email.lower() in existing:
+                    result.skipped.append(SkippedUser(email=user.email, reason="email already registered"))
+            batch = [user for user in batch if user.email.lower() not in existing]
+            if not batch:
+                continue
+
+            hashes = list(pool.map(get_password_hash, [user.password for user in batch]))
+            usernames = allocate_usernames(db, [username_base(user.email) for user in batch])
+            insert = dialect_insert(db)
+            rows = db.execute(
+                insert(User).values([
+                    {
+                        "username": username,
+                        "email": user.email,
+                        "hashed_password": hashed_password,
+                        "first_name": user.first_name or "",
+                        "last_name": user.last_name or "",
+                        "is_active": True
+                    }
+                    for user, username, hashed_password in zip(batch, usernames, hashes)
+                ]).on_conflict_do_nothing().returning(User.id, User.email, User.username)
+            ).all()
+            db.commit()
+
+            inserted = {row.email.lower() for row in rows}
+            result.created.extend(ProvisionedUser(id=row.id, email=row.email, username=row.username) for row in rows)
+            for user in batch:
+                if user.email.lower() not in inserted:
+                    # Lost a race with a concurrent signup; safe to resubmit.
+                    result.skipped.append(SkippedUser(email=user.email, reason="conflict, retry"))
+            logger.info("Provisioned %d of %d users", len(result.created), len(users))
+    return result
+
+
+def read_csv(lines: Iterable[str]) -> List[ProvisionUser]:
+    return [
+        ProvisionUser(
+            email=row["email"].strip(),
+            password=row["password"],
+            first_name=(row.get("first_name") or "").strip(),
+            last_name=(row.get("last_name") or "").strip()
+        )
+        for row in csv.DictReader(lines)
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+    from app.database import SessionLocal
+    from app.logging_config import configure_logging
+
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python -m app.provisioning users.csv")
+    configure_logging()
+    with open(sys.argv[1], newline="") as source:
+        users = read_csv(source)
+    db = SessionLocal()
+    try:
+        result = provision_users(db, users)
+    finally:
+        db.close()
+    for skipped in result.skipped:
+        print(f"Skipped {skipped.email}: {skipped.reason}")
+    print(f"Created {len(result.created)} users, skipped {len(result.skipped)}")
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import get_db
+from app.provisioning import provision_users
+from app.schemas import ProvisionUsersRequest, ProvisionUsersResponse
+import hmac
+import logging
+
+settings = get_settings()
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: str = Header("")):
+    """
+    Admin routes are disabled unless ADMIN_TOKEN is set, and then require
+    it in the X-Admin-Token header.
+    """
+    if not settings.admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
+
+@router.post("/users/bulk", response_model=ProvisionUsersResponse, dependencies=[Depends(require_admin)])
+async def bulk_provision_users(request: ProvisionUsersRequest, db: Session = Depends(get_db)):
+    """
+    Create up to PROVISION_MAX_USERS accounts in batches. Existing emails
+    are skipped and reported, so a partially applied request can be
+    resubmitted as is.
+    """
+    if len(request.users) > settings.provision_max_users:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.provision_max_users} users per request"
+        )
+
+    # Password hashing and batched inserts block; keep them off the event loop.
+    result = await run_in_threadpool(provision_users, db, request.users)
+    logger.info("Bulk provisioning created %d users, skipped %d", len(result.created), len(result.skipped))
+    return ProvisionUsersResponse(created=result.created, skipped=result.skipped)
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, read_router
 from app.models import User
 from app.schemas import UserCreate, UserLogin, UserResponse, Token, ApiResponse
 from app.auth import get_password_hash, verify_password, create_access_token
+from app.provisioning import email_taken, insert_user, next_free_username, username_base
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+SIGNUP_ATTEMPTS = 5
+
 
 @router.post("/signup", response_model=UserResponse)
 async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
@@ -22,45 +26,49 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
                 detail="Passwords don't match"
             )
 
-        if db.query(User).filter(User.email == user_data.email).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists"
-            )
-
-        username = user_data.email.split('@')[0]
-        
-        original_username = username
-        counter = 1
-        while db.query(User).filter(User.username == username).first():
-            username = f"{original_username}{counter}"
-            counter += 1
-
         hashed_password = get_password_hash(user_data.password)
-        db_user = User(
-            username=username,
-            email=user_data.email,
-            hashed_password=hashed_password,
-            first_name=user_data.first_name,
-            last_name=user_data.last_name
-        )
-        
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        base = username_base(user_data.email)
 
-        access_token = create_access_token(data={"sub": db_user.username})
+        # The unique constraints decide: a conflict is either a registered
+        # email or a username taken concurrently, in which case retry.
+        db_user = None
+        for _ in range(SIGNUP_ATTEMPTS):
+            db_user = insert_user(
+                db,
+                username=next_free_username(db, base),
+                email=user_data.email,
+                hashed_password=hashed_password,
+                first_name=user_data.first_name,
+                last_name=user_data.last_name,
+                is_active=True
+            )
+            if db_user is not None:
+                break
+            if email_taken(db, user_data.email):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="User with this email already exists"
+                )
+        if db_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Could not allocate a username, please retry"
+            )
 
-        return UserResponse(
+        response = UserResponse(
             user=db_user,
-            access_token=access_token,
+            access_token=create_access_token(data={"sub": str(db_user.id)}),
             token_type="bearer"
         )
+        db.commit()
+        read_router.record_write(str(response.user.id))
+
+        return response
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error creating user: {e}")
+        logger.error("Error creating user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -73,7 +81,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     Authenticate user and return access token.
     """
     try:
-        user = db.query(User).filter(User.email == user_credentials.email).first()
+        user = db.query(User).filter(func.lower(User.email) == user_credentials.email.lower()).first()
         
         if not user or not verify_password(user_credentials.password, user.hashed_password):
             raise HTTPException(
@@ -87,7 +95,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
                 detail="User account is disabled"
             )
         
-        access_token = create_access_token(data={"sub": user.username})
+        access_token = create_access_token(data={"sub": str(user.id)})
         
         return UserResponse(
             user=user,
@@ -98,7 +106,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error during login: {e}")
+        logger.error("Error during login: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
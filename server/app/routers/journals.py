@@ -1,22 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, undefer_group
 from sqlalchemy import desc, asc
 from typing import List, Optional
-from app.database import get_db
-from app.models import User, JournalEntry
+from app.database import get_db, get_read_session, read_router
+from app.models import User, ArchivedJournalEntry, JournalDigest, JournalEntry, JournalEntryEmotion, JournalEntryTombstone
 from app.schemas import (
     JournalEntry as JournalEntrySchema,
     JournalEntryCreate,
     JournalEntryUpdate,
+    JournalChanges,
+    JournalEntryBatchItem,
+    SimilarJournalEntry,
+    EmotionCount,
+    JournalDigest as JournalDigestSchema,
     ApiResponse
 )
-from app.auth import get_current_active_user
-from app.services import mood_analysis_service
+from app.auth import get_current_active_user, get_current_active_reader, get_current_active_user_id, get_read_db
+from app.services import apply_analysis, mood_analysis_service
+from app.cache import journal_cache
+from app.events import event_broker
+from app.sync import SyncTokenError, SyncTokenExpired, get_changes, prune_tombstones
+from app.emotions import emotion_counts, normalize_emotion, set_entry_emotions
+from app.similarity import similarity_index, vectorize, encode_vector
+from app.singleflight import SingleFlight
+from app.analysis_jobs import enqueue_analysis
+from app.archive import archived_emotion_counts, get_archived_entry, merge_emotion_counts
+from app.config import get_settings
+import json
 import logging
 
+settings = get_settings()
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+entry_list_adapter = TypeAdapter(List[JournalEntrySchema])
+
+# Concurrent identical list requests (e.g. two components fetching on
+# mount) share one query. Keys start with the user id.
+list_flights = SingleFlight(settings.singleflight_read_window_seconds)
+
+
+def entries_changed(user: User, event: Optional[str] = None, data: Optional[dict] = None):
+    """
+    Called after every committed write to a user's entries.
+    """
+    read_router.record_write(str(user.id))
+    journal_cache.invalidate_user(user.id)
+    list_flights.forget(user.id)
+    if event:
+        event_broker.publish(user.id, event, data)
+
+
+def analysis_event(entry: JournalEntry) -> dict:
+    return {
+        "id": entry.id,
+        "mood": entry.mood,
+        "mood_score": entry.mood_score,
+        "top_emotions": entry.top_emotions,
+        "summary": entry.summary
+    }
+
+
+def json_response(payload) -> Response:
+    return Response(content=payload, media_type="application/json")
+
 
 async def analyze_entry_background(entry_id: int, title: str, content: str, db: Session):
     """
@@ -27,15 +77,12 @@ async def analyze_entry_background(entry_id: int, title: str, content: str, db:
         
         entry = db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
         if entry:
-            entry.mood = analysis['mood']
-            entry.mood_score = analysis['mood_score']
-            entry.top_emotions = analysis['top_emotions']
-            entry.summary = analysis['summary']
-            entry.analysis_completed = True
+            apply_analysis(entry, analysis)
             db.commit()
-            logger.info(f"Completed mood analysis for entry {entry_id}")
+            entries_changed(entry.user, "analysis-completed", analysis_event(entry))
+            logger.info("Completed mood analysis for entry %s", entry_id)
     except Exception as e:
-        logger.error(f"Failed to analyze entry {entry_id}: {e}")
+        logger.error("Failed to analyze entry %s: %s", entry_id, e)
 
 
 @router.post("/", response_model=JournalEntrySchema)
@@ -48,15 +95,25 @@ async def create_journal_entry(
     Create a new journal entry with automatic mood analysis.
     """
     try:
+        vector = vectorize(entry_data.title, entry_data.content)
         db_entry = JournalEntry(
             user_id=current_user.id,
             title=entry_data.title,
-            content=entry_data.content
+            content=entry_data.content,
+            embedding=encode_vector(vector)
         )
         
         db.add(db_entry)
+        if settings.analysis_mode == "queue":
+            db.flush()
+            enqueue_analysis(db, db_entry.id, current_user.id)
         db.commit()
         db.refresh(db_entry)
+        similarity_index.upsert(db_entry, vector)
+        entries_changed(current_user, "entry-changed", {"id": db_entry.id, "action": "created"})
+
+        if settings.analysis_mode == "queue":
+            return db_entry
         
         try:
             analysis = await mood_analysis_service.analyze_journal_entry(
@@ -64,61 +121,247 @@ async def create_journal_entry(
                 entry_data.content
             )
             
-            db_entry.mood = analysis['mood']
-            db_entry.mood_score = analysis['mood_score']
-            db_entry.top_emotions = analysis['top_emotions']
-            db_entry.summary = analysis['summary']
-            db_entry.analysis_completed = True
+            apply_analysis(db_entry, analysis)
             db.commit()
             db.refresh(db_entry)
+            entries_changed(current_user, "analysis-completed", analysis_event(db_entry))
             
-            logger.info(f"Completed mood analysis for entry {db_entry.id}")
+            logger.info("Completed mood analysis for entry %s", db_entry.id)
             
         except Exception as analysis_error:
-            logger.error(f"Failed to analyze entry {db_entry.id}: {analysis_error}")
+            logger.error("Failed to analyze entry %s: %s", db_entry.id, analysis_error)
             pass
         
         return db_entry
         
     except Exception as e:
-        logger.error(f"Error creating journal entry: {e}")
+        logger.error("Error creating journal entry: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create journal entry"
         )
 
 
+@router.get("/events")
+async def stream_journal_events(
+    last_event_id: Optional[str] = Header(None),
+    user_id: int = Depends(get_current_active_user_id)
+):
+    """
+    Server-sent event stream of the current user's entry changes and
+    completed analyses. Reconnect with Last-Event-ID to resume; a "resync"
+    event means the client should refetch its entries.
+    """
+    return StreamingResponse(
+        event_broker.stream(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/batch", response_model=List[JournalEntryBatchItem])
+async def get_journal_entries_batch(
+    ids: str = Query(..., description="Comma-separated entry IDs"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    Get several journal entries by ID in one request. Results follow the
+    order of ids, with found=false for IDs that don't exist or belong to
+    another user.
+    """
+    try:
+        entry_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+
+    if not entry_ids or len(entry_ids) > settings.batch_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {settings.batch_max_ids} ids"
+        )
+
+    entries = db.query(JournalEntry).options(undefer_group("body")).filter(
+        JournalEntry.user_id == current_user.id,
+        JournalEntry.id.in_(set(entry_ids))
+    ).all()
+    by_id = {entry.id: entry for entry in entries}
+
+    return [
+        {"id": entry_id, "found": entry_id in by_id, "entry": by_id.get(entry_id)}
+        for entry_id in entry_ids
+    ]
+
+
+@router.get("/changes", response_model=JournalChanges)
+async def get_journal_changes(
+    since: Optional[str] = Query(None, description="Sync token from the previous call; omit for a full sync"),
+    limit: int = Query(settings.sync_page_size, ge=1, le=1000, description="Maximum entries per page"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    Entries created or updated and ids deleted since a sync token. Keep
+    calling with the returned token while has_more is true.
+    """
+    try:
+        return get_changes(db, current_user.id, since, limit)
+    except SyncTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    except SyncTokenExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, perform a full sync"
+        )
+
+
+@router.get("/emotions", response_model=List[EmotionCount])
+async def get_emotion_counts(
+    include_archived: bool = Query(False, description="Also count archived entries"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    How many of the current user's entries list each emotion, most
+    frequent first.
+    """
+    cache_key = journal_cache.key(current_user.id, "emotions", {"include_archived": True} if include_archived else {})
+    cached = journal_cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+
+    counts = emotion_counts(db, current_user.id)
+    if include_archived:
+        counts = merge_emotion_counts(counts, archived_emotion_counts(db, current_user.id))
+    journal_cache.set(cache_key, json.dumps(counts))
+    return counts
+
+
+@router.get("/export")
+async def export_journal_entries(
+    include_archived: bool = Query(False, description="Also export archived entries"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    All of the current user's entries as newline-delimited JSON, oldest
+    first, read in batches of EXPORT_BATCH_SIZE.
+    """
+    models = [JournalEntry, ArchivedJournalEntry] if include_archived else [JournalEntry]
+
+    def lines():
+        for model in models:
+            last_id = 0
+            while True:
+                entries = db.query(model).options(undefer_group("body")).filter(
+                    model.user_id == current_user.id,
+                    model.id > last_id
+                ).order_by(model.id).limit(settings.export_batch_size).all()
+                if not entries:
+                    break
+                for entry in entries:
+                    yield JournalEntrySchema.model_validate(entry).model_dump_json() + "\n"
+                last_id = entries[-1].id
+                db.expunge_all()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/digests", response_model=List[JournalDigestSchema])
+async def get_journal_digests(
+    period: str = Query("week", pattern="^(week|month)$", description="week or month"),
+    limit: int = Query(4, ge=1, le=24, description="Maximum number of digests to return"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    Get the current user's precomputed weekly or monthly digests, newest
+    first. Digests are generated overnight, so today's entries show up the
+    next day.
+    """
+    return db.query(JournalDigest).filter(
+        JournalDigest.user_id == current_user.id,
+        JournalDigest.period == period
+    ).order_by(desc(JournalDigest.period_start)).limit(limit).all()
+
+
 @router.get("/", response_model=List[JournalEntrySchema])
 async def get_journal_entries(
     mood: Optional[str] = Query(None, description="Filter by mood"),
+    emotion: Optional[str] = Query(None, description="Filter by one of the entry's top emotions"),
     min_mood_score: Optional[float] = Query(None, description="Minimum mood score"),
     max_mood_score: Optional[float] = Query(None, description="Maximum mood score"),
     limit: int = Query(20, le=100, description="Maximum number of entries to return"),
     offset: int = Query(0, ge=0, description="Number of entries to skip"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    user_id: int = Depends(get_current_active_user_id)
 ):
     """
     Get journal entries for the current user with optional filtering.
     """
+    # Keyed on mood exactly as the ilike below uses it.
+    cache_params = {
+        "mood": mood,
+        "emotion": normalize_emotion(emotion) if emotion else None,
+        "min_mood_score": min_mood_score,
+        "max_mood_score": max_mood_score,
+        "limit": limit,
+        "offset": offset
+    }
+    cache_key = journal_cache.key(user_id, "list", cache_params)
+    cached = journal_cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+
+    def load_page() -> bytes:
+        # Runs in a thread with its own session: the request that started
+        # the flight may finish (or disconnect) before the others. The
+        # user is resolved without holding a session, so each request
+        # uses one pooled connection at a time.
+        db = get_read_session(str(user_id))
+        try:
+            query = db.query(JournalEntry).options(undefer_group("body")).filter(
+                JournalEntry.user_id == user_id
+            )
+
+            if mood:
+                query = query.filter(JournalEntry.mood.ilike(f"%{mood}%"))
+
+            if emotion:
+                query = query.filter(JournalEntry.id.in_(
+                    db.query(JournalEntryEmotion.entry_id).filter(
+                        JournalEntryEmotion.user_id == user_id,
+                        JournalEntryEmotion.emotion == normalize_emotion(emotion)
+                    )
+                ))
+
+            if min_mood_score is not None:
+                query = query.filter(JournalEntry.mood_score >= min_mood_score)
+
+            if max_mood_score is not None:
+                query = query.filter(JournalEntry.mood_score <= max_mood_score)
+
+            entries = query.order_by(desc(JournalEntry.created_at)).offset(offset).limit(limit).all()
+            payload = entry_list_adapter.dump_json(
+                entry_list_adapter.validate_python(entries, from_attributes=True)
+            )
+        finally:
+            db.close()
+
+        journal_cache.set(cache_key, payload.decode())
+        return payload
+
     try:
-        query = db.query(JournalEntry).filter(JournalEntry.user_id == current_user.id)
-        
-        if mood:
-            query = query.filter(JournalEntry.mood.ilike(f"%{mood}%"))
-        
-        if min_mood_score is not None:
-            query = query.filter(JournalEntry.mood_score >= min_mood_score)
-            
-        if max_mood_score is not None:
-            query = query.filter(JournalEntry.mood_score <= max_mood_score)
-        
-        entries = query.order_by(desc(JournalEntry.created_at)).offset(offset).limit(limit).all()
-        
-        return entries
+        key = (user_id, "list", json.dumps(cache_params, sort_keys=True))
+        return json_response(await list_flights.run(key, lambda: run_in_threadpool(load_page)))
         
     except Exception as e:
-        logger.error(f"Error fetching journal entries: {e}")
+        logger.error("Error fetching journal entries: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch journal entries"
@@ -128,26 +371,76 @@ async def get_journal_entries(
 @router.get("/{entry_id}", response_model=JournalEntrySchema)
 async def get_journal_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    include_archived: bool = Query(False, description="Fall back to archived entries"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
 ):
     """
     Get a specific journal entry by ID.
     """
-    entry = db.query(JournalEntry).filter(
+    cache_key = journal_cache.key(current_user.id, "entry", {"id": entry_id})
+    cached = journal_cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+
+    entry = db.query(JournalEntry).options(undefer_group("body")).filter(
         JournalEntry.id == entry_id,
         JournalEntry.user_id == current_user.id
     ).first()
+    if not entry and include_archived:
+        entry = get_archived_entry(db, current_user.id, entry_id)
     
     if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Journal entry not found"
         )
+
+    # Archived entries aren't cached: the key is shared with requests that
+    # don't ask for them.
+    if cache_key is not None and isinstance(entry, JournalEntry):
+        payload = JournalEntrySchema.model_validate(entry).model_dump_json()
+        journal_cache.set(cache_key, payload)
+        return json_response(payload)
     
     return entry
 
 
+@router.get("/{entry_id}/similar", response_model=List[SimilarJournalEntry])
+async def get_similar_journal_entries(
+    entry_id: int,
+    limit: int = Query(5, ge=1, le=50, description="Maximum number of entries to return"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
+):
+    """
+    Get the current user's other entries most similar in wording to this
+    one, best match first.
+    """
+    matches = similarity_index.search(db, current_user.id, entry_id, limit)
+    if matches is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Journal entry not found"
+        )
+
+    by_id = {
+        entry.id: entry
+        for entry in db.query(JournalEntry).options(undefer_group("body")).filter(
+            JournalEntry.user_id == current_user.id,
+            JournalEntry.id.in_([match_id for match_id, _ in matches])
+        )
+    }
+    return [
+        SimilarJournalEntry(
+            **JournalEntrySchema.model_validate(by_id[match_id]).model_dump(),
+            similarity=round(score, 4)
+        )
+        for match_id, score in matches
+        if match_id in by_id
+    ]
+
+
 @router.put("/{entry_id}", response_model=JournalEntrySchema)
 async def update_journal_entry(
     entry_id: int,
@@ -177,17 +470,34 @@ async def update_journal_entry(
         if entry_data.content is not None:
             entry.content = entry_data.content
             title_or_content_changed = True
+
+        if title_or_content_changed:
+            vector = vectorize(entry.title, entry.content)
+            entry.embedding = encode_vector(vector)
+
+        queued = title_or_content_changed and settings.analysis_mode == "queue"
+        if queued:
+            entry.mood = None
+            entry.mood_score = None
+            set_entry_emotions(entry, [])
+            entry.summary = None
+            entry.analysis_completed = False
+            enqueue_analysis(db, entry.id, current_user.id)
         
         db.commit()
         db.refresh(entry)
-        
         if title_or_content_changed:
+            similarity_index.upsert(entry, vector)
+        entries_changed(current_user, "entry-changed", {"id": entry.id, "action": "updated"})
+        
+        if title_or_content_changed and not queued:
             entry.mood = None
             entry.mood_score = None
-            entry.top_emotions = []
+            set_entry_emotions(entry, [])
             entry.summary = None
             entry.analysis_completed = False
             db.commit()
+            entries_changed(current_user)
             
             try:
                 analysis = await mood_analysis_service.analyze_journal_entry(
@@ -195,24 +505,21 @@ async def update_journal_entry(
                     entry.content
                 )
                 
-                entry.mood = analysis['mood']
-                entry.mood_score = analysis['mood_score']
-                entry.top_emotions = analysis['top_emotions']
-                entry.summary = analysis['summary']
-                entry.analysis_completed = True
+                apply_analysis(entry, analysis)
                 db.commit()
                 db.refresh(entry)
+                entries_changed(current_user, "analysis-completed", analysis_event(entry))
                 
-                logger.info(f"Completed mood analysis for updated entry {entry.id}")
+                logger.info("Completed mood analysis for updated entry %s", entry.id)
                 
             except Exception as analysis_error:
-                logger.error(f"Failed to analyze updated entry {entry.id}: {analysis_error}")
+                logger.error("Failed to analyze updated entry %s: %s", entry.id, analysis_error)
                 pass
         
         return entry
         
     except Exception as e:
-        logger.error(f"Error updating journal entry: {e}")
+        logger.error("Error updating journal entry: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update journal entry"
@@ -226,11 +533,14 @@ async def delete_journal_entry(
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Delete a journal entry.
+    Delete a journal entry, archived or not.
     """
     entry = db.query(JournalEntry).filter(
         JournalEntry.id == entry_id,
         JournalEntry.user_id == current_user.id
+    ).first() or db.query(ArchivedJournalEntry).filter(
+        ArchivedJournalEntry.id == entry_id,
+        ArchivedJournalEntry.user_id == current_user.id
     ).first()
     
     if not entry:
@@ -241,12 +551,16 @@ async def delete_journal_entry(
     
     try:
         db.delete(entry)
+        db.add(JournalEntryTombstone(entry_id=entry.id, user_id=current_user.id))
+        prune_tombstones(db, current_user.id)
         db.commit()
+        similarity_index.remove(current_user.id, entry_id)
+        entries_changed(current_user, "entry-changed", {"id": entry_id, "action": "deleted"})
         
         return {"message": "Journal entry deleted successfully"}
         
     except Exception as e:
-        logger.error(f"Error deleting journal entry: {e}")
+        logger.error("Error deleting journal entry: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete journal entry"
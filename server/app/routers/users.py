@@ -1,26 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.account_deletion import delete_account_in_background, request_deletion
 from app.database import get_db
 from app.models import User
-from app.schemas import User as UserSchema
-from app.auth import get_current_active_user
+from app.schemas import ApiResponse, User as UserSchema
+from app.auth import get_current_active_reader, get_current_active_user, get_read_db
 
 router = APIRouter()
 
 
 @router.get("/me", response_model=UserSchema)
-async def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_profile(current_user: User = Depends(get_current_active_reader)):
     """
     Get current user profile.
     """
     return current_user
 
 
+@router.delete("/me", response_model=ApiResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_current_user(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Delete the current user's account and all of its entries. The account
+    is deactivated immediately; its data is removed in the background.
+    """
+    user_id = current_user.id
+    request_deletion(db, current_user)
+    background_tasks.add_task(delete_account_in_background, user_id)
+    return ApiResponse(success=True, message="Account scheduled for deletion")
+
+
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_reader)
 ):
     """
     Get user by ID (for future use if needed).
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 class UserBase(BaseModel):
@@ -34,6 +34,30 @@ class UserResponse(BaseModel):
     token_type: str = "bearer"
 
 
+class ProvisionUser(UserBase):
+    password: str
+
+
+class ProvisionUsersRequest(BaseModel):
+    users: List[ProvisionUser]
+
+
+class ProvisionedUser(BaseModel):
+    id: int
+    email: str
+    username: str
+
+
+class SkippedUser(BaseModel):
+    email: str
+    reason: str
+
+
+class ProvisionUsersResponse(BaseModel):
+    created: List[ProvisionedUser]
+    skipped: List[SkippedUser]
+
+
 class JournalEntryBase(BaseModel):
     title: str
     content: str
@@ -62,13 +86,52 @@ class JournalEntry(JournalEntryBase):
     analysis_completed: bool = False
 
 
+class SimilarJournalEntry(JournalEntry):
+    similarity: float
+
+
+class EmotionCount(BaseModel):
+    emotion: str
+    count: int
+
+
+class JournalDigest(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    period: str
+    period_start: date
+    period_end: date
+    entry_count: int
+    average_mood_score: Optional[float] = None
+    top_emotions: List[str] = []
+    summary: str
+    generated_at: Optional[datetime] = None
+
+
+class JournalEntryBatchItem(BaseModel):
+    id: int
+    found: bool
+    entry: Optional[JournalEntry] = None
+
+
+class JournalChanges(BaseModel):
+    entries: List[JournalEntry]
+    deleted: List[int]
+    sync_token: str
+    has_more: bool
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 
 class TokenData(BaseModel):
-    username: Optional[str] = None
+    user_id: int
+
+    @property
+    def subject(self) -> str:
+        return str(self.user_id)
 
 
 class ApiResponse(BaseModel):
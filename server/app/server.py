@@ -0,0 +1,113 @@
+"""
+Process launcher for the API.
+
+Development runs a single reloading process. Production runs one uvicorn
+worker per CPU (or WORKERS), with database pools sized so the whole fleet
+stays inside the Postgres connection budget.
+"""
+import importlib
+import logging
+import os
+from types import FrameType
+from typing import Optional
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+from app.config import Settings
+from app.events import event_broker
+from app.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class Server(uvicorn.Server):
+    """
+    uvicorn server that ends open event streams as soon as shutdown
+    starts. uvicorn waits for connections to close before the lifespan
+    shutdown runs, so an SSE client would otherwise hold every worker
+    until graceful_shutdown_timeout.
+    """
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]):
+        super().handle_exit(sig, frame)
+        event_broker.close()
+
+
+def serve(config: uvicorn.Config):
+    """
+    uvicorn.run() with the Server above, for reload, multi-worker and
+    single-process runs alike.
+    """
+    server = Server(config)
+    if config.should_reload:
+        ChangeReload(config, target=server.run, sockets=[config.bind_socket()]).run()
+    elif config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+        if not server.started:
+            raise SystemExit(3)
+
+
+def run_development(settings: Settings):
+    configure_logging()
+    serve(uvicorn.Config(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        reload=True,
+        log_config=None
+    ))
+
+
+def run_production(settings: Settings):
+    """
+    Run multiple worker processes with graceful shutdown.
+
+    On SIGTERM uvicorn stops accepting connections, event streams are
+    ended, and uvicorn waits up to graceful_shutdown_timeout for in-flight
+    requests; the app lifespan
+    then drains pending mood analyses before the pool is disposed.
+    """
+    configure_logging()
+    workers = settings.worker_count
+    if workers > 1 and settings.cache_backend == "memory":
+        # Each worker would only invalidate its own copy.
+        raise SystemExit("CACHE_BACKEND=memory only works with one worker; set WORKERS=1 or CACHE_BACKEND=redis")
+    if workers > 1 and settings.cache_backend != "redis":
+        logger.warning(
+            "Live events are per worker without CACHE_BACKEND=redis; a stream on one worker "
+            "misses writes handled by another until the client reconnects"
+        )
+    if workers > 1 and settings.replica_urls and settings.cache_backend != "redis":
+        logger.warning(
+            "Read-your-writes pins are per worker without CACHE_BACKEND=redis; "
+            "a read on another worker may hit a lagging replica"
+        )
+
+    # Workers are spawned, not forked, so they re-read settings from the
+    # environment. Pin the resolved count so every worker computes the
+    # same per-worker pool slice as the supervisor.
+    os.environ["WORKERS"] = str(workers)
+    pool_size, max_overflow = settings.db_pool_limits
+
+    if settings.preload_app:
+        # Importing in the supervisor fails fast on configuration errors
+        # instead of crash-looping N workers. Only the module is loaded;
+        # no database connections are opened before workers start.
+        importlib.import_module("main")
+
+    logger.info(
+        "Starting %d workers (db pool %d+%d per worker, %d/%d connections)",
+        workers, pool_size, max_overflow, workers * (pool_size + max_overflow), settings.db_max_connections
+    )
+
+    serve(uvicorn.Config(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+        # Logging is configured by app.logging_config in every process.
+        log_config=None
+    ))
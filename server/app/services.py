@@ -1,8 +1,16 @@
+import asyncio
+import hashlib
 import logging
-import openai
 import json
-from typing import Dict, Any
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Any, List, Optional
 from app.config import get_settings
+from app.emotions import set_entry_emotions
+from app.model_routing import ModelRoute, model_router
+from app.profiling import profile_phase
+from app.singleflight import SingleFlight
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -32,23 +40,23 @@ def parse_mood_analysis_response(response_text: str) -> Dict[str, Any]:
         
         required_fields = ['mood', 'mood_score', 'top_emotions', 'summary']
         if not all(field in data for field in required_fields):
-            logger.error(f"Missing required fields in response: {data}")
+            logger.error("Missing required fields in response: %s", sorted(data) if isinstance(data, dict) else type(data).__name__)
             return None
         
         if not isinstance(data['mood'], str):
-            logger.error(f"Invalid mood type: {type(data['mood'])}")
+            logger.error("Invalid mood type: %s", type(data['mood']))
             return None
             
         if not isinstance(data['mood_score'], (int, float)) or not (1 <= data['mood_score'] <= 10):
-            logger.error(f"Invalid mood_score: {data['mood_score']}")
+            logger.error("Invalid mood_score: %r", data['mood_score'])
             return None
             
         if not isinstance(data['top_emotions'], list):
-            logger.error(f"Invalid top_emotions type: {type(data['top_emotions'])}")
+            logger.error("Invalid top_emotions type: %s", type(data['top_emotions']))
             return None
             
         if not isinstance(data['summary'], str):
-            logger.error(f"Invalid summary type: {type(data['summary'])}")
+            logger.error("Invalid summary type: %s", type(data['summary']))
             return None
         
         parsed_data = {
@@ -61,14 +69,30 @@ def parse_mood_analysis_response(response_text: str) -> Dict[str, Any]:
         return parsed_data
         
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON response: {e}")
-        logger.error(f"Response text: {response_text}")
+        logger.error("Failed to parse JSON response: %s", e)
+        logger.debug("Response text: %.500s", response_text)
         return None
     except Exception as e:
-        logger.error(f"Unexpected error parsing response: {e}")
+        logger.error("Unexpected error parsing response: %s", e)
         return None
 
 
+def format_digest_prompt(period_label: str, summaries: List[str], average_mood_score: Optional[float], top_emotions: List[str]) -> str:
+    entries = "\n".join(f"- {summary}" for summary in summaries)
+    prompt = f"""
+Write a short, warm "{period_label} in review" for the author of these journal entries.
+In 3-5 sentences, describe the main themes, how their mood developed, and one encouraging observation.
+Address the author as "you". Respond with plain text only.
+
+Average mood score (1-10): {average_mood_score if average_mood_score is not None else "unknown"}
+Most frequent emotions: {", ".join(top_emotions) or "unknown"}
+
+Entry summaries, oldest first:
+{entries}
+"""
+    return prompt.strip()
+
+
 def get_fallback_analysis() -> Dict[str, Any]:
     """
     Return a fallback analysis when OpenAI analysis fails.
@@ -81,87 +105,246 @@ def get_fallback_analysis() -> Dict[str, Any]:
     }
 
 
+def apply_analysis(entry, analysis: Dict[str, Any]):
+    """
+    Write an analysis onto a JournalEntry, including its emotion rows.
+    """
+    entry.mood = analysis['mood']
+    entry.mood_score = analysis['mood_score']
+    set_entry_emotions(entry, analysis['top_emotions'])
+    entry.summary = analysis['summary']
+    entry.analysis_completed = True
+
+
+class AnalysisError(Exception):
+    """
+    The LLM could not produce an analysis (not configured, rate limited,
+    timed out, or answered with something unparsable). Worth retrying.
+    """
+
+
 class MoodAnalysisService:
     """
     Service class for handling mood analysis using OpenAI GPT API.
     """
     
     def __init__(self):
-        self.client = None
-        if settings.openai_api_key and settings.openai_api_key != "your-openai-api-key-here":
-            try:
-                self.client = openai.OpenAI(api_key=settings.openai_api_key)
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
-        else:
+        self._client = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
+        self._pending = set()
+        self.flights = SingleFlight(settings.singleflight_analysis_window_seconds)
+
+    @property
+    def client(self):
+        """
+        OpenAI client, created on first use.
+
+        Importing openai dominates worker boot time, so it is deferred until
+        an analysis actually needs it (or until warm_up runs after startup).
+        """
+        if not self._client_initialized:
+            with self._client_lock:
+                if not self._client_initialized:
+                    self._client = self._create_client()
+                    self._client_initialized = True
+        return self._client
+
+    def _create_client(self):
+        if not settings.openai_api_key or settings.openai_api_key == "your-openai-api-key-here":
             logger.warning("OpenAI API key not configured")
+            return None
+        try:
+            import openai
+            return openai.OpenAI(api_key=settings.openai_api_key)
+        except Exception as e:
+            logger.error("Failed to initialize OpenAI client: %s", e)
+            return None
+
+    def warm_up(self):
+        self.client
     
-    async def analyze_journal_entry(self, title: str, content: str) -> Dict[str, Any]:
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Wait for in-flight analyses to finish during shutdown.
+
+        Returns True if everything finished within the timeout.
+        """
+        if not self._pending:
+            return True
+        logger.info("Waiting for %d pending mood analyses", len(self._pending))
+        _, still_pending = await asyncio.wait(set(self._pending), timeout=timeout)
+        if still_pending:
+            logger.warning("%d mood analyses did not finish before shutdown", len(still_pending))
+        return not still_pending
+
+    async def analyze_journal_entry(self, title: str, content: str, fallback: bool = True) -> Dict[str, Any]:
         """
         Analyze a journal entry and return mood analysis data.
-        
+
+        Runs as a tracked task so shutdown can drain it instead of cutting
+        the OpenAI call off mid-flight. The blocking client call runs in a
+        thread, so concurrent analyses (e.g. in app.worker) overlap.
+        Concurrent calls for the same title and content (a double-tapped
+        save) share one analysis.
+
         Args:
             title (str): The journal entry title
             content (str): The journal entry content to analyze
-            
+            fallback (bool): Return get_fallback_analysis() when the LLM
+                fails instead of raising AnalysisError
+
         Returns:
             dict: Dictionary containing mood, mood_score, top_emotions, and summary
         """
-        if not self.client:
-            logger.warning("OpenAI client not available, returning fallback analysis")
+        key = hashlib.sha256(f"{title}\0{content}".encode("utf-8")).hexdigest()
+        try:
+            return await self.flights.run(key, lambda: self._start(title, content))
+        except AnalysisError:
+            if not fallback:
+                raise
             return get_fallback_analysis()
-        
+
+    def _start(self, title: str, content: str) -> asyncio.Task:
+        task = asyncio.ensure_future(self._analyze(title, content))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _analyze(self, title: str, content: str) -> Dict[str, Any]:
         if not content or not content.strip():
             logger.warning("Empty entry content provided")
             return get_fallback_analysis()
+
+        if not self.client:
+            logger.warning("OpenAI client not available")
+            raise AnalysisError("OpenAI client not available")
         
+        import openai
+
+        prompt = format_mood_analysis_prompt(title or "Untitled", content)
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that analyzes journal entries for mood and emotional content. Always respond with valid JSON only."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        route = model_router.choose(len(title or "") + len(content))
+
         try:
-            prompt = format_mood_analysis_prompt(title or "Untitled", content)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that analyzes journal entries for mood and emotional content. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=300,
-                temperature=0.3,
-                timeout=30
-            )
-            
-            response_text = response.choices[0].message.content
-            logger.info(f"OpenAI response received: {response_text[:100]}...")
+            try:
+                response_text = await asyncio.to_thread(self._complete, route, messages, 0.3)
+            except openai.RateLimitError:
+                if route.model == model_router.fast_model:
+                    raise
+                logger.warning("%s rate limited, retrying with %s", route.model, model_router.fast_model)
+                route = model_router.fast_route("rate-limited")
+                response_text = await asyncio.to_thread(self._complete, route, messages, 0.3)
+
+            logger.debug("OpenAI response received from %s (%s): %.100s", route.model, route.reason, response_text)
             
             analysis_data = parse_mood_analysis_response(response_text)
             
             if analysis_data:
-                logger.info("Successfully parsed mood analysis data")
+                logger.debug("Successfully parsed mood analysis data")
                 return analysis_data
             else:
-                logger.error("Failed to parse OpenAI response, using fallback")
-                return get_fallback_analysis()
+                logger.error("Failed to parse OpenAI response")
+                raise AnalysisError("Unparsable response")
                 
-        except openai.AuthenticationError:
+        except openai.AuthenticationError as e:
             logger.error("OpenAI authentication failed - check API key")
-            return get_fallback_analysis()
+            raise AnalysisError("OpenAI authentication failed") from e
         
-        except openai.RateLimitError:
+        except openai.RateLimitError as e:
             logger.error("OpenAI rate limit exceeded")
-            return get_fallback_analysis()
+            raise AnalysisError("OpenAI rate limit exceeded") from e
         
-        except openai.APITimeoutError:
-            logger.error("OpenAI API request timed out")
-            return get_fallback_analysis()
+        except openai.APITimeoutError as e:
+            logger.error("OpenAI API request timed out after %ss (%s)", route.timeout, route.model)
+            raise AnalysisError(f"Timed out after {route.timeout}s ({route.model})") from e
+
+        except AnalysisError:
+            raise
         
         except Exception as e:
-            logger.error(f"Unexpected error during mood analysis: {e}")
-            return get_fallback_analysis()
+            logger.error("Unexpected error during mood analysis: %s", e)
+            raise AnalysisError(str(e)) from e
+
+    def _complete(self, route: ModelRoute, messages: List[Dict[str, str]], temperature: float) -> str:
+        """
+        Run one chat completion on the routed model and record its latency
+        and outcome for future routing decisions.
+        """
+        import openai
+
+        start = time.perf_counter()
+        try:
+            with profile_phase("llm"):
+                response = self.client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    max_tokens=route.max_tokens,
+                    temperature=temperature,
+                    timeout=route.timeout
+                )
+        except openai.RateLimitError:
+            model_router.record(route.model, None, success=False, rate_limited=True)
+            raise
+        except openai.APITimeoutError:
+            model_router.record(route.model, route.timeout, success=False)
+            raise
+        except Exception:
+            model_router.record(route.model, None, success=False)
+            raise
+        model_router.record(route.model, time.perf_counter() - start, success=True)
+        return response.choices[0].message.content
+
+    async def summarize_period(self, period_label: str, summaries: List[str], average_mood_score: Optional[float], top_emotions: List[str]) -> Optional[str]:
+        """
+        Narrative digest of a period's entry summaries, or None when the
+        client is unavailable or the call fails.
+
+        The blocking client call runs in a thread so batch digests don't
+        stall requests served by the same event loop.
+        """
+        if not self.client or not summaries:
+            return None
+
+        import openai
+
+        prompt = format_digest_prompt(period_label, summaries, average_mood_score, top_emotions)
+        route = replace(model_router.choose(len(prompt)), max_tokens=250, timeout=60)
+
+        try:
+            response_text = await asyncio.to_thread(
+                self._complete,
+                route,
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a supportive assistant that writes brief reviews of a person's journal."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                0.5
+            )
+            return response_text.strip()
+
+        except openai.OpenAIError as e:
+            logger.error("Failed to generate %s digest: %s", period_label, e)
+            return None
 
 
 mood_analysis_service = MoodAnalysisService() 
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+"Related entries" search over locally computed text vectors.
+
+Each entry gets a signed, hashed term-frequency vector (sublinear TF,
+stop words removed, title counted twice), L2-normalized and stored in
+journal_entries.embedding. No network calls are involved.
+
+Per-user vectors are kept in memory as one float32 matrix, so a lookup
+is a single matrix-vector product. Writes in this worker update the
+matrix in place; writes from other workers are picked up on the next
+search by comparing the user's (count, max(updated_at)) with the
+database and fetching only the rows that changed.
+"""
+import logging
+import math
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import JournalEntry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z']+")
+
+STOP_WORDS = frozenset("""
+    about after again all also and any are because been before being but can
+    could did does doing down during each few for from further had has have
+    having her here hers herself him himself his how into its itself just
+    more most myself nor not now off once only other our ours ourselves out
+    over own same she should some such than that the their theirs them
+    themselves then there these they this those through too under until very
+    was were what when where which while who whom why will with would you
+    your yours yourself yourselves i'm i've it's don't didn't today really
+    feel felt like got get
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 2 and token not in STOP_WORDS]
+
+
+def vectorize(title: str, content: str, dimensions: int = settings.similarity_dimensions) -> np.ndarray:
+    counts = Counter(tokenize(title) * 2 + tokenize(content))
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token, count in counts.items():
+        # crc32 rather than hash(), which is salted per process.
+        digest = zlib.crc32(token.encode())
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % dimensions] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    return vector.astype(np.float32).tobytes()
+
+
+def decode_vector(data: Optional[bytes], dimensions: int = settings.similarity_dimensions) -> Optional[np.ndarray]:
+    """
+    None when the stored vector is missing or was computed with a
+    different SIMILARITY_DIMENSIONS.
+    """
+    if not data or len(data) != dimensions * 4:
+        return None
+    return np.frombuffer(data, dtype=np.float32)
+
+
+class UserVectors:
+    """
+    One user's vectors as rows of a preallocated matrix that grows by
+    doubling; deletes move the last row into the hole.
+    """
+
+    def __init__(self, dimensions: int):
+        self.matrix = np.zeros((16, dimensions), dtype=np.float32)
+        self.ids = np.zeros(16, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self.size = 0
+        self.count = 0
+        self.synced_through: Optional[datetime] = None
+
+    def upsert(self, entry_id: int, vector: np.ndarray):
+        row = self.rows.get(entry_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self.matrix = np.concatenate([self.matrix, np.zeros_like(self.matrix)])
+                self.ids = np.concatenate([self.ids, np.zeros_like(self.ids)])
+            row = self.rows[entry_id] = self.size
+            self.ids[row] = entry_id
+            self.size += 1
+        self.matrix[row] = vector
+
+    def remove(self, entry_id: int):
+        row = self.rows.pop(entry_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.size = last
+
+    def search(self, entry_id: int, limit: int) -> List[Tuple[int, float]]:
+        row = self.rows[entry_id]
+        scores = self.matrix[:self.size] @ self.matrix[row]
+        scores[row] = -1.0
+        k = min(limit, self.size - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def mark(self, updated_at: Optional[datetime]):
+        if updated_at is not None and (self.synced_through is None or updated_at > self.synced_through):
+            self.synced_through = updated_at
+
+
+class SimilarityIndex:
+    def __init__(self, dimensions: int, max_users: int):
+        self.dimensions = dimensions
+        self.max_users = max_users
+        self._users: "OrderedDict[int, UserVectors]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def upsert(self, entry: JournalEntry, vector: np.ndarray):
+        """
+        Apply a committed create or update; a no-op for users not loaded.
+        """
+        with self._lock:
+            vectors = self._users.get(entry.user_id)
+            if vectors is None:
+                return
+            if entry.id not in vectors.rows:
+                vectors.count += 1
+            vectors.upsert(entry.id, vector)
+            vectors.mark(entry.updated_at)
+
+    def remove(self, user_id: int, entry_id: int):
+        with self._lock:
+            vectors = self._users.get(user_id)
+            if vectors is not None and entry_id in vectors.rows:
+                vectors.remove(entry_id)
+                vectors.count -= 1
+
+    def forget(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def search(self, db: Session, user_id: int, entry_id: int, limit: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        (entry id, cosine similarity) pairs, best first, or None when the
+        entry doesn't exist for this user.
+        """
+        with self._lock:
+            vectors = self._sync(db, user_id)
+            if entry_id not in vectors.rows:
+                return None
+            return vectors.search(entry_id, limit)
+
+    def _sync(self, db: Session, user_id: int) -> UserVectors:
+        count, latest = db.query(func.count(JournalEntry.id), func.max(JournalEntry.updated_at)).filter(
+            JournalEntry.user_id == user_id
+        ).one()
+
+        vectors = self._users.get(user_id)
+        if vectors is not None:
+            self._users.move_to_end(user_id)
+            if vectors.count == count and vectors.synced_through == latest:
+                return vectors
+        else:
+            vectors = self._users[user_id] = UserVectors(self.dimensions)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+        query = db.query(JournalEntry.id, JournalEntry.updated_at, JournalEntry.embedding).filter(
+            JournalEntry.user_id == user_id
+        )
+        if vectors.synced_through is not None:
+            query = query.filter(JournalEntry.updated_at >= vectors.synced_through)
+
+        missing = []
+        for entry_id, updated_at, embedding in query:
+            vector = decode_vector(embedding, self.dimensions)
+            if vector is None:
+                missing.append(entry_id)
+            else:
+                vectors.upsert(entry_id, vector)
+            vectors.mark(updated_at)
+
+        if missing:
+            # Written before vectors existed; `python -m app.similarity backfill`
+            # stores them so this only happens once.
+            for entry_id, title, content in db.query(JournalEntry.id, JournalEntry.title, JournalEntry.content).filter(
+                JournalEntry.user_id == user_id,
+                JournalEntry.id.in_(missing)
+            ):
+                vectors.upsert(entry_id, vectorize(title, content, self.dimensions))
+
+        if vectors.size != count:
+            # Entries were deleted by another worker.
+            current = {entry_id for (entry_id,) in db.query(JournalEntry.id).filter(JournalEntry.user_id == user_id)}
+            for entry_id in set(vectors.rows) - current:
+                vectors.remove(entry_id)
+
+        vectors.count = count
+        vectors.synced_through = latest
+        return vectors
+
+
+similarity_index = SimilarityIndex(
+    dimensions=settings.similarity_dimensions,
+    max_users=settings.similarity_max_users
+)
+
+
+def backfill(db: Session, batch_size: int = 500) -> int:
+    """
+    Compute and store vectors for entries that have none or were computed
+    with different dimensions.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            JournalEntry.id, JournalEntry.user_id, JournalEntry.title, JournalEntry.content, JournalEntry.embedding
+        ).filter(JournalEntry.id > last_id).order_by(JournalEntry.id).limit(batch_size).all()
+        if not rows:
+            return updated
+        for entry_id, user_id, title, content, embedding in rows:
+            if decode_vector(embedding) is None:
+                # Setting updated_at to itself keeps onupdate from firing;
+                # the entry itself hasn't changed.
+                db.query(JournalEntry).filter(
+                    JournalEntry.id == entry_id,
+                    JournalEntry.user_id == user_id
+                ).update({
+                    JournalEntry.embedding: encode_vector(vectorize(title, content)),
+                    JournalEntry.updated_at: JournalEntry.updated_at
+                }, synchronize_session=False)
+                updated += 1
+        db.commit()
+        last_id = rows[-1].id
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Stored vectors for {backfill(db)} entries")
+    finally:
+        db.close()
@@ -0,0 +1,66 @@
+"""
+Request coalescing ("single flight").
+
+Concurrent callers asking for the same key share one computation: the
+first caller starts it as a task and later ones await the same task, so
+a burst of identical requests costs one database query or LLM call.
+
+A flight can only be joined for `window` seconds after it started;
+callers arriving later start a new one, so a slow call never hands out a
+result older than that. The task is shielded, so a caller that goes away
+(e.g. the client disconnected) doesn't cancel it for the others.
+Coalescing is per process.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Flight:
+    task: asyncio.Future
+    started: float
+
+
+class SingleFlight:
+    def __init__(self, window: float):
+        self.window = window
+        self._flights: Dict[Hashable, Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        The result of function(), or of the identical call already in flight.
+        """
+        now = time.monotonic()
+        flight = self._flights.get(key)
+        if flight is not None and now - flight.started < self.window:
+            self.shared += 1
+            return await asyncio.shield(flight.task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(function())
+        if self.window > 0:
+            flight = self._flights[key] = Flight(task, now)
+            task.add_done_callback(lambda _: self._discard(key, flight))
+        return await asyncio.shield(task)
+
+    def _discard(self, key: Hashable, flight: Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def forget(self, *prefix):
+        """
+        Stop sharing flights whose (tuple) key starts with prefix, e.g. after
+        a write their results may predate. Callers already waiting still get
+        the result.
+        """
+        for key in [key for key in self._flights if isinstance(key, tuple) and key[:len(prefix)] == prefix]:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "calls": self.calls, "shared": self.shared}
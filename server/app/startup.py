@@ -0,0 +1,47 @@
+"""
+Startup timing report.
+
+Records how long each import and initialization phase of a worker boot
+takes so cold-start regressions show up in the logs.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, str, float]] = []
+        self.ready_in: Optional[float] = None
+
+    @contextmanager
+    def phase(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((kind, name, time.perf_counter() - start))
+
+    def mark_ready(self):
+        """
+        Record time-to-ready and log the per-phase breakdown.
+        """
+        self.ready_in = time.perf_counter() - self.started_at
+        lines = [f"  {kind:<7} {name:<28} {seconds * 1000:8.1f} ms" for kind, name, seconds in self.phases]
+        logger.info("Startup completed in %.1f ms\n%s", self.ready_in * 1000, "\n".join(lines))
+
+    def as_dict(self) -> dict:
+        return {
+            "ready_ms": round(self.ready_in * 1000, 1) if self.ready_in is not None else None,
+            "phases": [
+                {"kind": kind, "name": name, "ms": round(seconds * 1000, 1)}
+                for kind, name, seconds in self.phases
+            ]
+        }
+
+
+startup_report = StartupReport()
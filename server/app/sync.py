@@ -0,0 +1,126 @@
+"""
+Delta sync for the mobile offline cache.
+
+A sync token is an opaque cursor over (updated_at, id) for entries and
+(deleted_at, id) for tombstones. While a client is catching up, tokens
+point exactly at the last row returned. Once it is caught up, the token
+is rewound by sync_overlap_seconds to the database clock, so rows from
+transactions that committed after their timestamp are re-sent rather
+than skipped; clients apply changes idempotently by id.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, undefer_group
+from app.config import get_settings
+from app.models import JournalEntry, JournalEntryTombstone
+
+settings = get_settings()
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SyncTokenError(ValueError):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+@dataclass
+class SyncCursor:
+    entries_at: datetime
+    entries_id: int
+    deleted_at: datetime
+    deleted_id: int
+
+
+def encode_sync_token(cursor: SyncCursor) -> str:
+    payload = json.dumps([
+        cursor.entries_at.isoformat(), cursor.entries_id,
+        cursor.deleted_at.isoformat(), cursor.deleted_id
+    ], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> SyncCursor:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        entries_at, entries_id, deleted_at, deleted_id = json.loads(base64.urlsafe_b64decode(padded))
+        return SyncCursor(
+            datetime.fromisoformat(entries_at), int(entries_id),
+            datetime.fromisoformat(deleted_at), int(deleted_id)
+        )
+    except (ValueError, TypeError) as e:
+        raise SyncTokenError("Invalid sync token") from e
+
+
+def _naive_if(reference: datetime, value: datetime) -> datetime:
+    """
+    SQLite returns naive timestamps while Postgres returns aware ones; keep
+    comparisons between like values.
+    """
+    if reference.tzinfo is None and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    if reference.tzinfo is not None and value.tzinfo is None:
+        return value.replace(tzinfo=reference.tzinfo)
+    return value
+
+
+def get_changes(db: Session, user_id: int, token: Optional[str], limit: int) -> dict:
+    """
+    Entries created or updated and ids deleted since the token. Without a
+    token this is a full sync (every entry, no tombstones).
+    """
+    now = db.scalar(select(func.now()))
+    if token:
+        cursor = decode_sync_token(token)
+        retention = timedelta(days=settings.sync_tombstone_retention_days)
+        if _naive_if(now, cursor.deleted_at) < now - retention:
+            raise SyncTokenExpired()
+    else:
+        cursor = SyncCursor(EPOCH, 0, now, 0)
+
+    entries = db.query(JournalEntry).options(undefer_group("body")).filter(
+        JournalEntry.user_id == user_id,
+        tuple_(JournalEntry.updated_at, JournalEntry.id) > (cursor.entries_at, cursor.entries_id)
+    ).order_by(JournalEntry.updated_at, JournalEntry.id).limit(limit + 1).all()
+
+    tombstones = db.query(JournalEntryTombstone).filter(
+        JournalEntryTombstone.user_id == user_id,
+        tuple_(JournalEntryTombstone.deleted_at, JournalEntryTombstone.id) > (cursor.deleted_at, cursor.deleted_id)
+    ).order_by(JournalEntryTombstone.deleted_at, JournalEntryTombstone.id).limit(limit + 1).all()
+
+    has_more = len(entries) > limit or len(tombstones) > limit
+    entries = entries[:limit]
+    tombstones = tombstones[:limit]
+
+    if has_more:
+        next_cursor = SyncCursor(
+            entries[-1].updated_at if entries else cursor.entries_at,
+            entries[-1].id if entries else cursor.entries_id,
+            tombstones[-1].deleted_at if tombstones else cursor.deleted_at,
+            tombstones[-1].id if tombstones else cursor.deleted_id
+        )
+    else:
+        rewound = now - timedelta(seconds=settings.sync_overlap_seconds)
+        next_cursor = SyncCursor(rewound, 0, rewound, 0)
+
+    return {
+        "entries": entries,
+        "deleted": [tombstone.entry_id for tombstone in tombstones],
+        "sync_token": encode_sync_token(next_cursor),
+        "has_more": has_more
+    }
+
+
+def prune_tombstones(db: Session, user_id: int):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.sync_tombstone_retention_days)
+    db.query(JournalEntryTombstone).filter(
+        JournalEntryTombstone.user_id == user_id,
+        JournalEntryTombstone.deleted_at < cutoff
+    ).delete(synchronize_session=False)
@@ -0,0 +1,214 @@
+"""
+Standalone mood analysis worker for ANALYSIS_MODE=queue.
+
+    python -m app.worker [--concurrency N] [--batch-size N]
+
+Claims jobs from analysis_jobs (see app.analysis_jobs), keeps up to
+ANALYSIS_WORKER_CONCURRENCY analyses in flight and writes each result
+back to its entry. Any number of worker processes can run on any number
+of hosts; they coordinate only through row locks and leases on the
+table. On SIGTERM or SIGINT the worker stops claiming and finishes the
+jobs it holds.
+
+An analysis is only written back if the entry's title and content are
+still the ones that were analyzed. When the LLM fails the job is retried
+with backoff, and marked failed after ANALYSIS_JOB_MAX_ATTEMPTS; the
+entry keeps analysis_completed=False rather than a placeholder mood.
+
+A written-back analysis pins the user's reads to the primary, invalidates
+their cached responses and, with CACHE_BACKEND=redis, makes their open
+event streams resync.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Optional, Set, Tuple
+from sqlalchemy.orm import undefer_group
+from app.analysis_jobs import ClaimedJob, claim_jobs, complete_job, heartbeat, retry_job
+from app.cache import journal_cache
+from app.config import get_settings
+from app.database import SessionLocal, read_router
+from app.events import event_broker
+from app.logging_config import configure_logging
+from app.models import JournalEntry
+from app.services import apply_analysis, mood_analysis_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    def __init__(self, concurrency: int, batch_size: int, poll_seconds: float, worker_id: Optional[str] = None):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.processed = 0
+        self._held: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping: Optional[asyncio.Event] = None
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, drain: bool = False):
+        """
+        Process jobs until stop() is called, or with drain, until the
+        queue has no due jobs left.
+        """
+        self._stopping = asyncio.Event()
+        beats = asyncio.create_task(self._heartbeats())
+        logger.info("Analysis worker %s started", self.worker_id)
+        try:
+            while not self._stopping.is_set():
+                capacity = self.concurrency - len(self._tasks)
+                if capacity <= 0:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                jobs = await asyncio.to_thread(self._claim, min(self.batch_size, capacity))
+                for job in jobs:
+                    self._held.add(job.id)
+                    task = asyncio.create_task(self._process(job))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                if not jobs:
+                    if drain and not self._tasks:
+                        break
+                    await self._idle()
+            if self._tasks:
+                await asyncio.wait(self._tasks)
+        finally:
+            beats.cancel()
+        logger.info("Analysis worker %s stopped after %d jobs", self.worker_id, self.processed)
+
+    async def _idle(self):
+        """
+        Wait for the poll interval, or less if the worker is stopped.
+        """
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _heartbeats(self):
+        interval = max(settings.analysis_job_lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            if self._held:
+                try:
+                    await asyncio.to_thread(self._heartbeat, list(self._held))
+                except Exception as e:
+                    logger.error("Heartbeat failed for worker %s: %s", self.worker_id, e)
+
+    async def _process(self, job: ClaimedJob):
+        try:
+            if job.attempts > settings.analysis_job_max_attempts:
+                await asyncio.to_thread(self._retry, job, "lease expired too many times")
+                return
+            entry = await asyncio.to_thread(self._load_entry, job)
+            if entry is None:
+                # The entry was deleted after the job was written.
+                await asyncio.to_thread(self._write_back, job, None, None, None)
+                return
+            title, content = entry
+            # LLM failures raise, so the job is retried with backoff rather
+            # than completed with the fallback analysis.
+            analysis = await mood_analysis_service.analyze_journal_entry(title, content, fallback=False)
+            await asyncio.to_thread(self._write_back, job, title, content, analysis)
+            self.processed += 1
+        except Exception as e:
+            logger.error("Analysis job %s for entry %s failed: %s", job.id, job.entry_id, e)
+            try:
+                await asyncio.to_thread(self._retry, job, str(e))
+            except Exception as retry_error:
+                # The lease runs out and another worker picks the job up.
+                logger.error("Failed to release analysis job %s: %s", job.id, retry_error)
+        finally:
+            self._held.discard(job.id)
+
+    def _claim(self, limit: int):
+        db = SessionLocal()
+        try:
+            return claim_jobs(db, self.worker_id, limit)
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_ids):
+        db = SessionLocal()
+        try:
+            heartbeat(db, self.worker_id, job_ids)
+        finally:
+            db.close()
+
+    def _retry(self, job: ClaimedJob, error: str):
+        db = SessionLocal()
+        try:
+            retry_job(db, job, self.worker_id, error)
+        finally:
+            db.close()
+
+    def _load_entry(self, job: ClaimedJob) -> Optional[Tuple[str, str]]:
+        db = SessionLocal()
+        try:
+            return db.query(JournalEntry.title, JournalEntry.content).filter(
+                JournalEntry.id == job.entry_id,
+                JournalEntry.user_id == job.user_id
+            ).first()
+        finally:
+            db.close()
+
+    def _write_back(self, job: ClaimedJob, title: Optional[str], content: Optional[str], analysis: Optional[dict]):
+        db = SessionLocal()
+        try:
+            applied = False
+            if analysis is not None:
+                entry = db.query(JournalEntry).options(undefer_group("body")).filter(
+                    JournalEntry.id == job.entry_id,
+                    JournalEntry.user_id == job.user_id
+                ).first()
+                if entry is not None and entry.title == title and entry.content == content:
+                    apply_analysis(entry, analysis)
+                    applied = True
+            complete_job(db, job.id, self.worker_id)
+            db.commit()
+            if applied:
+                # What entries_changed does for API writes, minus the
+                # in-process fan-out: open streams resync instead.
+                read_router.record_write(str(job.user_id))
+                journal_cache.invalidate_user(job.user_id)
+                event_broker.count_external(job.user_id)
+                logger.info("Completed mood analysis for entry %s", job.entry_id)
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mood analysis worker.")
+    parser.add_argument("--concurrency", type=int, default=settings.analysis_worker_concurrency)
+    parser.add_argument("--batch-size", type=int, default=settings.analysis_worker_batch_size)
+    parser.add_argument("--drain", action="store_true", help="exit once no jobs are due")
+    args = parser.parse_args()
+
+    configure_logging()
+    worker = AnalysisWorker(
+        concurrency=max(args.concurrency, 1),
+        batch_size=max(args.batch_size, 1),
+        poll_seconds=settings.analysis_worker_poll_seconds
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, worker.stop)
+        await worker.run(drain=args.drain)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the pure-Python functions on the request path: mood
+prompt formatting and response parsing, JWT creation and verification,
+and pydantic validation and serialization of entries and users.
+
+Each case runs on payloads the size the app actually sees (entries of
+0.5, 2 and 10 KB, list pages of 20 and 100). Timing calibrates a loop
+count per case, runs it --repeat times with the garbage collector off,
+and reports the median and minimum per call and the spread (interquartile
+range over median) so noisy runs are visible. Memory is the tracemalloc
+peak of one call, and blocks the number of memory blocks still allocated
+per call afterwards (roughly, the objects making up its result).
+
+Results can be saved as JSON and compared against a saved baseline; the
+comparison exits non-zero when a case got slower than --threshold.
+
+Usage (from the server directory):
+    python -m benchmarks.hot_functions
+    python -m benchmarks.hot_functions --save before.json
+    python -m benchmarks.hot_functions --compare before.json --threshold 10
+    python -m benchmarks.hot_functions --filter token
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+from pydantic import TypeAdapter
+from app.auth import create_access_token, verify_token
+from app.schemas import JournalEntry, UserResponse
+from app.services import format_mood_analysis_prompt, parse_mood_analysis_response
+from seed_data import SAMPLE_JOURNAL_ENTRIES
+
+entry_list_adapter = TypeAdapter(List[JournalEntry])
+
+ENTRY_SIZES = {"0.5kb": 500, "2kb": 2000, "10kb": 10000}
+PAGE_SIZES = (20, 100)
+MIN_SAMPLE_SECONDS = 0.02
+
+
+def build_text(rng: random.Random, size: int) -> str:
+    sentences = [
+        sentence
+        for sample in SAMPLE_JOURNAL_ENTRIES
+        for sentence in re.split(r"(?<=[.!?]) ", sample["content"])
+    ]
+    words = []
+    length = 0
+    while length < size:
+        sentence = rng.choice(sentences)
+        words.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(words)[:size]
+
+
+def build_entry(rng: random.Random, entry_id: int, size: int) -> SimpleNamespace:
+    """
+    An object shaped like a loaded JournalEntry row, for from_attributes.
+    """
+    sample = rng.choice(SAMPLE_JOURNAL_ENTRIES)
+    written = datetime(2026, 10, 19, 9, 30) - timedelta(hours=entry_id)
+    return SimpleNamespace(
+        id=entry_id,
+        user_id=1,
+        title=sample["title"],
+        content=build_text(rng, size),
+        created_at=written,
+        updated_at=written,
+        mood=sample["mood"],
+        mood_score=sample["mood_score"],
+        top_emotions=sample["top_emotions"],
+        summary=sample["summary"],
+        analysis_completed=True
+    )
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    rng = random.Random(0)
+    cases = {}
+
+    for label, size in ENTRY_SIZES.items():
+        title, content = "An evening walk", build_text(rng, size)
+        cases[f"format_mood_analysis_prompt[{label}]"] = lambda title=title, content=content: (
+            format_mood_analysis_prompt(title, content)
+        )
+
+    response_text = json.dumps({
+        "mood": "reflective",
+        "mood_score": 6.5,
+        "top_emotions": ["Calm", "Gratitude", " hope ", "Nostalgia"],
+        "summary": "A quiet walk by the river brought back memories of last summer and a sense of gratitude for "
+                   "the people who helped through a difficult month at work."
+    }, indent=2)
+    cases["parse_mood_analysis_response"] = lambda: parse_mood_analysis_response(response_text)
+
+    token = create_access_token({"sub": "1"})
+    cases["create_access_token"] = lambda: create_access_token({"sub": "1"})
+    cases["verify_token"] = lambda: verify_token(token)
+
+    entries = {label: build_entry(rng, 1, size) for label, size in ENTRY_SIZES.items()}
+    for label, entry in entries.items():
+        model = JournalEntry.model_validate(entry)
+        cases[f"JournalEntry.model_validate[{label}]"] = lambda entry=entry: JournalEntry.model_validate(entry)
+        cases[f"JournalEntry.model_dump_json[{label}]"] = lambda model=model: model.model_dump_json()
+
+    for size in PAGE_SIZES:
+        page = [build_entry(rng, entry_id, ENTRY_SIZES["2kb"]) for entry_id in range(1, size + 1)]
+        models = entry_list_adapter.validate_python(page, from_attributes=True)
+        cases[f"List[JournalEntry].validate[{size}]"] = lambda page=page: (
+            entry_list_adapter.validate_python(page, from_attributes=True)
+        )
+        cases[f"List[JournalEntry].dump_json[{size}]"] = lambda models=models: entry_list_adapter.dump_json(models)
+
+    user = SimpleNamespace(
+        id=1, username="alice", email="alice@example.com", first_name="Alice", last_name="Walker",
+        is_active=True, created_at=datetime(2026, 10, 19, tzinfo=timezone.utc)
+    )
+    response = UserResponse.model_validate({"user": user, "access_token": token}, from_attributes=True)
+    cases["UserResponse.model_validate"] = lambda: (
+        UserResponse.model_validate({"user": user, "access_token": token}, from_attributes=True)
+    )
+    cases["UserResponse.model_dump_json"] = lambda: response.model_dump_json()
+    return cases
+
+
+def calibrate(function: Callable[[], object]) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        if time.perf_counter() - start >= MIN_SAMPLE_SECONDS:
+            return loops
+        loops *= 2
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict:
+    for _ in range(3):
+        function()
+    loops = calibrate(function)
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(loops):
+                function()
+            samples.append((time.perf_counter_ns() - start) / loops / 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    quartiles = statistics.quantiles(samples, n=4)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    function()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    gc.collect()
+    calls = 100
+    before = sys.getallocatedblocks()
+    results = [function() for _ in range(calls)]
+    blocks = (sys.getallocatedblocks() - before) / calls
+    del results
+
+    median = statistics.median(samples)
+    return {
+        "median_us": round(median, 3),
+        "min_us": round(min(samples), 3),
+        "spread_pct": round((quartiles[2] - quartiles[0]) / median * 100, 1),
+        "peak_kib": round(peak / 1024, 2),
+        "blocks": round(blocks, 1),
+        "loops": loops,
+        "repeat": repeat
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Print the change in median time per case; return the regressed cases.
+    """
+    print(f"\n{'':<40}{'base us':>12}{'now us':>12}{'change':>9}")
+    regressed = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<40}{'-':>12}{result['median_us']:>12.2f}{'new':>9}")
+            continue
+        before = baseline[name]["median_us"]
+        change = (result["median_us"] - before) / before * 100
+        flag = ""
+        if change > threshold:
+            flag = "  slower"
+            regressed.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<40}{before:>12.2f}{result['median_us']:>12.2f}{change:>+8.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15, help="Timed samples per case")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression")
+    args = parser.parse_args()
+
+    cases = {name: function for name, function in build_cases().items() if args.filter in name}
+    print(f"{'':<40}{'median us':>12}{'min us':>10}{'spread':>8}{'peak KiB':>10}{'blocks':>8}")
+    results = {}
+    for name, function in cases.items():
+        result = results[name] = measure(function, args.repeat)
+        print(f"{name:<40}{result['median_us']:>12.2f}{result['min_us']:>10.2f}{result['spread_pct']:>7.1f}%"
+              f"{result['peak_kib']:>10.2f}{result['blocks']:>8.1f}")
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "results": results
+            }, output, indent=2)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as source:
+            baseline = json.load(source)["results"]
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            raise SystemExit(f"\n{len(regressed)} case(s) more than {args.threshold:g}% slower than {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Latency of related-entry search and incremental updates for one user.
+
+Usage (from the server directory):
+    python -m benchmarks.similarity
+    python -m benchmarks.similarity --entries 10000 --iterations 200
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+from app.config import get_settings
+from app.similarity import UserVectors, vectorize
+from seed_data import SAMPLE_JOURNAL_ENTRIES
+
+settings = get_settings()
+
+
+def timed_ms(function, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sentences = [
+        sentence
+        for sample in SAMPLE_JOURNAL_ENTRIES
+        for sentence in re.split(r"(?<=[.!?]) ", sample["content"])
+    ]
+
+    def random_vector():
+        return vectorize(rng.choice(SAMPLE_JOURNAL_ENTRIES)["title"], " ".join(rng.sample(sentences, 5)))
+
+    vectors = UserVectors(settings.similarity_dimensions)
+    start = time.perf_counter()
+    for entry_id in range(1, args.entries + 1):
+        vectors.upsert(entry_id, random_vector())
+    print(f"{args.entries} entries x {settings.similarity_dimensions} dimensions "
+          f"({vectors.matrix.nbytes / 1_000_000:.1f} MB allocated), built in {time.perf_counter() - start:.2f}s")
+
+    print(f"vectorize:   {timed_ms(random_vector, args.iterations):.3f} ms")
+    print(f"search (5):  {timed_ms(lambda: vectors.search(rng.randint(1, args.entries), 5), args.iterations):.3f} ms")
+    print(f"search (50): {timed_ms(lambda: vectors.search(rng.randint(1, args.entries), 50), args.iterations):.3f} ms")
+
+    vector = random_vector()
+    print(f"update:      {timed_ms(lambda: vectors.upsert(rng.randint(1, args.entries), vector), args.iterations):.3f} ms")
+    next_id = iter(range(args.entries + 1, args.entries * 2))
+    print(f"insert:      {timed_ms(lambda: vectors.upsert(next(next_id), vector), args.iterations):.3f} ms")
+    print(f"delete:      {timed_ms(lambda: vectors.remove(vectors.size), args.iterations):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
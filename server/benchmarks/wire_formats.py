@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Bytes on the wire and server CPU per response encoding.
+
+Builds journal list pages from the seed data and times each encoding the
+ContentNegotiationMiddleware can produce, using the configured levels.
+
+Usage (from the server directory):
+    python -m benchmarks.wire_formats
+    python -m benchmarks.wire_formats --sizes 20 100 --iterations 500
+"""
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from typing import List
+from pydantic import TypeAdapter
+from app.compression import _load_compressors, _load_msgpack
+from app.schemas import JournalEntry
+from seed_data import SAMPLE_JOURNAL_ENTRIES
+
+entry_list_adapter = TypeAdapter(List[JournalEntry])
+
+
+def build_page(size: int) -> bytes:
+    """
+    A page of entries whose content is reshuffled from seed sentences, so
+    large pages aren't just the seed data repeated (which would flatter
+    the compressors).
+    """
+    rng = random.Random(size)
+    sentences = [
+        sentence
+        for sample in SAMPLE_JOURNAL_ENTRIES
+        for sentence in re.split(r"(?<=[.!?]) ", sample["content"])
+    ]
+    now = datetime(2026, 10, 19, 9, 30)
+    entries = []
+    for index in range(size):
+        sample = rng.choice(SAMPLE_JOURNAL_ENTRIES)
+        entries.append(JournalEntry(
+            **{
+                **sample,
+                "content": " ".join(rng.sample(sentences, rng.randint(4, 8))),
+                "mood_score": round(rng.uniform(1, 10), 1)
+            },
+            id=1000 + index,
+            user_id=1,
+            created_at=now - timedelta(hours=index * 7),
+            updated_at=now - timedelta(hours=index * 7),
+            analysis_completed=True
+        ))
+    return entry_list_adapter.dump_json(entries)
+
+
+def cpu_microseconds(encode, payload, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        encode(payload)
+    return (time.process_time() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    compressors = _load_compressors()
+    packb = _load_msgpack()
+
+    for size in args.sizes:
+        body = build_page(size)
+        variants = [("json", body)]
+        if packb:
+            variants.append(("msgpack", packb(json.loads(body))))
+
+        print(f"\n{size}-entry page")
+        print(f"{'encoding':<18}{'bytes':>10}{'ratio':>8}{'cpu us':>10}")
+        for name, payload in variants:
+            print(f"{name:<18}{len(payload):>10}{len(payload) / len(body):>8.2f}{'-':>10}")
+            for encoding, compress in compressors.items():
+                compressed = compress(payload)
+                cost = cpu_microseconds(compress, payload, args.iterations)
+                print(f"{name + '+' + encoding:<18}{len(compressed):>10}{len(compressed) / len(body):>8.2f}{cost:>10.1f}")
+        if packb:
+            cost = cpu_microseconds(lambda data: packb(json.loads(data)), body, args.iterations)
+            print(f"(json -> msgpack transcoding: {cost:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,61 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from app.startup import startup_report
+
+with startup_report.phase("import", "fastapi"):
+    from fastapi import FastAPI, HTTPException
+    from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import threading
 
-from app.database import engine, Base
-from app.routers import auth, journals, users
+with startup_report.phase("import", "app.database"):
+    from app.database import engine, Base
+with startup_report.phase("import", "app.routers"):
+    from app.routers import admin, auth, journals, users
 from app.config import get_settings
+from app.services import mood_analysis_service
+from app.auth import warm_up as warm_up_auth
+from app.partitioning import ensure_range_partitions
+from app.events import event_broker
+from app.compression import ContentNegotiationMiddleware
+from app.digests import digest_scheduler
+from app.profiling import ProfilingMiddleware
+from app.idempotency import IdempotencyMiddleware, create_idempotency_backend
+from app.logging_config import RequestIdMiddleware, configure_logging, logging_stats
+from app.model_routing import model_router
 
 settings = get_settings()
+configure_logging()
+
+
+def warm_up():
+    """
+    Load the lazily imported OpenAI client and crypto backends off the
+    startup path so readiness isn't delayed and first requests don't pay.
+    """
+    with startup_report.phase("warm-up", "crypto backends"):
+        warm_up_auth()
+    with startup_report.phase("warm-up", "openai client"):
+        mood_analysis_service.warm_up()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    if settings.db_create_all:
+        with startup_report.phase("init", "create_all"):
+            Base.metadata.create_all(bind=engine)
+    if settings.journal_partitioning == "range":
+        with startup_report.phase("init", "range partitions"):
+            with engine.begin() as connection:
+                ensure_range_partitions(connection, settings.journal_partition_months_ahead)
+    startup_report.mark_ready()
+    if settings.warm_up_lazy_imports:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    if settings.digest_schedule_enabled:
+        digest_scheduler.start()
     yield
+    await digest_scheduler.stop(settings.graceful_shutdown_timeout)
+    event_broker.close()
+    await mood_analysis_service.drain(settings.graceful_shutdown_timeout)
+    engine.dispose()
 
 
 app = FastAPI(
@@ -30,9 +73,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Inside compression, so stored responses are replayed with whatever
+# encoding the retry negotiates.
+app.add_middleware(
+    IdempotencyMiddleware,
+    backend=create_idempotency_backend(),
+    ttl=settings.idempotency_ttl_seconds,
+    pending_ttl=settings.idempotency_pending_seconds
+)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        ContentNegotiationMiddleware,
+        minimum_size=settings.compression_min_size,
+        encodings=settings.compression_encoding_list
+    )
+
+if settings.admin_token:
+    app.add_middleware(
+        ProfilingMiddleware,
+        admin_token=settings.admin_token,
+        output_dir=settings.profile_dir,
+        max_files=settings.profile_max_files
+    )
+
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(journals.router, prefix="/api/journals", tags=["journals"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/")
@@ -45,11 +115,26 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/startup")
+async def startup_timings():
+    return startup_report.as_dict()
+
+
+@app.get("/health/logging")
+async def logging_health():
+    return logging_stats()
+
+
+@app.get("/health/llm")
+async def llm_health():
+    return model_router.stats()
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    ) 
\ No newline at end of file
+    import sys
+    from app.server import run_development, run_production
+
+    if "--production" in sys.argv or not settings.debug:
+        run_production(settings)
+    else:
+        run_development(settings)
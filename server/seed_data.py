@@ -18,6 +18,7 @@ from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
 from app.models import User, JournalEntry, Base
 from app.auth import get_password_hash
+from app.emotions import set_entry_emotions
 import random
 
 
@@ -271,12 +272,12 @@ def create_sample_journal_entries(db: Session, users: list[User]):
                 content=entry_data["content"],
                 mood=entry_data["mood"],
                 mood_score=entry_data["mood_score"],
-                top_emotions=entry_data["top_emotions"],
                 summary=entry_data["summary"],
                 analysis_completed=True,
                 created_at=created_date,
                 updated_at=created_date
             )
+            set_entry_emotions(journal_entry, entry_data["top_emotions"])
             
             db.add(journal_entry)
             entry_index += 1
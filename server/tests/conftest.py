@@ -0,0 +1,185 @@
+"""
+Fixtures for the query-budget harness.
+
+Every test gets a fresh in-memory SQLite database wired into the app's
+session dependencies, and a QueryCounter that records each statement the
+app executes together with the number of rows fetched for it.
+"""
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import main
+import app.account_deletion as account_deletion
+import app.auth as auth
+import app.digests as digests
+import app.routers.journals as journals
+from app.auth import create_access_token, get_password_hash
+from app.database import Base, configure_sqlite, get_db
+from app.emotions import set_entry_emotions
+from app.models import JournalEntry, User
+from app.services import mood_analysis_service
+from app.similarity import encode_vector, similarity_index, vectorize
+
+PASSWORD = "password123"
+
+
+@dataclass
+class Statement:
+    sql: str
+    rows: int = 0
+
+
+@dataclass
+class QueryCounter:
+    statements: List[Statement] = field(default_factory=list)
+    active: bool = False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def rows(self) -> int:
+        return sum(statement.rows for statement in self.statements)
+
+    def report(self) -> str:
+        return "\n".join(
+            f"  {index + 1:>3}. [{statement.rows} rows] {' '.join(statement.sql.split())}"
+            for index, statement in enumerate(self.statements)
+        )
+
+
+class CountingCursor(sqlite3.Cursor):
+    counter: QueryCounter = None
+
+    def _fetched(self, rows):
+        counter = CountingCursor.counter
+        if counter is not None and counter.active and counter.statements:
+            counter.statements[-1].rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        return row if row is None else self._fetched([row])[0]
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany(self.arraysize if size is None else size))
+
+    def fetchall(self):
+        return self._fetched(super().fetchall())
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(":memory:", check_same_thread=False, factory=CountingConnection),
+        poolclass=StaticPool
+    )
+    configure_sqlite(engine, wal=False)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+@pytest.fixture
+def queries(engine):
+    counter = QueryCounter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if counter.active:
+            counter.statements.append(Statement(statement))
+
+    CountingCursor.counter = counter
+    yield counter
+    CountingCursor.counter = None
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def fake_analysis(title, content, fallback=True):
+        return {"mood": "Calm", "mood_score": 6.0, "top_emotions": ["calm", "hope"], "summary": "A calm day."}
+
+    main.app.dependency_overrides[get_db] = override_db
+    main.app.dependency_overrides[auth.get_read_db] = override_db
+    monkeypatch.setattr(auth, "get_read_session", lambda subject: session_factory())
+    monkeypatch.setattr(journals, "get_read_session", lambda subject: session_factory())
+    monkeypatch.setattr(digests, "SessionLocal", session_factory)
+    monkeypatch.setattr(account_deletion, "SessionLocal", session_factory)
+    monkeypatch.setattr(mood_analysis_service, "analyze_journal_entry", fake_analysis)
+    similarity_index._users.clear()
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+    similarity_index._users.clear()
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    return get_password_hash(PASSWORD)
+
+
+@pytest.fixture
+def make_user(session_factory, password_hash):
+    def make_user(username: str = "alice", entries: int = 0) -> dict:
+        db = session_factory()
+        try:
+            user = User(username=username, email=f"{username}@example.com", hashed_password=password_hash)
+            db.add(user)
+            db.flush()
+            start = datetime(2026, 10, 19, 8, 0)
+            created = []
+            for index in range(entries):
+                title = f"Entry {index}"
+                content = f"Went running by the river and thought about work, day {index}."
+                entry = JournalEntry(
+                    user_id=user.id,
+                    title=title,
+                    content=content,
+                    embedding=encode_vector(vectorize(title, content)),
+                    mood="Calm",
+                    mood_score=5.0 + index % 5,
+                    summary="A run by the river.",
+                    analysis_completed=True,
+                    created_at=start - timedelta(hours=index),
+                    updated_at=start - timedelta(hours=index)
+                )
+                set_entry_emotions(entry, ["calm", "hope"] if index % 2 else ["anxiety"])
+                db.add(entry)
+                created.append(entry)
+            db.commit()
+            token = create_access_token(data={"sub": str(user.id)})
+            return {
+                "id": user.id,
+                "username": user.username,
+                "entry_ids": [entry.id for entry in created],
+                "headers": {"Authorization": f"Bearer {token}"}
+            }
+        finally:
+            db.close()
+
+    return make_user
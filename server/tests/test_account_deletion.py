@@ -0,0 +1,98 @@
+"""
+Account deletion: batched background deletion and database cascades.
+"""
+from datetime import date, datetime, timezone
+from sqlalchemy import delete
+from app.account_deletion import delete_account
+from app.analysis_jobs import enqueue_analysis
+from app.archive import archive_entries
+from app.models import (
+    AnalysisJob, ArchivedJournalEntry, JournalDigest, JournalEntry, JournalEntryEmotion,
+    JournalEntryTombstone, User
+)
+
+USER_TABLES = (JournalEntry, ArchivedJournalEntry, JournalEntryEmotion, JournalEntryTombstone, JournalDigest, AnalysisJob)
+
+
+def row_counts(session_factory, user_id: int) -> dict:
+    db = session_factory()
+    try:
+        counts = {model.__tablename__: db.query(model).filter(model.user_id == user_id).count() for model in USER_TABLES}
+        counts["users"] = db.query(User).filter(User.id == user_id).count()
+        return counts
+    finally:
+        db.close()
+
+
+def add_derived_rows(session_factory, user: dict):
+    db = session_factory()
+    try:
+        db.add(JournalEntryTombstone(entry_id=999, user_id=user["id"]))
+        db.add(JournalDigest(
+            user_id=user["id"], period="week", period_start=date(2026, 10, 12), period_end=date(2026, 10, 18),
+            entry_count=1, summary="A quiet week.", fingerprint="x"
+        ))
+        enqueue_analysis(db, user["entry_ids"][0], user["id"])
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_delete_account_removes_everything(client, make_user, session_factory):
+    alice = make_user("alice", entries=6)
+    bob = make_user("bob", entries=2)
+    add_derived_rows(session_factory, alice)
+    db = session_factory()
+    try:
+        archive_entries(db, datetime(2026, 10, 19, 5, 30, tzinfo=timezone.utc))
+    finally:
+        db.close()
+    assert row_counts(session_factory, alice["id"])["journal_entries_archive"] > 0
+
+    response = client.delete("/api/users/me", headers=alice["headers"])
+
+    assert response.status_code == 202
+    assert set(row_counts(session_factory, alice["id"]).values()) == {0}
+    assert row_counts(session_factory, bob["id"])["journal_entries"] == 2
+    assert client.get("/api/users/me", headers=alice["headers"]).status_code == 401
+
+
+def test_entries_are_deleted_in_bounded_batches(make_user, session_factory, queries):
+    user = make_user(entries=7)
+
+    db = session_factory()
+    queries.active = True
+    try:
+        assert delete_account(db, user["id"], batch_size=3) == 7
+        assert len(db.identity_map) == 0
+    finally:
+        queries.active = False
+        db.close()
+
+    assert max(statement.rows for statement in queries.statements) <= 3
+    assert set(row_counts(session_factory, user["id"]).values()) == {0}
+
+
+def test_deleting_the_user_row_cascades(make_user, session_factory):
+    user = make_user(entries=3)
+    add_derived_rows(session_factory, user)
+
+    db = session_factory()
+    try:
+        db.execute(delete(User).where(User.id == user["id"]))
+        db.commit()
+    finally:
+        db.close()
+
+    assert set(row_counts(session_factory, user["id"]).values()) == {0}
+
+
+def test_token_of_deleted_account_does_not_match_a_reused_username(client, make_user):
+    old = make_user("alice", entries=1)
+    assert client.delete("/api/users/me", headers=old["headers"]).status_code == 202
+
+    new = make_user("alice")
+
+    assert new["id"] != old["id"]
+    assert client.get("/api/users/me", headers=old["headers"]).status_code == 401
+    assert client.get("/api/users/me", headers=new["headers"]).json()["username"] == "alice"
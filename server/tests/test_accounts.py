@@ -0,0 +1,77 @@
+"""
+Signup username allocation and admin bulk provisioning.
+"""
+import pytest
+from app.config import get_settings
+from tests.conftest import PASSWORD
+
+settings = get_settings()
+
+
+def signup(client, email: str):
+    return client.post("/api/auth/signup", json={"email": email, "password": PASSWORD, "password_confirm": PASSWORD})
+
+
+def test_signup_takes_next_free_suffix(client, make_user):
+    for username in ("john", "john1", "john7", "johnny", "john_x"):
+        make_user(username)
+
+    response = signup(client, "john@elsewhere.com")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["user"]["username"] == "john8"
+
+
+def test_signup_escapes_like_wildcards(client, make_user):
+    make_user("a_b")
+    make_user("axb5")
+
+    assert signup(client, "a_b@elsewhere.com").json()["user"]["username"] == "a_b1"
+
+
+def test_email_is_unique_regardless_of_case(client, make_user):
+    make_user("alice")
+
+    response = signup(client, "Alice@Example.com")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User with this email already exists"
+
+
+def test_login_ignores_email_case(client, make_user):
+    make_user("alice")
+
+    response = client.post("/api/auth/login", json={"email": "ALICE@example.com", "password": PASSWORD})
+
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def admin(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    monkeypatch.setattr(settings, "provision_batch_size", 3)
+    return {"X-Admin-Token": "secret"}
+
+
+def test_bulk_provisioning_requires_admin_token(client, admin):
+    response = client.post("/api/admin/users/bulk", json={"users": []}, headers={"X-Admin-Token": "wrong"})
+
+    assert response.status_code == 403
+
+
+def test_bulk_provisioning_in_batches(client, admin, make_user):
+    make_user("sam")
+    users = [{"email": f"sam@team{index}.com", "password": PASSWORD} for index in range(7)]
+    users += [{"email": "SAM@example.com", "password": PASSWORD}, {"email": "sam@team0.com", "password": PASSWORD}]
+
+    response = client.post("/api/admin/users/bulk", json={"users": users}, headers=admin)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(user["username"] for user in body["created"]) == sorted(["sam1", "sam2", "sam3", "sam4", "sam5", "sam6", "sam7"])
+    assert {(user["email"], user["reason"]) for user in body["skipped"]} == {
+        ("SAM@example.com", "email already registered"),
+        ("sam@team0.com", "duplicate in request"),
+    }
+    login = client.post("/api/auth/login", json={"email": "sam@team3.com", "password": PASSWORD})
+    assert login.status_code == 200
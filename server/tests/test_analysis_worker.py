@@ -0,0 +1,164 @@
+"""
+Queued mood analysis: job claiming, leases and the worker loop.
+"""
+import asyncio
+from datetime import timedelta
+import pytest
+import app.events as events
+import app.worker as worker_module
+from app.analysis_jobs import claim_jobs, complete_job, enqueue_analysis, utcnow
+from app.cache import KeyValueCacheBackend, LocalKeyValueStore
+from app.config import get_settings
+from app.database import ReadRouter, engine
+from app.events import EventBroker
+from app.models import AnalysisJob, JournalEntry
+from app.services import AnalysisError, MoodAnalysisService, get_fallback_analysis, mood_analysis_service
+from app.worker import AnalysisWorker
+
+settings = get_settings()
+
+
+@pytest.fixture
+def queue_mode(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "analysis_mode", "queue")
+    monkeypatch.setattr(worker_module, "SessionLocal", session_factory)
+    return client
+
+
+def enqueue(session_factory, user: dict):
+    db = session_factory()
+    try:
+        for entry_id in user["entry_ids"]:
+            enqueue_analysis(db, entry_id, user["id"])
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_create_enqueues_and_worker_applies_analysis(queue_mode, make_user, session_factory):
+    user = make_user()
+    response = queue_mode.post("/api/journals/", json={"title": "Queued", "content": "Left for the worker."}, headers=user["headers"])
+
+    assert response.status_code == 200
+    assert response.json()["analysis_completed"] is False
+
+    asyncio.run(AnalysisWorker(concurrency=4, batch_size=2, poll_seconds=0.01).run(drain=True))
+
+    db = session_factory()
+    try:
+        entry = db.get(JournalEntry, (response.json()["id"], user["id"]))
+        assert entry.analysis_completed is True
+        assert entry.mood == "Calm"
+        assert db.query(AnalysisJob).count() == 0
+    finally:
+        db.close()
+
+
+def test_written_back_analysis_resyncs_streams_and_pins_reads(queue_mode, make_user, session_factory, monkeypatch):
+    store = KeyValueCacheBackend(LocalKeyValueStore())
+    api_broker = EventBroker(history_size=10, queue_size=10, max_users=10, store=store)
+    monkeypatch.setattr(events.settings, "sse_heartbeat_seconds", 0.01)
+    monkeypatch.setattr(worker_module, "event_broker", EventBroker(history_size=10, queue_size=10, max_users=10, store=store))
+    monkeypatch.setattr(worker_module, "read_router", ReadRouter([object()], pin_seconds=5, store=store))
+    user = make_user(entries=1)
+    enqueue(session_factory, user)
+
+    async def scenario():
+        stream = api_broker.stream(user["id"])
+        assert (await stream.__anext__()).startswith("retry:")
+        next_frame = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.05)
+        await AnalysisWorker(concurrency=1, batch_size=1, poll_seconds=0.01).run(drain=True)
+        frames = [await next_frame]
+        while "event: resync" not in frames[-1]:
+            frames.append(await asyncio.wait_for(stream.__anext__(), 5))
+        await stream.aclose()
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert worker_module.read_router.engine_for(str(user["id"])) is engine
+
+
+def test_workers_claim_disjoint_batches(make_user, session_factory):
+    user = make_user(entries=5)
+    enqueue(session_factory, user)
+
+    db = session_factory()
+    try:
+        first = claim_jobs(db, "worker-a", 3)
+        second = claim_jobs(db, "worker-b", 3)
+        third = claim_jobs(db, "worker-c", 3)
+    finally:
+        db.close()
+
+    assert len(first) == 3 and len(second) == 2 and third == []
+    assert {job.entry_id for job in first}.isdisjoint(job.entry_id for job in second)
+
+
+def test_expired_lease_is_reclaimed(make_user, session_factory):
+    user = make_user(entries=1)
+    enqueue(session_factory, user)
+
+    db = session_factory()
+    try:
+        [job] = claim_jobs(db, "crashed", 1)
+        assert claim_jobs(db, "healthy", 1) == []
+
+        db.query(AnalysisJob).update({AnalysisJob.locked_until: utcnow() - timedelta(seconds=1)})
+        db.commit()
+        [reclaimed] = claim_jobs(db, "healthy", 1)
+
+        assert (reclaimed.id, reclaimed.attempts) == (job.id, 2)
+        assert complete_job(db, job.id, "crashed") is False
+        assert complete_job(db, job.id, "healthy") is True
+    finally:
+        db.close()
+
+
+def test_edit_while_running_requeues_job(make_user, session_factory):
+    user = make_user(entries=1)
+    enqueue(session_factory, user)
+
+    db = session_factory()
+    try:
+        [job] = claim_jobs(db, "worker-a", 1)
+        enqueue_analysis(db, job.entry_id, user["id"])
+        assert complete_job(db, job.id, "worker-a") is False
+        db.commit()
+
+        assert db.query(AnalysisJob.status).scalar() == "pending"
+    finally:
+        db.close()
+
+
+def test_llm_failure_is_retried_not_saved_as_fallback(queue_mode, make_user, session_factory, monkeypatch):
+    user = make_user()
+    response = queue_mode.post("/api/journals/", json={"title": "Queued", "content": "Rate limited."}, headers=user["headers"])
+
+    async def rate_limited(title, content, fallback=True):
+        raise AnalysisError("OpenAI rate limit exceeded")
+
+    monkeypatch.setattr(mood_analysis_service, "analyze_journal_entry", rate_limited)
+    asyncio.run(AnalysisWorker(concurrency=1, batch_size=1, poll_seconds=0.01).run(drain=True))
+
+    db = session_factory()
+    try:
+        entry = db.get(JournalEntry, (response.json()["id"], user["id"]))
+        job = db.query(AnalysisJob).one()
+        assert entry.analysis_completed is False and entry.mood is None
+        assert (job.status, job.attempts, job.last_error) == ("pending", 1, "OpenAI rate limit exceeded")
+        assert job.available_at.replace(tzinfo=None) > utcnow().replace(tzinfo=None)
+    finally:
+        db.close()
+
+
+def test_inline_callers_still_get_the_fallback(monkeypatch):
+    service = MoodAnalysisService()
+
+    async def timed_out(title, content):
+        raise AnalysisError("Timed out")
+
+    monkeypatch.setattr(service, "_analyze", timed_out)
+
+    assert asyncio.run(service.analyze_journal_entry("Walk", "By the river.")) == get_fallback_analysis()
+    with pytest.raises(AnalysisError):
+        asyncio.run(service.analyze_journal_entry("Walk", "By the river.", fallback=False))
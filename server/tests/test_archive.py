@@ -0,0 +1,71 @@
+"""
+Archiving old entries and reading them back on request.
+"""
+import json
+from datetime import datetime, timezone
+from app.archive import archive_cutoff, archive_entries
+from app.models import ArchivedJournalEntry, JournalEntry, JournalEntryEmotion
+
+# make_user entries are updated at 08:00, 07:00, 06:00, ... on 2026-10-19.
+CUTOFF = datetime(2026, 10, 19, 6, 30, tzinfo=timezone.utc)
+
+
+def archive(session_factory) -> int:
+    db = session_factory()
+    try:
+        return archive_entries(db, CUTOFF, batch_size=2)
+    finally:
+        db.close()
+
+
+def test_archive_moves_old_entries(client, make_user, session_factory):
+    alice = make_user("alice", entries=5)
+    make_user("bob", entries=1)
+
+    assert archive(session_factory) == 3
+
+    db = session_factory()
+    try:
+        assert sorted(entry_id for (entry_id,) in db.query(JournalEntry.id)) == sorted(alice["entry_ids"][:2] + [6])
+        archived = db.get(ArchivedJournalEntry, alice["entry_ids"][4])
+        assert archived.content == "Went running by the river and thought about work, day 4."
+        assert db.query(JournalEntryEmotion).filter(JournalEntryEmotion.entry_id.in_(alice["entry_ids"][2:])).count() == 0
+    finally:
+        db.close()
+
+    listed = client.get("/api/journals/", headers=alice["headers"]).json()
+    assert [entry["id"] for entry in listed] == alice["entry_ids"][:2]
+
+
+def test_archived_entries_are_read_on_request(client, make_user, session_factory):
+    alice = make_user("alice", entries=5)
+    make_user("bob", entries=1)
+    archive(session_factory)
+    entry_id = alice["entry_ids"][3]
+
+    assert client.get(f"/api/journals/{entry_id}", headers=alice["headers"]).status_code == 404
+    response = client.get(f"/api/journals/{entry_id}?include_archived=true", headers=alice["headers"])
+    assert response.status_code == 200
+    assert response.json()["title"] == "Entry 3"
+
+    hot = {row["emotion"]: row["count"] for row in client.get("/api/journals/emotions", headers=alice["headers"]).json()}
+    everything = {
+        row["emotion"]: row["count"]
+        for row in client.get("/api/journals/emotions?include_archived=true", headers=alice["headers"]).json()
+    }
+    assert hot == {"anxiety": 1, "calm": 1, "hope": 1}
+    assert everything == {"anxiety": 3, "calm": 2, "hope": 2}
+
+    exported = client.get("/api/journals/export?include_archived=true", headers=alice["headers"])
+    assert sorted(json.loads(line)["id"] for line in exported.text.splitlines()) == sorted(alice["entry_ids"])
+
+    assert client.delete(f"/api/journals/{entry_id}", headers=alice["headers"]).status_code == 200
+    assert client.get(f"/api/journals/{entry_id}?include_archived=true", headers=alice["headers"]).status_code == 404
+
+
+def test_cutoff_keeps_digest_periods_hot():
+    now = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+    assert archive_cutoff(now, after_days=365) == datetime(2025, 10, 19, 12, 0, tzinfo=timezone.utc)
+    # Digests look back through September (DIGEST_LOOKBACK_PERIODS=2 months).
+    assert archive_cutoff(now, after_days=1) == datetime(2026, 9, 1, tzinfo=timezone.utc)
@@ -0,0 +1,46 @@
+"""
+Batch entry fetch: request order, not-found markers and id validation.
+"""
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def get_batch(client, headers, ids: str):
+    return client.get("/api/journals/batch", params={"ids": ids}, headers=headers)
+
+
+def test_results_follow_request_order(client, make_user):
+    user = make_user(entries=3)
+    first, second, third = user["entry_ids"]
+
+    response = get_batch(client, user["headers"], f"{third},{first},{second},{first}")
+
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["id"] for item in items] == [third, first, second, first]
+    assert [item["entry"]["id"] for item in items] == [third, first, second, first]
+    assert all(item["found"] for item in items)
+
+
+def test_missing_and_foreign_ids_are_marked_not_found(client, make_user):
+    user = make_user(entries=1)
+    other = make_user("bob", entries=1)
+    own, foreign = user["entry_ids"][0], other["entry_ids"][0]
+
+    items = get_batch(client, user["headers"], f"{foreign},{own},999999").json()
+
+    assert [(item["id"], item["found"], item["entry"]) for item in items if not item["found"]] == [
+        (foreign, False, None),
+        (999999, False, None)
+    ]
+    assert items[1]["found"] and items[1]["entry"]["title"] == "Entry 0"
+
+
+def test_invalid_id_lists_are_rejected(client, make_user):
+    user = make_user(entries=1)
+    too_many = ",".join(str(entry_id) for entry_id in range(1, settings.batch_max_ids + 2))
+
+    assert get_batch(client, user["headers"], "1,two").status_code == 400
+    assert get_batch(client, user["headers"], " , ").status_code == 400
+    assert get_batch(client, user["headers"], too_many).status_code == 400
@@ -0,0 +1,50 @@
+"""
+Entry body compression: codec markers and round-trips through the API.
+"""
+from sqlalchemy import text
+import app.models as models
+from app.models import RAW, ZLIB, decode_body, encode_body
+
+LONG_TEXT = "Walked by the river again and thought about the week at work. " * 40 + "Café, naïve, 日記."
+
+
+def test_short_bodies_are_stored_raw_and_long_ones_compressed():
+    short = encode_body("A short note.")
+    long = encode_body(LONG_TEXT)
+
+    assert short == RAW + "A short note.".encode()
+    assert long[:1] == ZLIB and len(long) < len(LONG_TEXT.encode()) / 4
+    assert decode_body(short) == "A short note."
+    assert decode_body(long) == LONG_TEXT
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(models.settings, "body_compression", False)
+
+    assert encode_body(LONG_TEXT)[:1] == RAW
+    assert decode_body(encode_body(LONG_TEXT)) == LONG_TEXT
+
+
+def test_legacy_text_and_driver_buffers_decode():
+    assert decode_body("Stored before the column was binary.") == "Stored before the column was binary."
+    assert decode_body(memoryview(encode_body(LONG_TEXT))) == LONG_TEXT
+
+
+def test_entry_bodies_round_trip_through_the_api(client, make_user, session_factory):
+    user = make_user()
+
+    created = client.post("/api/journals/", json={"title": "River", "content": LONG_TEXT}, headers=user["headers"])
+    assert created.status_code == 200
+    entry_id = created.json()["id"]
+
+    db = session_factory()
+    try:
+        stored = db.execute(text("SELECT content FROM journal_entries WHERE id = :id"), {"id": entry_id}).scalar()
+    finally:
+        db.close()
+    assert bytes(stored)[:1] == ZLIB
+
+    fetched = client.get(f"/api/journals/{entry_id}", headers=user["headers"]).json()
+    listed = client.get("/api/journals/", headers=user["headers"]).json()
+    assert fetched["content"] == LONG_TEXT
+    assert [entry["content"] for entry in listed] == [LONG_TEXT]
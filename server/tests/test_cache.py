@@ -0,0 +1,73 @@
+"""
+Per-user journal response cache.
+"""
+import pytest
+import app.routers.journals as journals
+from app.cache import JournalCache, KeyValueCacheBackend, LocalKeyValueStore, MemoryCacheBackend
+
+
+@pytest.fixture(params=["memory", "local"])
+def cache(request):
+    if request.param == "memory":
+        return JournalCache(MemoryCacheBackend(max_entries=100), ttl=60)
+    return JournalCache(KeyValueCacheBackend(LocalKeyValueStore()), ttl=60)
+
+
+def test_result_read_before_a_write_is_never_served_after_it(cache):
+    key = cache.key(1, "list", {"limit": 20})
+    assert cache.get(key) is None
+
+    # A write commits while the query for key is running.
+    cache.invalidate_user(1)
+    cache.set(key, "[stale]")
+
+    assert cache.get(cache.key(1, "list", {"limit": 20})) is None
+    assert cache.get(key) == "[stale]"
+
+
+def test_invalidation_is_per_user(cache):
+    for user_id in (1, 2):
+        cache.set(cache.key(user_id, "entry", {"id": 5}), f"entry of {user_id}")
+
+    cache.invalidate_user(1)
+
+    assert cache.get(cache.key(1, "entry", {"id": 5})) is None
+    assert cache.get(cache.key(2, "entry", {"id": 5})) == "entry of 2"
+
+
+def test_routes_serve_fresh_data_after_writes(client, make_user, monkeypatch):
+    monkeypatch.setattr(journals, "journal_cache", JournalCache(KeyValueCacheBackend(LocalKeyValueStore()), ttl=60))
+    user = make_user(entries=2)
+    entry_id = user["entry_ids"][0]
+
+    assert len(client.get("/api/journals/", headers=user["headers"]).json()) == 2
+    assert client.get(f"/api/journals/{entry_id}", headers=user["headers"]).json()["title"] == "Entry 0"
+
+    client.put(f"/api/journals/{entry_id}", json={"title": "Renamed"}, headers=user["headers"])
+    client.post("/api/journals/", json={"title": "New", "content": "A walk."}, headers=user["headers"])
+
+    assert len(client.get("/api/journals/", headers=user["headers"]).json()) == 3
+    assert client.get(f"/api/journals/{entry_id}", headers=user["headers"]).json()["title"] == "Renamed"
+
+
+def test_mood_filters_are_cached_as_queried(client, make_user, monkeypatch):
+    monkeypatch.setattr(journals, "journal_cache", JournalCache(KeyValueCacheBackend(LocalKeyValueStore()), ttl=60))
+    user = make_user(entries=2)
+
+    assert len(client.get("/api/journals/", params={"mood": "calm"}, headers=user["headers"]).json()) == 2
+    # " calm " is matched verbatim by ilike, so it must not reuse the "calm" page.
+    assert client.get("/api/journals/", params={"mood": " calm "}, headers=user["headers"]).json() == []
+
+
+def test_evicted_generation_never_revives_stale_keys():
+    cache = JournalCache(MemoryCacheBackend(max_entries=2), ttl=60)
+    key = cache.key(1, "list", {})
+    cache.set(key, "[old]")
+    cache.invalidate_user(1)
+
+    # Push user 1's generation out of the bounded map.
+    cache.key(2, "list", {})
+    cache.key(3, "list", {})
+    assert len(cache.backend._generations) == 2
+
+    assert cache.key(1, "list", {}) != key
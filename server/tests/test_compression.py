@@ -0,0 +1,78 @@
+"""
+Response compression and MessagePack negotiation.
+"""
+import gzip
+import json
+import brotli
+import msgpack
+import pytest
+import zstandard
+from app.compression import choose_encoding, wants_msgpack
+
+DECOMPRESS = {
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompress(data),
+    "br": brotli.decompress,
+    "gzip": gzip.decompress,
+}
+
+
+def raw_get(client, path: str, headers: dict):
+    with client.stream("GET", path, headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("zstd;q=0.5, gzip", "gzip"),
+    ("*", "zstd"),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+def test_wants_msgpack():
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert not wants_msgpack("application/json, application/msgpack;q=0.5")
+    assert not wants_msgpack("*/*")
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "br", "gzip"])
+def test_large_responses_round_trip_compressed(client, make_user, encoding):
+    user = make_user(entries=20)
+    plain = client.get("/api/journals/?limit=20", headers=user["headers"]).json()
+
+    response, body = raw_get(client, "/api/journals/?limit=20", {**user["headers"], "Accept-Encoding": encoding})
+
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(body)
+    assert json.loads(DECOMPRESS[encoding](body)) == plain
+
+
+def test_small_responses_are_not_compressed(client, make_user):
+    user = make_user(entries=1)
+
+    response, body = raw_get(client, "/api/users/me", {**user["headers"], "Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert json.loads(body)["username"] == "alice"
+
+
+def test_msgpack_round_trip(client, make_user):
+    user = make_user(entries=20)
+    plain = client.get("/api/journals/?limit=20", headers=user["headers"]).json()
+
+    response, body = raw_get(
+        client, "/api/journals/?limit=20",
+        {**user["headers"], "Accept": "application/msgpack", "Accept-Encoding": "zstd"}
+    )
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert set(response.headers["vary"].split(", ")) >= {"Accept", "Accept-Encoding"}
+    assert msgpack.unpackb(DECOMPRESS["zstd"](body)) == plain
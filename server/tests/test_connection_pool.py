@@ -0,0 +1,45 @@
+"""
+Pool budget: each request holds at most one pooled connection at a time.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import create_engine
+import app.routers.journals as journals
+from app.database import Base, configure_sqlite
+
+POOL_SIZE = 3
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        connect_args={"check_same_thread": False},
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=3
+    )
+    configure_sqlite(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_concurrent_lists_fit_a_pool_of_the_same_size(client, make_user, session_factory, monkeypatch):
+    users = [make_user(f"user{index}", entries=2) for index in range(POOL_SIZE)]
+    # Line every request up inside its page query, so any connection
+    # still held from resolving the user would exhaust the pool.
+    barrier = threading.Barrier(POOL_SIZE, timeout=5)
+
+    def read_session(subject):
+        barrier.wait()
+        return session_factory()
+
+    monkeypatch.setattr(journals, "get_read_session", read_session)
+
+    with ThreadPoolExecutor(POOL_SIZE) as executor:
+        responses = list(executor.map(lambda user: client.get("/api/journals/", headers=user["headers"]), users))
+
+    assert [response.status_code for response in responses] == [200] * POOL_SIZE
+    assert all(len(response.json()) == 2 for response in responses)
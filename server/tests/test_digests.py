@@ -0,0 +1,127 @@
+"""
+Weekly and monthly digests: incremental regeneration and the scheduler.
+"""
+import asyncio
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date
+import pytest
+import app.digests as digests
+from app.digests import DigestScheduler, generate_digests
+from app.models import JournalDigest, JournalEntry
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture
+def digest_sessions(session_factory, monkeypatch):
+    monkeypatch.setattr(digests, "SessionLocal", session_factory)
+    return session_factory
+
+
+def stored_digests(session_factory, user_id: int) -> dict:
+    db = session_factory()
+    try:
+        return {
+            (digest.period, digest.period_start): digest.entry_count
+            for digest in db.query(JournalDigest).filter(JournalDigest.user_id == user_id)
+        }
+    finally:
+        db.close()
+
+
+def test_digests_are_generated_and_only_regenerated_when_entries_change(digest_sessions, make_user):
+    user = make_user(entries=3)
+
+    assert asyncio.run(generate_digests(TODAY)) == 2
+    assert stored_digests(digest_sessions, user["id"]) == {
+        ("week", date(2026, 10, 19)): 3,
+        ("month", date(2026, 10, 1)): 3,
+    }
+
+    assert asyncio.run(generate_digests(TODAY)) == 0
+
+    db = digest_sessions()
+    try:
+        db.query(JournalEntry).filter(JournalEntry.id == user["entry_ids"][0]).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    assert asyncio.run(generate_digests(TODAY)) == 2
+    assert set(stored_digests(digest_sessions, user["id"]).values()) == {2}
+
+
+def test_digest_without_entries_is_deleted(digest_sessions, make_user):
+    user = make_user(entries=1)
+    asyncio.run(generate_digests(TODAY))
+
+    db = digest_sessions()
+    try:
+        db.query(JournalEntry).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    assert asyncio.run(generate_digests(TODAY)) == 0
+    assert stored_digests(digest_sessions, user["id"]) == {}
+
+
+def test_scheduled_batch_does_not_block_the_event_loop(monkeypatch):
+    started = threading.Event()
+
+    async def slow_batch(today=None, respect_window=False, stop=None):
+        started.set()
+        time.sleep(0.3)  # synchronous database work
+        return 0
+
+    monkeypatch.setattr(digests, "generate_digests", slow_batch)
+    monkeypatch.setattr(digests, "in_off_peak", lambda now: True)
+    monkeypatch.setattr(digests, "batch_lock", lambda: nullcontext(True))
+
+    async def scenario():
+        scheduler = DigestScheduler()
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while not started.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+        gaps = []
+        last = time.perf_counter()
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+        await scheduler.stop(timeout=5)
+        return max(gaps)
+
+    assert asyncio.run(scenario()) < 0.1
+    assert started.is_set()
+
+
+def test_stop_waits_for_the_running_batch(monkeypatch):
+    started = threading.Event()
+    finished = threading.Event()
+
+    async def slow_batch(today=None, respect_window=False, stop=None):
+        started.set()
+        stop.wait(5)
+        time.sleep(0.2)  # the user in progress
+        finished.set()
+        return 0
+
+    monkeypatch.setattr(digests, "generate_digests", slow_batch)
+    monkeypatch.setattr(digests, "in_off_peak", lambda now: True)
+    monkeypatch.setattr(digests, "batch_lock", lambda: nullcontext(True))
+
+    async def scenario():
+        scheduler = DigestScheduler()
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while not started.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+        await scheduler.stop(timeout=5)
+        return finished.is_set()
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,55 @@
+"""
+Normalized emotions: list filtering and per-user counts.
+"""
+from app.emotions import normalize_emotions
+
+
+def emotion_ids(client, headers, emotion: str) -> list:
+    response = client.get("/api/journals/", params={"emotion": emotion}, headers=headers)
+    assert response.status_code == 200
+    return sorted(entry["id"] for entry in response.json())
+
+
+def test_emotions_are_normalized_and_deduplicated():
+    assert normalize_emotions([" Calm", "calm", "HOPE ", "", None, "x" * 80]) == ["calm", "hope", "x" * 50]
+
+
+def test_filter_matches_normalized_emotion_for_this_user_only(client, make_user):
+    user = make_user(entries=4)
+    make_user("bob", entries=4)
+    ids = user["entry_ids"]
+
+    assert emotion_ids(client, user["headers"], " Anxiety ") == sorted([ids[0], ids[2]])
+    assert emotion_ids(client, user["headers"], "hope") == sorted([ids[1], ids[3]])
+    assert emotion_ids(client, user["headers"], "joy") == []
+
+
+def test_counts_are_per_user_and_most_frequent_first(client, make_user):
+    user = make_user(entries=5)
+    make_user("bob", entries=2)
+
+    response = client.get("/api/journals/emotions", headers=user["headers"])
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"emotion": "anxiety", "count": 3},
+        {"emotion": "calm", "count": 2},
+        {"emotion": "hope", "count": 2}
+    ]
+
+
+def test_counts_and_filter_follow_reanalysis(client, make_user):
+    user = make_user(entries=2)
+    first, second = user["entry_ids"]
+    client.get("/api/journals/emotions", headers=user["headers"])
+
+    response = client.put(f"/api/journals/{first}", json={"content": "A calm and hopeful day."}, headers=user["headers"])
+
+    assert response.status_code == 200
+    assert response.json()["top_emotions"] == ["calm", "hope"]
+    assert client.get("/api/journals/emotions", headers=user["headers"]).json() == [
+        {"emotion": "calm", "count": 2},
+        {"emotion": "hope", "count": 2}
+    ]
+    assert emotion_ids(client, user["headers"], "anxiety") == []
+    assert emotion_ids(client, user["headers"], "calm") == sorted([first, second])
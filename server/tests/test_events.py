@@ -0,0 +1,81 @@
+"""
+Server-sent entry events: replay, resync across workers and shutdown.
+"""
+import asyncio
+import signal
+import uvicorn
+import app.events as events
+import app.server as server
+from app.cache import KeyValueCacheBackend, LocalKeyValueStore
+from app.events import EventBroker
+
+
+def make_broker(store=None) -> EventBroker:
+    return EventBroker(history_size=10, queue_size=10, max_users=10, store=store)
+
+
+async def read_frames(stream, count: int) -> list:
+    frames = []
+    async for frame in stream:
+        if frame.startswith(("retry:", ":")):
+            continue
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    await stream.aclose()
+    return frames
+
+
+def test_last_event_id_replays_only_missed_events():
+    broker = make_broker()
+    broker.publish(1, "entry-changed", {"id": 1})
+    first_id = broker._history[1][0].id
+    broker.publish(1, "entry-changed", {"id": 2})
+    broker.publish(2, "entry-changed", {"id": 3})
+
+    frames = asyncio.run(asyncio.wait_for(read_frames(broker.stream(1, first_id), 1), 5))
+
+    assert '"id": 2' in frames[0]
+
+
+def test_event_id_from_another_worker_gets_resync():
+    broker = make_broker()
+    frames = asyncio.run(asyncio.wait_for(read_frames(broker.stream(1, "0badcafe-3"), 1), 5))
+
+    assert "event: resync" in frames[0]
+
+
+def test_write_on_another_worker_resyncs_open_streams(monkeypatch):
+    monkeypatch.setattr(events.settings, "sse_heartbeat_seconds", 0.01)
+    store = KeyValueCacheBackend(LocalKeyValueStore())
+    worker_a, worker_b = make_broker(store), make_broker(store)
+
+    async def scenario():
+        reader = asyncio.create_task(read_frames(worker_b.stream(1), 2))
+        await asyncio.sleep(0.05)
+        worker_b.publish(1, "entry-changed", {"id": 1})
+        await asyncio.sleep(0.05)
+        worker_a.publish(1, "entry-changed", {"id": 2})
+        return await asyncio.wait_for(reader, 5)
+
+    local, resync = asyncio.run(scenario())
+
+    assert '"id": 1' in local
+    assert "event: resync" in resync
+
+
+def test_exit_signal_ends_open_streams(monkeypatch):
+    broker = make_broker()
+    monkeypatch.setattr(server, "event_broker", broker)
+    uvicorn_server = server.Server(uvicorn.Config("main:app"))
+
+    async def scenario():
+        stream = broker.stream(1)
+        reader = asyncio.create_task(read_frames(stream, 1))
+        await asyncio.sleep(0.05)
+        uvicorn_server.handle_exit(signal.SIGTERM, None)
+        return await asyncio.wait_for(reader, 5)
+
+    assert asyncio.run(scenario()) == []
+    assert uvicorn_server.should_exit
+    assert broker.subscriber_count == 0
@@ -0,0 +1,174 @@
+"""
+Idempotency-Key replay for journal writes.
+"""
+import asyncio
+import uuid
+import httpx
+import main
+from app.auth import create_access_token
+from app.cache import KeyValueCacheBackend, LocalKeyValueStore
+from app.idempotency import IdempotencyMiddleware
+from app.models import JournalEntry
+from app.services import mood_analysis_service
+
+
+def idempotent(user: dict, key: str) -> dict:
+    return {**user["headers"], "Idempotency-Key": key}
+
+
+def entry_count(session_factory, user: dict) -> int:
+    db = session_factory()
+    try:
+        return db.query(JournalEntry).filter(JournalEntry.user_id == user["id"]).count()
+    finally:
+        db.close()
+
+
+def test_retried_create_is_replayed(client, make_user, session_factory):
+    user = make_user()
+    headers = idempotent(user, uuid.uuid4().hex)
+    payload = {"title": "Retry", "content": "The train was late again."}
+
+    first = client.post("/api/journals/", json=payload, headers=headers)
+    second = client.post("/api/journals/", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert entry_count(session_factory, user) == 1
+
+
+def test_key_reused_for_different_request_is_rejected(client, make_user, session_factory):
+    user = make_user()
+    headers = idempotent(user, uuid.uuid4().hex)
+
+    client.post("/api/journals/", json={"title": "One", "content": "First."}, headers=headers)
+    response = client.post("/api/journals/", json={"title": "Two", "content": "Second."}, headers=headers)
+
+    assert response.status_code == 422
+    assert entry_count(session_factory, user) == 1
+
+
+def test_keys_are_scoped_to_the_user(client, make_user, session_factory):
+    alice, bob = make_user("alice"), make_user("bob")
+    key = uuid.uuid4().hex
+    payload = {"title": "Shared key", "content": "Same key, different people."}
+
+    client.post("/api/journals/", json=payload, headers=idempotent(alice, key))
+    response = client.post("/api/journals/", json=payload, headers=idempotent(bob, key))
+
+    assert "idempotent-replayed" not in response.headers
+    assert entry_count(session_factory, bob) == 1
+
+
+def test_concurrent_duplicate_waits_for_original(client, make_user, session_factory, monkeypatch):
+    user = make_user()
+    headers = idempotent(user, uuid.uuid4().hex)
+    payload = {"title": "Flaky network", "content": "Sent twice before the first reply."}
+    calls = []
+
+    async def slow_analysis(title, content):
+        calls.append(title)
+        await asyncio.sleep(0.2)
+        return {"mood": "Calm", "mood_score": 6.0, "top_emotions": ["calm"], "summary": "Calm."}
+
+    monkeypatch.setattr(mood_analysis_service, "analyze_journal_entry", slow_analysis)
+
+    async def send_twice():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(
+                http.post("/api/journals/", json=payload, headers=headers),
+                http.post("/api/journals/", json=payload, headers=headers)
+            )
+
+    first, second = asyncio.run(send_twice())
+
+    assert first.json() == second.json()
+    assert len(calls) == 1
+    assert entry_count(session_factory, user) == 1
+
+
+class CountingApp:
+    """
+    Stands in for the API: counts calls and answers after a delay, with a
+    status taken from the queue of statuses it was given.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        status = self.statuses.pop(0)
+        await receive()
+        await asyncio.sleep(0.2)
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": f'{{"call": {self.calls}}}'.encode()})
+
+
+async def post(middleware, key: str) -> dict:
+    token = create_access_token({"sub": "1"})
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/journals/",
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"idempotency-key", key.encode())]
+    }
+    response = {"headers": {}}
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"title": "Retry"}', "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        else:
+            response["body"] = message["body"]
+
+    await middleware(scope, receive, send)
+    return response
+
+
+def test_retry_on_another_worker_waits_for_the_original():
+    backend = KeyValueCacheBackend(LocalKeyValueStore())
+    app = CountingApp([200])
+    workers = [IdempotencyMiddleware(app, backend=backend, ttl=60, pending_ttl=30) for _ in range(2)]
+    key = uuid.uuid4().hex
+
+    async def scenario():
+        first = asyncio.create_task(post(workers[0], key))
+        await asyncio.sleep(0.05)
+        # The original is still running on the first worker.
+        second = await post(workers[1], key)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert app.calls == 1
+    assert first["body"] == second["body"] == b'{"call": 1}'
+    assert second["headers"][b"idempotent-replayed"] == b"true"
+
+
+def test_failed_original_releases_the_key_for_other_workers():
+    backend = KeyValueCacheBackend(LocalKeyValueStore())
+    app = CountingApp([500, 200])
+    workers = [IdempotencyMiddleware(app, backend=backend, ttl=60, pending_ttl=30) for _ in range(2)]
+    key = uuid.uuid4().hex
+
+    async def scenario():
+        first = asyncio.create_task(post(workers[0], key))
+        await asyncio.sleep(0.05)
+        # The original is still running on the first worker.
+        second = await post(workers[1], key)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert app.calls == 2
+    assert (first["status"], second["status"]) == (500, 200)
+    assert b"idempotent-replayed" not in second["headers"]
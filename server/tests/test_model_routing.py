@@ -0,0 +1,38 @@
+"""
+Length- and load-aware model selection.
+"""
+import pytest
+from app.model_routing import ModelRouter
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(fast_model="fast", strong_model="strong", strong_min_chars=100, latency_budget=2.0, cooldown=60)
+
+
+def test_routes_by_length(router):
+    assert router.choose(99).model == "fast"
+    assert router.choose(100).model == "strong"
+
+
+def test_rate_limit_downgrades_long_entries(router):
+    router.record("strong", None, success=False, rate_limited=True)
+
+    route = router.choose(5000)
+    assert (route.model, route.reason) == ("fast", "downgraded")
+    assert router.stats()["strong"]["rate_limited"] == 1
+
+
+def test_slow_model_downgrades_until_cooldown_ends(router, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.model_routing.time.monotonic", lambda: now[0])
+
+    router.record("strong", 1.0, success=True)
+    assert router.choose(5000).model == "strong"
+
+    for _ in range(5):
+        router.record("strong", 8.0, success=True)
+    assert router.choose(5000).model == "fast"
+
+    now[0] += 61
+    assert router.choose(5000).model == "strong"
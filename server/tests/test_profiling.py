@@ -0,0 +1,57 @@
+"""
+Per-request profiling middleware.
+"""
+import os
+from typing import List
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.profiling import ProfilingMiddleware
+
+
+class Item(BaseModel):
+    name: str
+
+
+def profiled_client(tmp_path, max_files: int = 50) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items", response_model=List[Item])
+    async def items():
+        return [{"name": f"item {index}"} for index in range(100)]
+
+    app.add_middleware(ProfilingMiddleware, admin_token="secret", output_dir=str(tmp_path), max_files=max_files)
+    return TestClient(app)
+
+
+def test_profiling_requires_the_admin_token(tmp_path):
+    client = profiled_client(tmp_path)
+
+    for headers in ({"X-Profile": "1"}, {"X-Profile": "1", "X-Admin-Token": "wrong"}):
+        response = client.get("/items", headers=headers)
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiled_request_reports_serialization_and_saves_a_call_tree(tmp_path):
+    client = profiled_client(tmp_path)
+
+    response = client.get("/items", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+    assert len(response.json()) == 100
+    timing = response.headers["server-timing"]
+    assert "serialization;dur=" in timing and 'serialization;dur=0.0;desc="0 calls"' not in timing
+    assert os.listdir(tmp_path) == [response.headers["x-profile-artifact"]]
+
+
+def test_only_the_newest_call_trees_are_kept(tmp_path):
+    client = profiled_client(tmp_path, max_files=2)
+
+    artifacts = [
+        client.get("/items", headers={"X-Profile": "1", "X-Admin-Token": "secret"}).headers["x-profile-artifact"]
+        for _ in range(4)
+    ]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(artifacts[-2:])
@@ -0,0 +1,134 @@
+"""
+Query-count and N+1 regression harness.
+
+Each route in routers/auth.py, users.py and journals.py runs against a
+user with 1, 10 and 50 entries. The number of statements must not grow
+with the fixture size and, like the rows fetched, must stay within the
+route's declared budget. Failures list every statement executed.
+
+GET /api/journals/events is not covered: it streams until the client
+disconnects, and only resolves the user id before streaming.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import pytest
+from tests.conftest import PASSWORD
+
+SIZES = (1, 10, 50)
+
+
+@dataclass
+class Budget:
+    statements: int
+    rows: int
+    # Allowance for routes that legitimately read every entry once, like
+    # the first similarity search loading a user's vectors.
+    rows_per_entry: int = 0
+
+    def max_rows(self, entries: int) -> int:
+        return self.rows + self.rows_per_entry * entries
+
+
+@dataclass
+class Case:
+    method: str
+    path: str
+    budget: Budget
+    json: Optional[Callable[[dict], dict]] = None
+    status: int = 200
+
+
+CASES: Dict[str, Case] = {
+    "login": Case("POST", "/api/auth/login", Budget(statements=1, rows=1),
+                  json=lambda user: {"email": f"{user['username']}@example.com", "password": PASSWORD}),
+    "me": Case("GET", "/api/users/me", Budget(statements=1, rows=1)),
+    "get user": Case("GET", "/api/users/{user_id}", Budget(statements=2, rows=2)),
+    "delete account": Case("DELETE", "/api/users/me", Budget(statements=13, rows=1, rows_per_entry=1), status=202),
+    "create entry": Case("POST", "/api/journals/", Budget(statements=10, rows=7),
+                         json=lambda user: {"title": "New", "content": "A walk by the river."}),
+    "list entries": Case("GET", "/api/journals/?limit=20", Budget(statements=2, rows=21)),
+    "list by emotion": Case("GET", "/api/journals/?emotion=anxiety&limit=20", Budget(statements=2, rows=21)),
+    "get entry": Case("GET", "/api/journals/{entry_id}", Budget(statements=2, rows=2)),
+    "batch": Case("GET", "/api/journals/batch?ids={first_ids},999", Budget(statements=2, rows=4)),
+    "changes": Case("GET", "/api/journals/changes?limit=20", Budget(statements=4, rows=23)),
+    "emotions": Case("GET", "/api/journals/emotions", Budget(statements=2, rows=4)),
+    "digests": Case("GET", "/api/journals/digests", Budget(statements=2, rows=5)),
+    "export": Case("GET", "/api/journals/export", Budget(statements=3, rows=1, rows_per_entry=1)),
+    "export with archive": Case("GET", "/api/journals/export?include_archived=true", Budget(statements=5, rows=1, rows_per_entry=1)),
+    "similar": Case("GET", "/api/journals/{entry_id}/similar?limit=5", Budget(statements=4, rows=7, rows_per_entry=1)),
+    "update entry": Case("PUT", "/api/journals/{entry_id}", Budget(statements=17, rows=11),
+                         json=lambda user: {"content": "Changed my mind about the river."}),
+    "delete entry": Case("DELETE", "/api/journals/{entry_id}", Budget(statements=8, rows=5)),
+}
+
+
+def request(client, queries, case: Case, user: dict):
+    queries.statements.clear()
+    queries.active = True
+    try:
+        return client.request(
+            case.method,
+            case.path.format(
+                user_id=user["id"],
+                entry_id=user["entry_ids"][0],
+                first_ids=",".join(str(entry_id) for entry_id in user["entry_ids"][:3])
+            ),
+            json=case.json(user) if case.json else None,
+            headers=user["headers"]
+        )
+    finally:
+        queries.active = False
+
+
+def check_budget(name: str, queries, budget: Budget, entries: int = 0):
+    problems = []
+    if queries.count > budget.statements:
+        problems.append(f"{queries.count} statements (budget {budget.statements})")
+    if queries.rows > budget.max_rows(entries):
+        problems.append(f"{queries.rows} rows fetched (budget {budget.max_rows(entries)})")
+    if problems:
+        pytest.fail(f"{name}: {', '.join(problems)}\n{queries.report()}", pytrace=False)
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_route_query_budget(name, client, queries, make_user):
+    case = CASES[name]
+    counts = {}
+    for size in SIZES:
+        queries.statements.clear()
+        user = make_user(f"user{size}", entries=size)
+        response = request(client, queries, case, user)
+        assert response.status_code == case.status, response.text
+        check_budget(f"{name} with {size} entries", queries, case.budget, size)
+        counts[size] = (queries.count, queries.report())
+
+    smallest, largest = counts[SIZES[0]], counts[SIZES[-1]]
+    if largest[0] != smallest[0]:
+        pytest.fail(
+            f"{name}: statement count grows with fixture size "
+            f"({smallest[0]} with {SIZES[0]} entries, {largest[0]} with {SIZES[-1]})\n{largest[1]}",
+            pytrace=False
+        )
+
+
+def test_signup_query_budget(client, queries, make_user):
+    counts = {}
+    for size in SIZES:
+        # Existing users whose usernames collide with the new account's.
+        prefix = f"taken{size}"
+        for index in range(size):
+            make_user(prefix if index == 0 else f"{prefix}{index}")
+        queries.statements.clear()
+        queries.active = True
+        try:
+            response = client.post("/api/auth/signup", json={
+                "email": f"{prefix}@elsewhere.com",
+                "password": PASSWORD,
+                "password_confirm": PASSWORD
+            })
+        finally:
+            queries.active = False
+        assert response.status_code == 200, response.text
+        check_budget(f"signup with {size} colliding usernames", queries, Budget(statements=2, rows=2))
+        counts[size] = queries.count
+    assert counts[SIZES[0]] == counts[SIZES[-1]]
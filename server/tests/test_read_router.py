@@ -0,0 +1,35 @@
+"""
+Read replica routing with read-your-writes pinning.
+"""
+from app.cache import KeyValueCacheBackend, LocalKeyValueStore
+from app.database import ReadRouter, engine
+
+
+class Replica:
+    pass
+
+
+def test_write_on_one_worker_pins_reads_on_every_worker():
+    store = KeyValueCacheBackend(LocalKeyValueStore())
+    replica = Replica()
+    workers = [ReadRouter([replica], pin_seconds=5, store=store) for _ in range(2)]
+
+    assert workers[1].engine_for("7") is replica
+    workers[0].record_write("7")
+
+    assert workers[1].engine_for("7") is engine
+    assert workers[1].engine_for("8") is replica
+
+
+def test_reads_go_to_the_primary_when_the_store_fails():
+    class BrokenStore:
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ttl):
+            raise ConnectionError("down")
+
+    router = ReadRouter([Replica()], pin_seconds=5, store=BrokenStore())
+    router.record_write("7")
+
+    assert router.engine_for("7") is engine
@@ -0,0 +1,104 @@
+"""
+Related-entries index: in-place updates and incremental catch-up.
+"""
+from datetime import datetime
+import numpy as np
+from app.models import JournalEntry
+from app.similarity import SimilarityIndex, UserVectors, encode_vector, vectorize
+
+DIMENSIONS = 64
+
+
+def unit(index: int) -> np.ndarray:
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+
+def add_entry(session_factory, user_id: int, title: str, content: str, updated_at: datetime) -> int:
+    db = session_factory()
+    try:
+        entry = JournalEntry(
+            user_id=user_id,
+            title=title,
+            content=content,
+            embedding=encode_vector(vectorize(title, content, DIMENSIONS)),
+            created_at=updated_at,
+            updated_at=updated_at
+        )
+        db.add(entry)
+        db.commit()
+        return entry.id
+    finally:
+        db.close()
+
+
+def test_user_vectors_grow_and_fill_holes_on_remove():
+    vectors = UserVectors(DIMENSIONS)
+    for entry_id in range(1, 21):
+        vectors.upsert(entry_id, unit(entry_id))
+
+    assert vectors.size == 20 and len(vectors.ids) == 32
+    vectors.remove(3)
+    vectors.remove(3)
+
+    assert vectors.size == 19
+    assert vectors.rows[20] == 2 and vectors.ids[2] == 20
+    assert np.array_equal(vectors.matrix[vectors.rows[20]], unit(20))
+
+
+def test_search_ranks_by_cosine_and_skips_unrelated():
+    vectors = UserVectors(DIMENSIONS)
+    vectors.upsert(1, unit(0))
+    vectors.upsert(2, (unit(0) + unit(1)) / np.sqrt(2))
+    vectors.upsert(3, (unit(0) + 3 * unit(1)) / np.sqrt(10))
+    vectors.upsert(4, unit(5))
+
+    matches = vectors.search(1, limit=5)
+
+    assert [entry_id for entry_id, _ in matches] == [2, 3]
+    assert matches[0][1] > matches[1][1] > 0
+
+
+def test_writes_from_other_workers_are_picked_up_incrementally(session_factory, make_user, queries):
+    user = make_user(entries=0)
+    start = datetime(2026, 10, 19, 8, 0)
+    walk = add_entry(session_factory, user["id"], "River walk", "A long walk by the river at dusk.", start)
+    run = add_entry(session_factory, user["id"], "River run", "Running by the river before dusk.", start)
+    index = SimilarityIndex(DIMENSIONS, max_users=10)
+    db = session_factory()
+    try:
+        assert [entry_id for entry_id, _ in index.search(db, user["id"], walk, 5)] == [run]
+
+        queries.active = True
+        index.search(db, user["id"], walk, 5)
+        queries.active = False
+        assert queries.count == 1, queries.report()
+
+        swim = add_entry(
+            session_factory, user["id"], "River swim", "A swim in the river at dusk.", datetime(2026, 10, 19, 9, 0)
+        )
+        db.query(JournalEntry).filter(JournalEntry.id == run).delete()
+        db.commit()
+
+        assert [entry_id for entry_id, _ in index.search(db, user["id"], walk, 5)] == [swim]
+        assert set(index._users[user["id"]].rows) == {walk, swim}
+        assert index.search(db, user["id"], run, 5) is None
+    finally:
+        db.close()
+
+
+def test_api_writes_update_loaded_vectors_in_place(client, make_user):
+    user = make_user(entries=2)
+    first, second = user["entry_ids"]
+    client.get(f"/api/journals/{first}/similar", headers=user["headers"])
+
+    created = client.post("/api/journals/", json={
+        "title": "Running by the river",
+        "content": "Went running by the river and thought about work again."
+    }, headers=user["headers"]).json()
+    client.delete(f"/api/journals/{second}", headers=user["headers"])
+
+    similar = client.get(f"/api/journals/{first}/similar", headers=user["headers"]).json()
+    assert [entry["id"] for entry in similar] == [created["id"]]
+    assert similar[0]["similarity"] > 0.5
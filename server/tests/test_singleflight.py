@@ -0,0 +1,126 @@
+"""
+Request coalescing for entry lists and mood analyses.
+"""
+import asyncio
+import time
+import httpx
+import main
+import app.routers.journals as journals
+from app.services import MoodAnalysisService
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight(window=5)
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.run(("user", 1), lambda: compute(1)),
+            flights.run(("user", 1), lambda: compute(1)),
+            flights.run(("user", 2), lambda: compute(2))
+        )
+
+    assert asyncio.run(scenario()) == [2, 2, 4]
+    assert calls == [1, 2]
+    assert flights.stats() == {"in_flight": 0, "calls": 2, "shared": 1}
+
+
+def test_cancelled_caller_does_not_cancel_the_flight():
+    flights = SingleFlight(window=5)
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert flights.calls == 1
+
+
+def test_forget_and_window_start_new_flights():
+    flights = SingleFlight(window=5)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.run((7, "list"), compute))
+        await asyncio.sleep(0)
+        flights.forget(7)
+        await asyncio.gather(first, flights.run((7, "list"), compute))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+    calls.clear()
+    flights.window = 0
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_identical_analyses_call_the_llm_once(monkeypatch):
+    service = MoodAnalysisService()
+    calls = []
+
+    async def analyze(title, content):
+        calls.append((title, content))
+        await asyncio.sleep(0.01)
+        return {"mood": "Calm"}
+
+    monkeypatch.setattr(service, "_analyze", analyze)
+
+    async def scenario():
+        return await asyncio.gather(
+            service.analyze_journal_entry("Walk", "By the river."),
+            service.analyze_journal_entry("Walk", "By the river."),
+            service.analyze_journal_entry("Walk", "By the sea.")
+        )
+
+    assert [result["mood"] for result in asyncio.run(scenario())] == ["Calm"] * 3
+    assert calls == [("Walk", "By the river."), ("Walk", "By the sea.")]
+
+
+def test_concurrent_list_requests_run_one_query(client, make_user, session_factory, queries, monkeypatch):
+    user = make_user(entries=3)
+    flights = SingleFlight(window=5)
+    monkeypatch.setattr(journals, "list_flights", flights)
+
+    def session_after_second_request(subject):
+        # Hold the first query until the second request has joined it.
+        deadline = time.monotonic() + 5
+        while flights.shared == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return session_factory()
+
+    monkeypatch.setattr(journals, "get_read_session", session_after_second_request)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.get("/api/journals/?limit=20", headers=user["headers"]) for _ in range(2)
+            ))
+
+    queries.active = True
+    first, second = asyncio.run(scenario())
+    queries.active = False
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json() and len(first.json()) == 3
+    assert flights.stats() == {"in_flight": 0, "calls": 1, "shared": 1}
+    assert sum("FROM journal_entries" in statement.sql for statement in queries.statements) == 1
@@ -0,0 +1,61 @@
+"""
+Embedded SQLite mode: connection pragmas and concurrent writers.
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_database_engine
+from app.models import User
+
+
+def test_file_database_uses_wal_and_pragmas(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    try:
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    finally:
+        engine.dispose()
+
+
+def test_concurrent_writers_wait_for_the_lock(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    errors = []
+
+    def write(worker: int):
+        try:
+            for index in range(20):
+                with Session() as db:
+                    db.add(User(username=f"user{worker}-{index}", email=f"user{worker}-{index}@example.com", hashed_password="x"))
+                    db.commit()
+        except Exception as error:
+            errors.append(error)
+
+    try:
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with Session() as db:
+            assert db.query(User).count() == 80
+    finally:
+        engine.dispose()
+
+
+def test_now_keeps_fractional_seconds(engine):
+    statement = str(select(func.now()).compile(dialect=engine.dialect))
+    with engine.connect() as connection:
+        now = connection.exec_driver_sql(statement).scalar()
+
+    # Same text format as timestamps bound from Python, so the two compare
+    # correctly within the same second.
+    assert len(now) == len("2026-10-19 08:00:00.000000")
+    assert datetime.fromisoformat(now) <= datetime.utcnow()
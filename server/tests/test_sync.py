@@ -0,0 +1,67 @@
+"""
+Delta sync: token paging, tombstones and token errors.
+"""
+from datetime import datetime
+from app.sync import SyncCursor, encode_sync_token
+
+
+def sync_pages(client, headers, limit: int, token=None) -> list:
+    pages = []
+    while True:
+        params = {"limit": limit}
+        if token:
+            params["since"] = token
+        response = client.get("/api/journals/changes", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        token = page["sync_token"]
+        if not page["has_more"]:
+            return pages
+
+
+def test_full_sync_pages_through_every_entry_once(client, make_user):
+    user = make_user(entries=5)
+    make_user("bob", entries=3)
+
+    pages = sync_pages(client, user["headers"], limit=2)
+
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    synced = [entry["id"] for page in pages for entry in page["entries"]]
+    assert sorted(synced) == sorted(user["entry_ids"])
+    assert all(page["deleted"] == [] for page in pages)
+
+
+def test_deleted_entries_are_reported_as_tombstones(client, make_user):
+    user = make_user(entries=3)
+    token = sync_pages(client, user["headers"], limit=10)[-1]["sync_token"]
+    deleted_id = user["entry_ids"][0]
+
+    assert client.delete(f"/api/journals/{deleted_id}", headers=user["headers"]).status_code == 200
+
+    page = sync_pages(client, user["headers"], limit=10, token=token)[-1]
+    assert page["deleted"] == [deleted_id]
+    assert deleted_id not in [entry["id"] for entry in page["entries"]]
+
+
+def test_tombstones_page_with_the_entries(client, make_user):
+    user = make_user(entries=4)
+    token = sync_pages(client, user["headers"], limit=10)[-1]["sync_token"]
+    for entry_id in user["entry_ids"][:3]:
+        client.delete(f"/api/journals/{entry_id}", headers=user["headers"])
+
+    pages = sync_pages(client, user["headers"], limit=2, token=token)
+
+    assert pages[0]["has_more"]
+    assert sorted(entry_id for page in pages for entry_id in page["deleted"]) == sorted(user["entry_ids"][:3])
+
+
+def test_invalid_and_expired_tokens_are_rejected(client, make_user):
+    user = make_user(entries=1)
+    expired = encode_sync_token(SyncCursor(datetime(2020, 1, 1), 0, datetime(2020, 1, 1), 0))
+
+    invalid = client.get("/api/journals/changes", params={"since": "not-a-token"}, headers=user["headers"])
+    gone = client.get("/api/journals/changes", params={"since": expired}, headers=user["headers"])
+
+    assert invalid.status_code == 400
+    assert gone.status_code == 410